@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+
+from cns_py import config as cns_config
+from cns_py import metrics
+
+SHED = metrics.counter(
+    "cns_api_shed_total", "Requests rejected by admission control.", ("endpoint",)
+)
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted (queue full or wait timed out)."""
+
+
+class Gate:
+    """Concurrency limit with a bounded wait queue for one endpoint.
+
+    Limits are read from config on every admission, so they can be tuned through
+    the environment without a restart. Waiting happens on the worker thread, which
+    keeps the gate independent of the event loop serving the request.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.active = 0
+        self.waiting = 0
+        self.shed = 0
+        self._cond = threading.Condition()
+
+    def _shed(self) -> None:
+        self.shed += 1
+        SHED.inc(endpoint=self.name)
+
+    def acquire(self) -> None:
+        """Take a slot, waiting in the bounded queue; raises Overloaded when shed."""
+        limit = cns_config.api_max_inflight(self.name)
+        with self._cond:
+            if self.active >= limit:
+                if self.waiting >= cns_config.api_max_queue():
+                    self._shed()
+                    raise Overloaded(f"{self.name}: queue full")
+                self.waiting += 1
+                try:
+                    admitted = self._cond.wait_for(
+                        lambda: self.active < limit, cns_config.api_queue_timeout_s()
+                    )
+                finally:
+                    self.waiting -= 1
+                if not admitted:
+                    self._shed()
+                    raise Overloaded(f"{self.name}: timed out waiting for a slot")
+            self.active += 1
+
+    def release(self) -> None:
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def admit(self) -> Iterator[None]:
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+_gates: Dict[str, Gate] = {}
+_gates_lock = threading.Lock()
+
+
+def gate(name: str) -> Gate:
+    with _gates_lock:
+        if name not in _gates:
+            _gates[name] = Gate(name)
+        return _gates[name]
+
+
+def gates() -> Dict[str, Gate]:
+    with _gates_lock:
+        return dict(_gates)
+
+
+def _gate_stat(attr: str) -> Dict[Tuple[str, ...], float]:
+    return {(name,): float(getattr(g, attr)) for name, g in gates().items()}
+
+
+# Stands in for pool stats: connections are opened per call, so the gates are what
+# bound concurrent database work.
+metrics.gauge_callback(
+    "cns_api_inflight",
+    "Requests holding an admission slot.",
+    ("endpoint",),
+    lambda: _gate_stat("active"),
+)
+metrics.gauge_callback(
+    "cns_api_queued",
+    "Requests waiting for an admission slot.",
+    ("endpoint",),
+    lambda: _gate_stat("waiting"),
+)
+metrics.gauge_callback(
+    "cns_api_max_inflight",
+    "Configured admission limit.",
+    ("endpoint",),
+    lambda: {(name,): float(cns_config.api_max_inflight(name)) for name in gates()},
+)
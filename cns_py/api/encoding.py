@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore[assignment]
+
+
+def fast_json_available() -> bool:
+    return orjson is not None
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to compact JSON bytes, with orjson when it is installed.
+
+    Non-string dict keys (e.g. fiber ids in EXPLAIN belief_terms) are stringified,
+    matching what the standard JSON path produces.
+    """
+    if orjson is not None:
+        return bytes(orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS))
+    return json.dumps(content, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSON response that serializes pre-shaped dicts directly.
+
+    Returning it from an endpoint bypasses FastAPI's jsonable_encoder and response
+    model validation, which dominate serialization cost for large payloads.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
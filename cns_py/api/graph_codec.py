@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import struct
+import sys
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Compact columnar encoding of a graph neighborhood for the IB Explorer.
+#
+# All integers are little-endian and every section starts on an 8-byte boundary so
+# the browser can view it as a typed array without copying:
+#
+#   header        magic b"CNSG", u16 version, u16 reserved, u32 node_count, u32 edge_count
+#   node_ids      float64[node_count]   (exact for ids < 2**53)
+#   node_labels   string table          (u32 count, u32 offsets[count + 1], utf-8 bytes)
+#   node_kinds    int32[node_count]     index into kind table, -1 for null
+#   kinds         string table
+#   node_counts   int32[node_count]     neighbors collapsed into a cluster node, 0 otherwise
+#   edge_src      int32[edge_count]     index into the node arrays
+#   edge_dst      int32[edge_count]
+#   edge_pred     int32[edge_count]     index into predicate table
+#   edge_conf     float32[edge_count]   NaN for null
+#   predicates    string table
+
+MEDIA_TYPE = "application/vnd.cns.graph"
+MAGIC = b"CNSG"
+VERSION = 2
+_HEADER = struct.Struct("<4sHHII")
+
+
+def _pad(buf: bytearray) -> None:
+    buf.extend(b"\0" * (-len(buf) % 8))
+
+
+def _le(values: array) -> bytes:  # type: ignore[type-arg]
+    if sys.byteorder == "big":  # pragma: no cover - little-endian hosts in practice
+        values.byteswap()
+    return values.tobytes()
+
+
+def _write_strings(buf: bytearray, strings: Sequence[str]) -> None:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = array("I", [0])
+    for b in encoded:
+        offsets.append(offsets[-1] + len(b))
+    buf.extend(struct.pack("<I", len(encoded)))
+    buf.extend(_le(offsets))
+    buf.extend(b"".join(encoded))
+    _pad(buf)
+
+
+def _dictionary(values: Sequence[Optional[str]]) -> Tuple[List[str], array]:  # type: ignore[type-arg]
+    table: Dict[str, int] = {}
+    codes = array("i")
+    for v in values:
+        if v is None:
+            codes.append(-1)
+            continue
+        codes.append(table.setdefault(v, len(table)))
+    return list(table), codes
+
+
+def encode_graph(payload: Dict[str, List[Dict[str, Any]]]) -> bytes:
+    """Encode a ``{"nodes": [...], "edges": [...]}`` neighborhood payload.
+
+    Edges whose endpoints are not in ``nodes`` are dropped, as the JSON renderer
+    would skip them anyway.
+    """
+    nodes = payload.get("nodes", [])
+    index = {int(n["id"]): i for i, n in enumerate(nodes)}
+    edges = [e for e in payload.get("edges", []) if e["src_id"] in index and e["dst_id"] in index]
+
+    buf = bytearray(_HEADER.pack(MAGIC, VERSION, 0, len(nodes), len(edges)))
+    _pad(buf)
+    buf.extend(_le(array("d", [float(n["id"]) for n in nodes])))
+    _pad(buf)
+    _write_strings(buf, [str(n["label"]) for n in nodes])
+    kinds, kind_codes = _dictionary([n.get("kind") for n in nodes])
+    buf.extend(_le(kind_codes))
+    _pad(buf)
+    _write_strings(buf, kinds)
+    buf.extend(_le(array("i", [int(n.get("count") or 0) for n in nodes])))
+    _pad(buf)
+
+    predicates, pred_codes = _dictionary([str(e["predicate"]) for e in edges])
+    buf.extend(_le(array("i", [index[e["src_id"]] for e in edges])))
+    _pad(buf)
+    buf.extend(_le(array("i", [index[e["dst_id"]] for e in edges])))
+    _pad(buf)
+    buf.extend(_le(pred_codes))
+    _pad(buf)
+    conf = [e.get("confidence") for e in edges]
+    buf.extend(_le(array("f", [float("nan") if c is None else float(c) for c in conf])))
+    _pad(buf)
+    _write_strings(buf, predicates)
+    return bytes(buf)
+
+
+class _Reader:
+    def __init__(self, data: bytes) -> None:
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def _align(self) -> None:
+        self.pos += -self.pos % 8
+
+    def take(self, typecode: str, count: int) -> array:  # type: ignore[type-arg]
+        values = array(typecode)
+        end = self.pos + values.itemsize * count
+        values.frombytes(self.data[self.pos : end])
+        if sys.byteorder == "big":  # pragma: no cover
+            values.byteswap()
+        self.pos = end
+        self._align()
+        return values
+
+    def strings(self) -> List[str]:
+        (count,) = struct.unpack_from("<I", self.data, self.pos)
+        self.pos += 4
+        offsets = array("I")
+        end = self.pos + offsets.itemsize * (count + 1)
+        offsets.frombytes(self.data[self.pos : end])
+        if sys.byteorder == "big":  # pragma: no cover
+            offsets.byteswap()
+        base = end
+        out = [
+            bytes(self.data[base + offsets[i] : base + offsets[i + 1]]).decode("utf-8")
+            for i in range(count)
+        ]
+        self.pos = base + offsets[count]
+        self._align()
+        return out
+
+
+def decode_graph(data: bytes) -> Dict[str, List[Dict[str, Any]]]:
+    """Decode ``encode_graph`` output back into the JSON payload shape."""
+    magic, version, _reserved, node_count, edge_count = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a CNS graph payload")
+    r = _Reader(data)
+    r.pos = _HEADER.size
+    r._align()
+    ids = r.take("d", node_count)
+    labels = r.strings()
+    kind_codes = r.take("i", node_count)
+    kinds = r.strings()
+    counts = r.take("i", node_count)
+    src = r.take("i", edge_count)
+    dst = r.take("i", edge_count)
+    pred_codes = r.take("i", edge_count)
+    conf = r.take("f", edge_count)
+    predicates = r.strings()
+
+    node_ids = [int(i) for i in ids]
+    nodes: List[Dict[str, Any]] = []
+    for i, k in enumerate(kind_codes):
+        node: Dict[str, Any] = {
+            "id": node_ids[i],
+            "label": labels[i],
+            "kind": kinds[k] if k >= 0 else None,
+        }
+        if counts[i]:
+            node["count"] = counts[i]
+        nodes.append(node)
+    edges = [
+        {
+            "src_id": node_ids[src[i]],
+            "dst_id": node_ids[dst[i]],
+            "predicate": predicates[pred_codes[i]],
+            "confidence": None if conf[i] != conf[i] else float(conf[i]),
+        }
+        for i in range(edge_count)
+    ]
+    return {"nodes": nodes, "edges": edges}
@@ -1,23 +1,77 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+import itertools
+import threading
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Generator,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
-from fastapi import FastAPI, HTTPException
+import anyio
+import psycopg
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 
-from cns_py.cql.executor import cql
-from cns_py.graph import traverse_from
+from cns_py import config as cns_config
+from cns_py import metrics
+from cns_py.api import admission, graph_codec
+from cns_py.api.encoding import FastJSONResponse, dumps, fast_json_available
+from cns_py.cql.executor import (
+    STREAM_FETCH_ROWS,
+    decode_cursor,
+    execute,
+    execute_many,
+    execute_stream,
+    shape_label,
+)
+from cns_py.cql.parser import CqlQuery, CqlSyntaxError, parse
+from cns_py.graph import (
+    atom_info,
+    cluster_key,
+    collapse_fanout,
+    expand_frontier,
+    fanout_counts,
+    traverse_ids,
+)
 from cns_py.nn import nn_search
+from cns_py.storage.db import QueryScope, current_query_scope, query_scope
 
 
 class CqlRequest(BaseModel):  # type: ignore[misc]
     query: str
+    # Overrides the query's LIMIT; streaming responses are unbounded unless one is set.
+    limit: Optional[int] = None
+    # Stream NDJSON rows (same as sending Accept: application/x-ndjson).
+    stream: bool = False
+    # Same as RETURN EXPLAIN ANALYZE / PROFILE in the query: attach the Postgres plan
+    # and a Python profile to the EXPLAIN payload.
+    analyze: bool = False
+    profile: bool = False
+
+
+class CqlBatchRequest(BaseModel):  # type: ignore[misc]
+    queries: List[str]
 
 
 class GraphNode(BaseModel):  # type: ignore[misc]
     id: int
     label: str
     kind: Optional[str] = None
+    # Cluster super-nodes only: number of collapsed neighbors and the key to expand them.
+    count: Optional[int] = None
+    cluster: Optional[str] = None
 
 
 class GraphEdge(BaseModel):  # type: ignore[misc]
@@ -25,6 +79,8 @@ class GraphEdge(BaseModel):  # type: ignore[misc]
     dst_id: int
     predicate: str
     confidence: Optional[float] = None
+    # Fiber id; set on /graph/expand edges so clients can dedupe across expansions.
+    id: Optional[int] = None
 
 
 class GraphNeighborhoodResponse(BaseModel):  # type: ignore[misc]
@@ -32,70 +88,519 @@ class GraphNeighborhoodResponse(BaseModel):  # type: ignore[misc]
     edges: List[GraphEdge]
 
 
+class GraphExpandRequest(BaseModel):  # type: ignore[misc]
+    # Atom ids to expand by one hop. When empty, ``label`` is resolved with nn_search.
+    frontier: List[int] = []
+    # Atom ids the client already has; never returned again as nodes.
+    known: List[int] = []
+    label: Optional[str] = None
+    predicates: Optional[List[str]] = None
+    limit: int = 100
+
+
 app = FastAPI(title="CNS API", version="0.1")
 
+# Upper bound on queries per /cql/batch call; keeps one request from monopolizing the DB.
+MAX_BATCH_QUERIES = 500
+# Largest row cap for buffered (non-streaming) /cql responses.
+MAX_CQL_LIMIT = 10_000
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# GraphNode.kind of level-of-detail super-nodes.
+CLUSTER_KIND = "cluster"
+# Largest edge cap for one /graph/expand call.
+MAX_EXPAND_LIMIT = 10_000
+
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.shared = 0
+        self.scope: Optional[QueryScope] = None
+
+
+def _outlives(own: Optional[QueryScope], leader: Optional[QueryScope]) -> bool:
+    """Whether ``own`` has time left after ``leader``'s deadline."""
+    if leader is None or leader.deadline is None:
+        return False
+    return own is None or own.deadline is None or own.deadline > leader.deadline
+
+
+class _SingleFlight:
+    """Collapse concurrent calls with the same key onto one execution.
+
+    The first caller runs ``fn``; callers arriving while it is in flight block and
+    receive the same result (or exception). Nothing is kept once the call finishes,
+    so results are never staler than a request that started at the same time.
+    Waiters keep their own deadline, and once anyone waits the leader's query is no
+    longer cancelled when the leader's client disconnects. A caller does not join a
+    call whose scope was already cancelled; it starts a new call, which later callers
+    join instead. A waiter whose deadline is later than the leader's does not inherit
+    the leader's timeout: it runs the call again.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(
+        self, key: Hashable, fn: Callable[[], T], on_shared: Optional[Callable[[], None]] = None
+    ) -> T:
+        own = current_query_scope()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None or (call.scope is not None and not call.scope.pin())
+            if leader:
+                call = self._calls[key] = _Call()
+                call.scope = own
+            else:
+                assert call is not None
+                call.shared += 1
+        if not leader and on_shared is not None:
+            on_shared()
+        if not leader:
+            remaining = own.remaining_ms() if own is not None else None
+            if not call.done.wait(None if remaining is None else max(remaining, 0) / 1000.0):
+                raise TimeoutError("query deadline exceeded")
+            if call.error is not None:
+                timed_out = isinstance(call.error, (TimeoutError, psycopg.errors.QueryCanceled))
+                if timed_out and _outlives(own, call.scope):
+                    return self.do(key, fn, on_shared)
+                raise call.error
+            return call.result  # type: ignore[no-any-return]
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+        return call.result  # type: ignore[no-any-return]
+
+
+_inflight = _SingleFlight()
+
+
+def _coalesce(endpoint: str, shape: str, key: Hashable, fn: Callable[[], T]) -> T:
+    if not cns_config.singleflight_enabled():
+        return fn()
+    return _inflight.do(
+        key, fn, on_shared=lambda: metrics.COALESCED.inc(endpoint=endpoint, shape=shape)
+    )
+
+
+# How often a running request checks whether its client went away.
+DISCONNECT_POLL_S = 0.25
+
+
+def _unavailable(exc: BaseException, scope: QueryScope) -> HTTPException:
+    if isinstance(exc, admission.Overloaded):
+        return HTTPException(
+            status_code=503, detail="server overloaded", headers={"Retry-After": "1"}
+        )
+    if scope.cancelled:
+        # Nobody is listening; the status only shows up in access logs.
+        return HTTPException(status_code=499, detail="client closed request")
+    return HTTPException(status_code=504, detail="query deadline exceeded")
+
+
+async def _admitted(
+    endpoint: Optional[str],
+    request: Request,
+    fn: Callable[[], T],
+    coalesce: Optional[Tuple[str, Hashable]] = None,
+    scope: Optional[QueryScope] = None,
+) -> T:
+    """Run ``fn`` on a worker thread under ``endpoint``'s admission gate.
+
+    The request's deadline becomes the ``statement_timeout`` of every connection
+    ``fn`` opens, and those statements are cancelled server-side if the client
+    disconnects first. Overload maps to 503, an expired deadline to 504.
+
+    With ``coalesce`` (shape label, key), identical concurrent requests share one run
+    (``_coalesce``). Only that run takes an admission slot: followers just wait for
+    its result, so a burst of identical requests is not shed for want of slots.
+    Callers that keep using the scope afterwards (streams) pass their own ``scope``.
+    """
+    if scope is None:
+        scope = QueryScope(cns_config.api_deadline_ms())
+    t0 = time.perf_counter()
+
+    def gated() -> T:
+        if endpoint is None:
+            return fn()
+        with admission.gate(endpoint).admit():
+            return fn()
+
+    def work() -> T:
+        with query_scope(scope):
+            if coalesce is None or endpoint is None:
+                return gated()
+            shape, key = coalesce
+            return _coalesce(endpoint, shape, key, gated)
+
+    async def watch_disconnect() -> None:
+        while not await request.is_disconnected():
+            await anyio.sleep(DISCONNECT_POLL_S)
+        scope.cancel()
+
+    # Errors are re-raised outside the task group so they don't arrive wrapped in an
+    # exception group.
+    error: Optional[Exception] = None
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(watch_disconnect)
+        try:
+            result = await anyio.to_thread.run_sync(work)
+        except Exception as exc:
+            error = exc
+        tg.cancel_scope.cancel()
+    metrics.REQUEST_SECONDS.observe(time.perf_counter() - t0, endpoint=endpoint or "cql_stream")
+    if isinstance(error, (admission.Overloaded, TimeoutError, psycopg.errors.QueryCanceled)):
+        raise _unavailable(error, scope) from error
+    if error is not None:
+        raise error
+    return result
+
+
+def _fast_json() -> bool:
+    return cns_config.fast_json_enabled() and fast_json_available()
+
+
+_Stream = Generator[Dict[str, Any], None, None]
+
+
+async def _ndjson_stream(
+    first: List[Dict[str, Any]], items: _Stream, scope: QueryScope, request: Request
+) -> AsyncIterator[bytes]:
+    """NDJSON lines of ``first`` then ``items``, pulled ``STREAM_FETCH_ROWS`` at a time on
+    worker threads.
+
+    The client is checked between chunks. When it disconnects, or the response is torn
+    down early, running statements are cancelled and ``items`` is closed right away,
+    releasing its admission slot, transaction and connection.
+    """
+    finished = False
+    try:
+        yield b"".join(dumps(item) + b"\n" for item in first)
+        while not await request.is_disconnected():
+            chunk = await anyio.to_thread.run_sync(
+                lambda: list(itertools.islice(items, STREAM_FETCH_ROWS))
+            )
+            if not chunk:
+                finished = True
+                return
+            yield b"".join(dumps(item) + b"\n" for item in chunk)
+    finally:
+        with anyio.CancelScope(shield=True):
+            if not finished:
+                scope.cancel()
+            await anyio.to_thread.run_sync(_close, items)
+
+
+def _close(items: _Stream) -> None:
+    try:
+        items.close()
+    except psycopg.Error:
+        pass  # cancelled mid-statement; the connection is closed regardless
+
+
+def _gated_stream(q: CqlQuery) -> _Stream:
+    # Holds a "cql_stream" slot until the stream is exhausted or closed.
+    gate = admission.gate("cql_stream")
+    gate.acquire()
+    try:
+        yield from execute_stream(q)
+    finally:
+        gate.release()
+
+
+async def _stream_cql(q: CqlQuery, request: Request) -> StreamingResponse:
+    """Stream results as NDJSON, one result object per line, EXPLAIN as the last line.
+
+    The first item is pulled before the response starts so that parse/SQL errors still
+    surface as HTTP errors rather than a truncated 200 stream. That also admits the
+    stream and opens its connection under the request deadline.
+    """
+    items = _gated_stream(q)
+    scope = QueryScope(cns_config.api_deadline_ms())
+    try:
+        first = await _admitted(
+            None, request, lambda: list(itertools.islice(items, 1)), scope=scope
+        )
+    except HTTPException:
+        await anyio.to_thread.run_sync(_close, items)
+        raise
+    except Exception as exc:  # pragma: no cover - defensive; detailed tests elsewhere
+        await anyio.to_thread.run_sync(_close, items)
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    body = _ndjson_stream(first, items, scope, request)
+    return StreamingResponse(body, media_type=NDJSON_MEDIA_TYPE)
 
-def run_cql(req: CqlRequest) -> Dict[str, Any]:
+
+async def run_cql(
+    req: CqlRequest, request: Request, accept: Optional[str] = Header(default=None)
+) -> Union[Dict[str, Any], StreamingResponse, FastJSONResponse]:
     """Execute a CQL query and return the raw executor payload.
 
-    This is a thin wrapper over cns_py.cql.executor.cql.
+    This is a thin wrapper over cns_py.cql.executor. With ``stream`` set (or an
+    ``Accept: application/x-ndjson`` header) rows are streamed from a server-side
+    cursor instead of being buffered into one JSON document. Pages are continued by
+    passing the payload's ``next_cursor`` back as ``AFTER "<token>"`` in the query.
+    Concurrent identical buffered queries share one execution (single-flight).
+    Requests pass admission control and run under a deadline (see ``_admitted``).
+    ``analyze``/``profile`` add the Postgres plan and a Python profile to EXPLAIN.
     """
     query = req.query.strip()
     if not query:
         raise HTTPException(status_code=400, detail="query must be non-empty")
+    stream = req.stream or NDJSON_MEDIA_TYPE in (accept or "")
+    if req.limit is not None and req.limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be >= 1")
+    if not stream and req.limit is not None and req.limit > MAX_CQL_LIMIT:
+        raise HTTPException(
+            status_code=400,
+            detail=f"limit must be <= {MAX_CQL_LIMIT}; use streaming for larger exports",
+        )
+    try:
+        q = parse(query)
+    except CqlSyntaxError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if req.limit is not None:
+        q.limit = req.limit
+    if req.analyze:
+        q.explain = q.analyze = True
+    q.profile = q.profile or req.profile
+    if q.after is not None:
+        try:
+            decode_cursor(q.after)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if stream:
+        return await _stream_cql(q, request)
+    # Keyed on the parsed plan, so formatting variants of one query share a run.
+    key = ("cql", q.plan())
     try:
-        return cql(query)
+        payload = await _admitted(
+            "cql", request, lambda: execute(q), coalesce=(shape_label(q), key)
+        )
+    except HTTPException:
+        raise
     except Exception as exc:  # pragma: no cover - defensive; detailed tests elsewhere
         raise HTTPException(status_code=500, detail=str(exc)) from exc
+    if _fast_json():
+        return FastJSONResponse(payload)
+    return payload
+
+
+async def run_cql_batch(
+    req: CqlBatchRequest, request: Request
+) -> Union[Dict[str, Any], FastJSONResponse]:
+    """Execute several CQL queries in one request.
+
+    Same-shaped queries share a single SQL statement (see
+    cns_py.cql.executor.execute_many). Responses are returned in request order.
+    """
+    if not req.queries:
+        raise HTTPException(status_code=400, detail="queries must be non-empty")
+    if len(req.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(
+            status_code=400, detail=f"at most {MAX_BATCH_QUERIES} queries per batch"
+        )
+    queries = [q.strip() for q in req.queries]
+    if not all(queries):
+        raise HTTPException(status_code=400, detail="query must be non-empty")
+    parsed: List[CqlQuery] = []
+    for idx, query in enumerate(queries):
+        try:
+            parsed.append(parse(query))
+        except CqlSyntaxError as exc:
+            raise HTTPException(status_code=400, detail=f"queries[{idx}]: {exc}") from exc
+    try:
+        payload = {"responses": await _admitted("cql_batch", request, lambda: execute_many(parsed))}
+    except HTTPException:
+        raise
+    except Exception as exc:  # pragma: no cover - defensive; detailed tests elsewhere
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    if _fast_json():
+        return FastJSONResponse(payload)
+    return payload
+
 
+def _node(atom_id: int, info: Tuple[str, str]) -> Dict[str, Any]:
+    return {"id": atom_id, "label": info[0], "kind": info[1]}
 
-def graph_neighborhood(label: str, hops: int = 1, limit: int = 100) -> GraphNeighborhoodResponse:
+
+def _neighborhood_payload(
+    label: str,
+    hops: int,
+    limit: int,
+    cluster_threshold: Optional[int] = None,
+    expand: Sequence[str] = (),
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Build the neighborhood as plain dicts shaped like GraphNeighborhoodResponse.
+
+    Node ids are atom ids, so clients can feed them back to /graph/expand.
+    """
+    ids = nn_search(label, k=limit)
+    if not ids:
+        return {"nodes": [], "edges": []}
+
+    edges_raw, atoms = traverse_ids(ids, hops=hops, predicates=None, limit=limit)
+    collapsed: Dict[Tuple[int, str], int] = {}
+    if cluster_threshold is not None:
+        totals = fanout_counts(sorted({(src, pred) for src, pred, _dst in edges_raw}))
+        edges_raw, collapsed = collapse_fanout(edges_raw, cluster_threshold, expand, totals)
+
+    node_ids = {src for src, _pred, _dst in edges_raw} | {dst for _src, _pred, dst in edges_raw}
+    node_ids |= {src for src, _pred in collapsed}
+    # The central atom, the best label match, is always present, even without outbound
+    # edges or when its label differs from the request (case, partial match).
+    root = ids[0]
+    if root not in atoms:
+        atoms.update(atom_info([root]))
+    if root in atoms:
+        node_ids.add(root)
+
+    nodes = [_node(atom_id, atoms[atom_id]) for atom_id in sorted(node_ids)]
+    graph_edges: List[Dict[str, Any]] = [
+        {"src_id": src, "dst_id": dst, "predicate": pred, "confidence": None}
+        for src, pred, dst in edges_raw
+    ]
+    # One super-node per collapsed (source, predicate) group; negative ids never
+    # collide with atom ids.
+    for idx, ((src, pred), count) in enumerate(sorted(collapsed.items())):
+        node_id = -(idx + 1)
+        nodes.append(
+            {
+                "id": node_id,
+                "label": f"{pred} ({count})",
+                "kind": CLUSTER_KIND,
+                "count": count,
+                "cluster": cluster_key(src, pred),
+            }
+        )
+        graph_edges.append(
+            {"src_id": src, "dst_id": node_id, "predicate": pred, "confidence": None}
+        )
+    return {"nodes": nodes, "edges": graph_edges}
+
+
+async def graph_neighborhood(
+    request: Request,
+    label: str,
+    hops: int = 1,
+    limit: int = 100,
+    cluster_threshold: Optional[int] = None,
+    expand: List[str] = Query(default=[]),
+    accept: Optional[str] = Header(default=None),
+) -> Union[GraphNeighborhoodResponse, Response]:
     """Return a small graph neighborhood for a given atom label.
 
     This is intended as a backend feed for the IB Explorer galaxy view.
     It currently focuses on outgoing edges from the nearest neighbors of the
-    provided label, limited to a small hop count.
+    provided label, limited to a small hop count. Clients that send
+    ``Accept: application/vnd.cns.graph`` get the packed columnar encoding from
+    cns_py.api.graph_codec instead of JSON.
+
+    With ``cluster_threshold`` set, any (source, predicate) fan-out larger than the
+    threshold is collapsed server-side into one ``kind="cluster"`` super-node carrying
+    the neighbor ``count``; pass its ``cluster`` key in ``expand`` to get those
+    neighbors back individually. Payload size then tracks the threshold rather than
+    node degree.
     """
     if not label:
         raise HTTPException(status_code=400, detail="label must be non-empty")
     if hops < 1:
         raise HTTPException(status_code=400, detail="hops must be >= 1")
+    if cluster_threshold is not None and cluster_threshold < 1:
+        raise HTTPException(status_code=400, detail="cluster_threshold must be >= 1")
 
-    ids = nn_search(label, k=limit)
-    if not ids:
-        return GraphNeighborhoodResponse(nodes=[], edges=[])
-
-    # traverse_from returns (src_label, predicate, dst_label)
-    edges_raw = traverse_from(ids, hops=hops, predicates=None, limit=limit)
-
-    # Collect unique labels and assign synthetic integer IDs for Explorer consumption.
-    label_set: set[str] = set()
-    for subj, _pred, obj in edges_raw:
-        label_set.add(subj)
-        label_set.add(obj)
-    # Ensure central label is present even if it has no outbound edges.
-    label_set.add(label)
-
-    nodes: List[GraphNode] = []
-    label_to_id: Dict[str, int] = {}
-    for idx, lbl in enumerate(sorted(label_set)):
-        node_id = idx + 1
-        label_to_id[lbl] = node_id
-        nodes.append(GraphNode(id=node_id, kind=None, label=lbl))
-    graph_edges: List[GraphEdge] = []
-    for subj_label, pred, obj_label in edges_raw:
-        src_id = label_to_id.get(subj_label)
-        dst_id = label_to_id.get(obj_label)
-        if src_id is None or dst_id is None:
-            continue
-        graph_edges.append(GraphEdge(src_id=src_id, dst_id=dst_id, predicate=pred))
-
-    return GraphNeighborhoodResponse(nodes=nodes, edges=graph_edges)
+    key = ("graph", label, hops, limit, cluster_threshold, tuple(sorted(set(expand))))
+    payload = await _admitted(
+        "graph",
+        request,
+        lambda: _neighborhood_payload(label, hops, limit, cluster_threshold, expand),
+        coalesce=(f"hops={hops}", key),
+    )
+    if graph_codec.MEDIA_TYPE in (accept or ""):
+        return Response(
+            content=graph_codec.encode_graph(payload),
+            media_type=graph_codec.MEDIA_TYPE,
+            headers={"Vary": "Accept"},
+        )
+    if _fast_json():
+        # Skip per-node/edge pydantic models; the dicts already have the response shape.
+        return FastJSONResponse(payload)
+    return GraphNeighborhoodResponse.model_validate(payload)
+
+
+def _expand_payload(req: GraphExpandRequest) -> Dict[str, List[Dict[str, Any]]]:
+    frontier = list(req.frontier)
+    if not frontier and req.label:
+        frontier = nn_search(req.label, k=req.limit)
+
+    edges, new_atoms = expand_frontier(frontier, req.known, req.predicates, req.limit)
+    known = set(req.known)
+    unknown_frontier = [i for i in frontier if i not in known]
+    new_atoms.update(atom_info(unknown_frontier))
+    return {
+        "nodes": [_node(atom_id, new_atoms[atom_id]) for atom_id in sorted(new_atoms)],
+        "edges": [
+            {"src_id": src, "dst_id": dst, "predicate": pred, "confidence": None, "id": fid}
+            for fid, src, pred, dst in edges
+        ],
+    }
+
+
+async def graph_expand(
+    req: GraphExpandRequest, request: Request
+) -> Union[GraphNeighborhoodResponse, Response]:
+    """Expand ``frontier`` by one hop and return only the delta.
+
+    Nodes in ``known`` (and the frontier itself, unless the client lacks it) are not
+    sent again, and no fuzzy ``nn_search`` runs when exact frontier ids are given, so
+    the cost tracks the new edges rather than the whole visible graph. Edges carry
+    their fiber ``id`` for client-side dedupe.
+    """
+    if not 1 <= req.limit <= MAX_EXPAND_LIMIT:
+        raise HTTPException(
+            status_code=400, detail=f"limit must be between 1 and {MAX_EXPAND_LIMIT}"
+        )
+    if not req.frontier and not req.label:
+        raise HTTPException(status_code=400, detail="frontier or label is required")
+    payload = await _admitted("graph_expand", request, lambda: _expand_payload(req))
+    if _fast_json():
+        return FastJSONResponse(payload)
+    return GraphNeighborhoodResponse.model_validate(payload)
+
+
+def metrics_endpoint() -> Response:
+    """Prometheus scrape endpoint (text exposition format)."""
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
 
 
 # Register routes imperatively to keep decorators out of mypy's way.
-app.post("/cql")(run_cql)
-app.get("/graph/neighborhood", response_model=GraphNeighborhoodResponse)(graph_neighborhood)
+app.post("/cql", response_model=None)(run_cql)
+app.post("/cql/batch", response_model=None)(run_cql_batch)
+# Exclude unset fields so plain nodes don't carry the cluster-only count/cluster keys.
+app.get(
+    "/graph/neighborhood",
+    response_model=GraphNeighborhoodResponse,
+    response_model_exclude_unset=True,
+)(graph_neighborhood)
+app.post(
+    "/graph/expand",
+    response_model=GraphNeighborhoodResponse,
+    response_model_exclude_unset=True,
+)(graph_expand)
+app.get("/metrics", include_in_schema=False)(metrics_endpoint)
 
 
 def get_app() -> FastAPI:
@@ -0,0 +1,481 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from dateutil.tz import UTC
+
+# Benchmark harness: concurrent workloads, log-bucketed latency histograms, JSON
+# baselines and a compare mode that fails on regressions.
+#
+#   python -m cns_py.bench --concurrency 8 --duration 10 --out bench.json
+#   python -m cns_py.bench --compare bench.json --tolerance 0.10
+#
+# Run it against a dataset loaded with cns_py.demo.synthetic for meaningful numbers.
+# ``--client asyncio`` drives the http_* workloads from one event loop; the others call
+# the library directly and only run on threads.
+
+Op = Callable[[int], None]
+AsyncOp = Callable[[int], Awaitable[None]]
+
+DEFAULT_WORKLOADS = ("cql", "nn_search", "traverse_from", "contradictions", "http_cql")
+# ``ingest`` writes rows, so it only runs when asked for by name.
+ALL_WORKLOADS = DEFAULT_WORKLOADS + ("http_neighborhood", "ingest")
+PERCENTILES = (50.0, 90.0, 95.0, 99.0, 99.9)
+# Latency metrics checked by compare(); throughput is checked in the other direction.
+COMPARED_LATENCIES = ("p50_ms", "p95_ms", "p99_ms")
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram in the spirit of HdrHistogram.
+
+    Values land in buckets whose width is ``precision`` times their magnitude, so
+    every percentile has bounded relative error across microseconds to minutes, memory
+    stays small, and per-thread histograms merge by adding counts.
+    """
+
+    def __init__(self, precision: float = 0.01) -> None:
+        self.precision = precision
+        self._log_base = math.log1p(precision)
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total_us = 0.0
+        self.min_us = math.inf
+        self.max_us = 0.0
+
+    def record(self, seconds: float) -> None:
+        us = max(seconds * 1e6, 1.0)
+        idx = int(math.log(us) / self._log_base)
+        self.counts[idx] = self.counts.get(idx, 0) + 1
+        self.count += 1
+        self.total_us += us
+        self.min_us = min(self.min_us, us)
+        self.max_us = max(self.max_us, us)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for idx, n in other.counts.items():
+            self.counts[idx] = self.counts.get(idx, 0) + n
+        self.count += other.count
+        self.total_us += other.total_us
+        self.min_us = min(self.min_us, other.min_us)
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile_ms(self, p: float) -> float:
+        """Upper edge of the bucket holding the ``p``-th percentile, in milliseconds."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(p / 100.0 * self.count))
+        seen = 0
+        for idx in sorted(self.counts):
+            seen += self.counts[idx]
+            if seen >= rank:
+                upper = math.exp((idx + 1) * self._log_base)
+                return min(upper, self.max_us) / 1000.0
+        return self.max_us / 1000.0  # pragma: no cover - rank <= count
+
+    def summary(self) -> Dict[str, float]:
+        out = {
+            "min_ms": (self.min_us if self.count else 0.0) / 1000.0,
+            "mean_ms": (self.total_us / self.count / 1000.0) if self.count else 0.0,
+            "max_ms": self.max_us / 1000.0,
+        }
+        for p in PERCENTILES:
+            out[f"p{p:g}_ms".replace(".", "")] = self.percentile_ms(p)
+        return out
+
+
+@dataclass
+class RunResult:
+    name: str
+    client: str
+    concurrency: int
+    ops: int = 0
+    errors: int = 0
+    warmup_errors: int = 0
+    seconds: float = 0.0
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "client": self.client,
+            "concurrency": self.concurrency,
+            "ops": self.ops,
+            "errors": self.errors,
+            "warmup_errors": self.warmup_errors,
+            "seconds": round(self.seconds, 3),
+            "throughput_ops_s": self.ops / self.seconds if self.seconds else 0.0,
+            **self.histogram.summary(),
+        }
+
+
+def run_threads(
+    name: str,
+    op: Op,
+    concurrency: int = 1,
+    duration_s: float = 5.0,
+    iterations: Optional[int] = None,
+    warmup: int = 0,
+) -> RunResult:
+    """Call ``op(i)`` from ``concurrency`` threads until the duration or iteration cap.
+
+    Each thread records into its own histogram; they are merged at the end. Warmup
+    calls are not timed, and their failures are counted apart from ``errors``.
+    """
+    result = RunResult(name=name, client="threads", concurrency=concurrency)
+    for i in range(warmup):
+        try:
+            op(i)
+        except Exception:
+            result.warmup_errors += 1
+    counter = itertools.count()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration_s
+
+    def worker() -> None:
+        hist = LatencyHistogram()
+        errors = 0
+        while time.perf_counter() < deadline:
+            i = next(counter)
+            if iterations is not None and i >= iterations:
+                break
+            t0 = time.perf_counter()
+            try:
+                op(i)
+            except Exception:
+                errors += 1
+                continue
+            hist.record(time.perf_counter() - t0)
+        with lock:
+            result.histogram.merge(hist)
+            result.errors += errors
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    t_start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    result.seconds = time.perf_counter() - t_start
+    result.ops = result.histogram.count
+    return result
+
+
+def run_async(
+    name: str,
+    op: AsyncOp,
+    concurrency: int = 1,
+    duration_s: float = 5.0,
+    iterations: Optional[int] = None,
+    warmup: int = 0,
+) -> RunResult:
+    """Like ``run_threads`` with ``concurrency`` asyncio tasks sharing one loop."""
+    result = RunResult(name=name, client="asyncio", concurrency=concurrency)
+
+    async def main() -> None:
+        for i in range(warmup):
+            try:
+                await op(i)
+            except Exception:
+                result.warmup_errors += 1
+        counter = itertools.count()
+        deadline = time.perf_counter() + duration_s
+
+        async def worker() -> None:
+            while time.perf_counter() < deadline:
+                i = next(counter)
+                if iterations is not None and i >= iterations:
+                    break
+                t0 = time.perf_counter()
+                try:
+                    await op(i)
+                except Exception:
+                    result.errors += 1
+                    continue
+                result.histogram.record(time.perf_counter() - t0)
+
+        t_start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        result.seconds = time.perf_counter() - t_start
+
+    asyncio.run(main())
+    result.ops = result.histogram.count
+    return result
+
+
+def sample_subjects(limit: int = 50) -> List[Tuple[int, str]]:
+    """Atoms with the most outgoing fibers, used as workload inputs."""
+    from cns_py.storage.db import get_conn
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT a.id, a.label FROM atoms a JOIN fibers f ON f.src = a.id "
+                "GROUP BY a.id, a.label ORDER BY count(*) DESC, a.id LIMIT %s",
+                (limit,),
+            )
+            return [(int(r[0]), str(r[1])) for r in cur.fetchall()]
+
+
+def _quote(label: str) -> str:
+    return label.replace('"', "")
+
+
+def _cql_query(label: str, i: int) -> str:
+    if i % 2:
+        return f'MATCH label="{_quote(label)}" ASOF 2025-01-01T00:00:00Z RETURN EXPLAIN'
+    return f'MATCH label="{_quote(label)}" LIMIT 100'
+
+
+def build_sync_op(name: str, subjects: Sequence[Tuple[int, str]], http: Any = None) -> Op:
+    """Workload ``name`` as a blocking callable of the iteration number."""
+    from cns_py.cql.contradict import detect_all_contradictions
+    from cns_py.cql.executor import cql
+    from cns_py.graph import traverse_from
+    from cns_py.nn import nn_search
+
+    def pick(i: int) -> Tuple[int, str]:
+        return subjects[i % len(subjects)]
+
+    def run_cql(i: int) -> None:
+        cql(_cql_query(pick(i)[1], i))
+
+    def run_nn(i: int) -> None:
+        nn_search(pick(i)[1], k=10)
+
+    def run_traverse(i: int) -> None:
+        traverse_from([pick(i)[0]], hops=1 + i % 2, limit=1000)
+
+    def run_contradictions(i: int) -> None:
+        detect_all_contradictions(limit=100)
+
+    ops: Dict[str, Op] = {
+        "cql": run_cql,
+        "nn_search": run_nn,
+        "traverse_from": run_traverse,
+        "contradictions": run_contradictions,
+    }
+    if name in ops:
+        return ops[name]
+    if name == "ingest":
+        return _ingest_op()
+    if name in ("http_cql", "http_neighborhood"):
+        if http is None:
+            raise ValueError(f"{name} needs an HTTP client")
+
+        def call(i: int) -> None:
+            resp = _http_request(http, name, pick(i)[1], i)
+            resp.raise_for_status()
+
+        return call
+    raise ValueError(f"unknown workload: {name}")
+
+
+def _http_request(client: Any, name: str, label: str, i: int) -> Any:
+    if name == "http_cql":
+        return client.post("/cql", json={"query": _cql_query(label, i)})
+    return client.get("/graph/neighborhood", params={"label": label, "hops": 1})
+
+
+def _ingest_op() -> Op:
+    from cns_py.demo.ingest import link_with_validity, upsert_atom
+    from cns_py.storage.db import get_conn
+
+    run = datetime.now(tz=UTC).strftime("%Y%m%d%H%M%S")
+
+    def ingest(i: int) -> None:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                src = upsert_atom(cur, "Entity", f"bench-{run}-src-{i % 100}")
+                dst = upsert_atom(cur, "Concept", f"bench-{run}-dst-{i}")
+                link_with_validity(cur, src, dst, "bench_ingest", None, None, belief=0.9)
+
+    return ingest
+
+
+def run_suite(
+    workloads: Sequence[str],
+    concurrency: int,
+    duration_s: float,
+    client: str = "threads",
+    url: Optional[str] = None,
+    warmup: int = 5,
+) -> Dict[str, Any]:
+    """Run each workload in turn and return a baseline-shaped report.
+
+    The asyncio client only drives http_* workloads; asking it for any other is a
+    ``ValueError`` rather than a report whose threaded numbers claim to be asyncio.
+    """
+    if client == "asyncio":
+        unsupported = [name for name in workloads if not name.startswith("http_")]
+        if unsupported:
+            raise ValueError(f"--client asyncio only runs http_* workloads, not {unsupported}")
+    subjects = sample_subjects()
+    if not subjects:
+        raise RuntimeError("no atoms with outgoing fibers; load a dataset first")
+    results: Dict[str, Any] = {}
+    for name in workloads:
+        if name.startswith("http_") and client == "asyncio":
+            results[name] = _run_http_async(
+                name, subjects, concurrency, duration_s, url, warmup=warmup
+            )
+        else:
+            http = _sync_http_client(url) if name.startswith("http_") else None
+            op = build_sync_op(name, subjects, http)
+            results[name] = run_threads(name, op, concurrency, duration_s, warmup=warmup)
+        results[name] = results[name].to_dict()
+    return {
+        "meta": {
+            "created_at": datetime.now(tz=UTC).isoformat(),
+            "concurrency": concurrency,
+            "duration_s": duration_s,
+            "client": client,
+            "url": url,
+            "subjects": len(subjects),
+        },
+        "results": results,
+    }
+
+
+def _sync_http_client(url: Optional[str]) -> Any:
+    if url:
+        import httpx
+
+        return httpx.Client(base_url=url, timeout=60.0)
+    # No server given: drive the ASGI app in-process.
+    from fastapi.testclient import TestClient
+
+    from cns_py.api.server import get_app
+
+    return TestClient(get_app())
+
+
+def _run_http_async(
+    name: str,
+    subjects: Sequence[Tuple[int, str]],
+    concurrency: int,
+    duration_s: float,
+    url: Optional[str],
+    warmup: int = 0,
+) -> RunResult:
+    import httpx
+
+    holder: Dict[str, httpx.AsyncClient] = {}
+
+    async def op(i: int) -> None:
+        if "client" not in holder:
+            if url:
+                holder["client"] = httpx.AsyncClient(base_url=url, timeout=60.0)
+            else:
+                from cns_py.api.server import get_app
+
+                transport = httpx.ASGITransport(app=get_app())
+                holder["client"] = httpx.AsyncClient(transport=transport, base_url="http://cns")
+        label = subjects[i % len(subjects)][1]
+        if name == "http_cql":
+            resp = await holder["client"].post("/cql", json={"query": _cql_query(label, i)})
+        else:
+            resp = await holder["client"].get(
+                "/graph/neighborhood", params={"label": label, "hops": 1}
+            )
+        resp.raise_for_status()
+
+    return run_async(name, op, concurrency, duration_s, warmup=warmup)
+
+
+def compare(
+    baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.10
+) -> List[str]:
+    """Regressions of ``current`` against ``baseline`` beyond ``tolerance``.
+
+    A latency percentile regresses when it grows by more than ``tolerance`` of the
+    baseline; throughput regresses when it drops by more than that. Workloads missing
+    from either side are skipped.
+    """
+    problems: List[str] = []
+    for name, base in baseline.get("results", {}).items():
+        cur = current.get("results", {}).get(name)
+        if cur is None:
+            continue
+        for key in COMPARED_LATENCIES:
+            if base.get(key) and cur.get(key, 0.0) > base[key] * (1.0 + tolerance):
+                problems.append(f"{name} {key}: {base[key]:.2f} -> {cur[key]:.2f}")
+        b_tp, c_tp = base.get("throughput_ops_s", 0.0), cur.get("throughput_ops_s", 0.0)
+        if b_tp and c_tp < b_tp * (1.0 - tolerance):
+            problems.append(f"{name} throughput_ops_s: {b_tp:.1f} -> {c_tp:.1f}")
+        if cur.get("errors", 0) > base.get("errors", 0):
+            problems.append(f"{name} errors: {base.get('errors', 0)} -> {cur['errors']}")
+    return problems
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [
+        f"{'workload':<18}{'ops':>8}{'err':>6}{'ops/s':>10}"
+        f"{'p50':>9}{'p95':>9}{'p99':>9}{'p99.9':>9}{'max':>9}  (ms)"
+    ]
+    for name, r in report["results"].items():
+        lines.append(
+            f"{name:<18}{r['ops']:>8}{r['errors']:>6}{r['throughput_ops_s']:>10.1f}"
+            f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+            f"{r['p999_ms']:>9.2f}{r['max_ms']:>9.2f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser(description="CNS benchmark suite")
+    ap.add_argument(
+        "--workloads",
+        default=",".join(DEFAULT_WORKLOADS),
+        help=f"comma-separated subset of {','.join(ALL_WORKLOADS)}",
+    )
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds per workload")
+    ap.add_argument(
+        "--client",
+        choices=("threads", "asyncio"),
+        default="threads",
+        help="asyncio runs http_* workloads only",
+    )
+    ap.add_argument("--url", help="API base URL for http_* workloads (default: in-process)")
+    ap.add_argument("--out", help="write the JSON report here (use as a baseline)")
+    ap.add_argument("--compare", help="baseline JSON to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.10)
+    args = ap.parse_args(argv)
+
+    workloads = [w.strip() for w in args.workloads.split(",") if w.strip()]
+    unknown = sorted(set(workloads) - set(ALL_WORKLOADS))
+    if unknown:
+        ap.error(f"unknown workloads: {', '.join(unknown)}")
+    if args.client == "asyncio":
+        unsupported = [w for w in workloads if not w.startswith("http_")]
+        if unsupported:
+            ap.error(f"--client asyncio only runs http_* workloads, not {', '.join(unsupported)}")
+
+    report = run_suite(workloads, args.concurrency, args.duration, args.client, args.url)
+    print(format_report(report))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems = compare(baseline, report, args.tolerance)
+        for p in problems:
+            print(f"REGRESSION {p}")
+        if problems:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
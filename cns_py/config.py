@@ -1,12 +1,80 @@
 import os
 
 
-def temporal_predicate() -> str:
+def asof_end_inclusive() -> bool:
+    """Whether ASOF treats valid_to as inclusive (CNS_ASOF_END_INCLUSIVE=1)."""
+    return os.getenv("CNS_ASOF_END_INCLUSIVE", "0") == "1"
+
+
+def temporal_predicate(bound: str = "%(ts_to)s", alias: str = "asp") -> str:
     """Return SQL fragment for end boundary based on config.
-    Uses parameter %(ts_to)s for the upper bound.
+    Uses parameter %(ts_to)s for the upper bound unless another SQL expression is given
+    (batched execution binds the bound to a column of the unnested parameter set).
+    ``alias`` names the aspects row (path patterns join one per edge).
     Default: exclusive end (valid_to > ts_to) with NULL treated as infinity.
     When CNS_ASOF_END_INCLUSIVE=1, use inclusive end (valid_to >= ts_to).
     """
-    inclusive = os.getenv("CNS_ASOF_END_INCLUSIVE", "0") == "1"
-    op = ">=" if inclusive else ">"
-    return f"COALESCE(asp.valid_to,   'infinity'::timestamptz)  {op}  %(ts_to)s"
+    op = ">=" if asof_end_inclusive() else ">"
+    return f"COALESCE({alias}.valid_to,   'infinity'::timestamptz)  {op}  {bound}"
+
+
+def fast_json_enabled() -> bool:
+    """Whether the API should use its fast JSON response path.
+
+    Opt-in via CNS_API_FAST_JSON=1; the path also needs orjson to be installed.
+    """
+    return os.getenv("CNS_API_FAST_JSON", "0") == "1"
+
+
+def singleflight_enabled() -> bool:
+    """Whether concurrent identical API reads share one execution.
+
+    On by default; set CNS_API_SINGLEFLIGHT=0 to run every request independently.
+    """
+    return os.getenv("CNS_API_SINGLEFLIGHT", "1") != "0"
+
+
+def api_max_inflight(endpoint: str) -> int:
+    """Concurrent executions allowed per API endpoint.
+
+    CNS_API_MAX_INFLIGHT_<ENDPOINT> (e.g. ..._CQL, ..._GRAPH) overrides the shared
+    CNS_API_MAX_INFLIGHT default of 8.
+    """
+    default = os.getenv("CNS_API_MAX_INFLIGHT", "8")
+    return max(1, int(os.getenv(f"CNS_API_MAX_INFLIGHT_{endpoint.upper()}", default)))
+
+
+def api_max_queue() -> int:
+    """Requests allowed to wait per endpoint before new ones are shed with 503."""
+    return max(0, int(os.getenv("CNS_API_MAX_QUEUE", "32")))
+
+
+def api_queue_timeout_s() -> float:
+    """Longest a queued request waits for a slot before it is shed."""
+    return float(os.getenv("CNS_API_QUEUE_TIMEOUT_MS", "2000")) / 1000.0
+
+
+def api_deadline_ms() -> int:
+    """Per-request deadline, applied to SQL as statement_timeout; 0 disables it."""
+    return max(0, int(os.getenv("CNS_API_DEADLINE_MS", "30000")))
+
+
+def cost_planner_enabled() -> bool:
+    """Whether CQL picks a driving strategy from table statistics.
+
+    On by default; CNS_PLANNER_COST=0 leaves join order entirely to Postgres.
+    """
+    return os.getenv("CNS_PLANNER_COST", "1") != "0"
+
+
+def current_fibers_enabled() -> bool:
+    """Whether present-time CQL queries read the current_fibers read model.
+
+    On by default; CNS_CQL_CURRENT_FIBERS=0 sends every query to the base tables.
+    """
+    return os.getenv("CNS_CQL_CURRENT_FIBERS", "1") != "0"
+
+
+def planner_stats_ttl_s() -> float:
+    """How long planner statistics read from pg_stats are reused."""
+    return float(os.getenv("CNS_PLANNER_STATS_TTL_S", "60"))
@@ -61,7 +61,9 @@ def detect_fiber_contradictions(
     JOIN atoms a_dst1 ON a_dst1.id = f1.dst
     JOIN atoms a_dst2 ON a_dst2.id = f2.dst
     JOIN aspects asp1 ON asp1.subject_kind='fiber' AND asp1.subject_id=f1.id
+      AND asp1.observed_to IS NULL
     JOIN aspects asp2 ON asp2.subject_kind='fiber' AND asp2.subject_id=f2.id
+      AND asp2.observed_to IS NULL
     WHERE f1.dst != f2.dst
       AND COALESCE(asp1.valid_from, '-infinity'::timestamptz) < 
           COALESCE(asp2.valid_to, 'infinity'::timestamptz)
@@ -161,7 +163,9 @@ def detect_atom_text_contradictions(
     FROM atoms a1
     JOIN atoms a2 ON a1.kind = a2.kind AND a1.label = a2.label AND a1.id < a2.id
     LEFT JOIN aspects asp1 ON asp1.subject_kind='atom' AND asp1.subject_id=a1.id
+      AND asp1.observed_to IS NULL
     LEFT JOIN aspects asp2 ON asp2.subject_kind='atom' AND asp2.subject_id=a2.id
+      AND asp2.observed_to IS NULL
     WHERE a1.text IS NOT NULL 
       AND a2.text IS NOT NULL 
       AND a1.text != a2.text
@@ -1,19 +1,132 @@
 from __future__ import annotations
 
+import base64
+import dataclasses
+import json
 import time
-from dataclasses import asdict
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
 
 from dateutil.parser import isoparse
 
 from cns_py import config as cns_config
+from cns_py import metrics
 from cns_py.storage.db import get_conn
+from cns_py.storage.sources import fetch_sources
 
 from .belief import compute as belief_compute
-from .parser import CqlQuery
+from .parser import DEFAULT_LIMIT, CqlQuery
+from .planner import STRATEGIES, PhysicalPlan, Plan, choose, reads_current, table_stats
+from .profiling import PythonProfile, explain_analyze
 from .types import ExplainReport, ExplainStep, Provenance, ResultItem
 
+# (subject, predicate, object, base belief, observed_at, provenance detail, fiber id,
+# source_ref); the cited source is resolved separately, once per distinct source.
+RawRow = Tuple[str, str, str, float, Optional[datetime], Optional[Dict[str, Any]], int, int]
+
+
+@dataclasses.dataclass(frozen=True)
+class _Columns:
+    """Column expressions of a row source: the base tables or the current_fibers read model."""
+
+    subject: str
+    predicate: str
+    object: str
+    fiber: str
+    # Alias of the row carrying belief, valid_from/valid_to, observed_at and provenance.
+    aspect: str
+
+
+_TABLES = _Columns("a_src.label", "f.predicate", "a_dst.label", "f.id", "asp")
+# Present-time queries (planner strategy "current") read one denormalized row per fiber.
+_CURRENT = _Columns("cf.subject_label", "cf.predicate", "cf.object_label", "cf.fiber_id", "cf")
+
+
+def _columns(strategy: str) -> _Columns:
+    return _CURRENT if strategy == "current" else _TABLES
+
+
+def _select_columns(c: _Columns) -> str:
+    """Shared projection for single and batched execution; batches prepend an ordinal."""
+    return (
+        f"{c.subject} AS subject_label, "
+        f"{c.predicate} AS predicate, "
+        f"{c.object} AS object_label, "
+        f"COALESCE({c.aspect}.belief, 0.0) AS base_confidence, "
+        f"{c.aspect}.observed_at AS observed_at, "
+        f"{c.aspect}.provenance AS provenance_json, "
+        f"{c.fiber} AS fiber_id, "
+        f"{c.aspect}.source_ref AS source_ref "
+    )
+
+
+# ``{version}`` is the transaction-time filter (``_known_predicate``). It sits in the
+# aspects join condition so it reaches the aspects scan, where it prunes partitions.
+_FROM_JOINS = (
+    "FROM fibers f "
+    "JOIN atoms a_src ON a_src.id = f.src "
+    "JOIN atoms a_dst ON a_dst.id = f.dst "
+    "LEFT JOIN aspects asp ON asp.subject_kind='fiber' AND asp.subject_id=f.id AND {version} "
+)
+# FROM clauses per planner strategy, listing tables in the join order the strategy
+# drives (enforced with join_collapse_limit = 1). Validity-first starts from aspects,
+# so fibers without one drop out; they never carry the citations results require.
+_FROM_BY_STRATEGY = {
+    "natural": _FROM_JOINS,
+    "predicate_first": _FROM_JOINS,
+    "label_first": (
+        "FROM atoms a_src "
+        "JOIN fibers f ON f.src = a_src.id "
+        "JOIN atoms a_dst ON a_dst.id = f.dst "
+        "LEFT JOIN aspects asp ON asp.subject_kind='fiber' AND asp.subject_id=f.id AND {version} "
+    ),
+    "validity_first": (
+        "FROM aspects asp "
+        "JOIN fibers f ON asp.subject_kind='fiber' AND asp.subject_id=f.id AND {version} "
+        "JOIN atoms a_src ON a_src.id = f.src "
+        "JOIN atoms a_dst ON a_dst.id = f.dst "
+    ),
+}
+
+
+def _order_by(c: _Columns) -> str:
+    """(base belief, fiber id) is the keyset that continuation cursors resume from."""
+    return f"ORDER BY COALESCE({c.aspect}.belief, 0.0) DESC, {c.fiber} DESC "
+
+
+def _cited(aspect: str) -> str:
+    """The citations contract: only facts citing a source are returned or counted.
+
+    Applied in SQL to every query, so LIMIT counts cited rows only and uncited ones are
+    never fetched. The partial ``*_cited`` indexes (storage.db) share this predicate.
+    """
+    return f"{aspect}.source_ref IS NOT NULL"
+
+
+def _triple(c: _Columns) -> str:
+    return f"{c.subject}, {c.predicate}, {c.object}"
+
+
+def _group_column(c: _Columns, key: str) -> str:
+    """Column a GROUP BY key (parser.GROUP_KEYS) groups on."""
+    return {"predicate": c.predicate, "object": c.object}[key]
+
+
+Shape = Tuple[bool, bool, bool, bool, bool, bool]
+
+# Batch columns (name, SQL array type) for each filter slot, in `_query_shape` order.
+_BATCH_SLOTS: Tuple[Tuple[Tuple[str, str], ...], ...] = (
+    (("label", "text[]"),),
+    (("predicate", "text[]"),),
+    (("ts", "timestamptz[]"),),
+    (("belief_ge", "float8[]"),),
+    (("after_belief", "float8[]"), ("after_fiber", "int8[]")),
+    (("known", "timestamptz[]"),),
+)
+
+# Rows fetched per round trip when streaming from a server-side cursor.
+STREAM_FETCH_ROWS = 500
+
 
 def _asof_bounds(asof_iso: Optional[str]) -> Tuple[Optional[datetime], Optional[datetime]]:
     if not asof_iso:
@@ -22,11 +135,147 @@ def _asof_bounds(asof_iso: Optional[str]) -> Tuple[Optional[datetime], Optional[
     return ts, ts
 
 
-def execute(q: CqlQuery) -> Dict[str, Any]:
-    steps: List[ExplainStep] = []
-    t0 = time.perf_counter()
+def encode_cursor(base_belief: float, fiber_id: int) -> str:
+    """Encode the keyset position of a row as an opaque, URL-safe continuation token."""
+    raw = json.dumps([float(base_belief), int(fiber_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[float, int]:
+    """Inverse of ``encode_cursor``; raises ValueError for malformed tokens."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        belief, fiber_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return float(belief), int(fiber_id)
+    except Exception as exc:
+        raise ValueError(f"invalid continuation token: {token!r}") from exc
+
+
+def _query_shape(q: CqlQuery) -> Shape:
+    """Which filters a query uses; queries with the same shape share one SQL statement."""
+    return (
+        q.label is not None,
+        q.predicate is not None,
+        bool(q.asof_iso),
+        q.belief_ge is not None,
+        q.after is not None,
+        bool(q.known_iso),
+    )
+
+
+_SHAPE_NAMES = ("label", "predicate", "asof", "belief", "after", "known")
+
+
+def shape_label(q: CqlQuery) -> str:
+    """Metrics label for a query's shape, e.g. ``"label+predicate+asof"`` or ``"path2+asof"``."""
+    used = [name for name, on in zip(_SHAPE_NAMES, _query_shape(q)) if on]
+    if q.path is not None:
+        used.insert(0, f"path{len(q.path.edges)}")
+    if q.distinct:
+        used.append("distinct")
+    if q.count:
+        used.append("count")
+    return "+".join(used) or "scan"
+
+
+def _row_limit(q: CqlQuery) -> Optional[int]:
+    """Rows (or groups) asked for: TOP k if given, else LIMIT."""
+    return q.top if q.top is not None else q.limit
+
+
+def _batchable(q: CqlQuery) -> bool:
+    """Whether ``q`` compiles to the plain row statement that ``_batch_sql`` shares."""
+    return q.path is None and not q.count and not q.distinct and q.top is None
+
+
+def _record_metrics(q: CqlQuery, steps: Sequence[ExplainStep], rows: int) -> None:
+    shape = shape_label(q)
+    for step in steps:
+        metrics.STAGE_SECONDS.observe(step.ms / 1000.0, stage=step.name, shape=shape)
+    metrics.ROWS_RETURNED.observe(rows, shape=shape)
+
+
+def _where_clauses(shape: Shape, refs: Mapping[str, str], c: _Columns = _TABLES) -> List[str]:
+    """Build WHERE clauses for a query shape over the row source ``c``.
+
+    ``refs`` maps each filter slot (label, predicate, ts_from, ts_to, belief_ge,
+    after_belief, after_fiber, known) to the SQL expression supplying its value: a named
+    placeholder for single queries, or a column of the unnested parameter set for batches.
+    ASOF KNOWN is applied in the FROM clause (``_from_clause``).
+    """
+    has_label, has_predicate, has_asof, has_belief, has_after, _has_known = shape
+    asp = c.aspect
+    clauses: List[str] = [_cited(asp)]
+    if has_label:
+        clauses.append(f"{c.subject} = {refs['label']}")
+    if has_predicate:
+        clauses.append(f"{c.predicate} = {refs['predicate']}")
+    if has_asof:
+        clauses.append(f"COALESCE({asp}.valid_from, '-infinity'::timestamptz) <= {refs['ts_from']}")
+        # Configurable end boundary predicate
+        clauses.append(cns_config.temporal_predicate(refs["ts_to"], alias=asp))
+    if has_belief:
+        clauses.append(f"COALESCE({asp}.belief, 0.0) >= {refs['belief_ge']}")
+    if has_after:
+        # Keyset continuation: strictly after the last row of the previous page. The
+        # cursor holds belief as decoded from Postgres' shortest text form, so cast it
+        # back to real to compare against the stored value exactly.
+        clauses.append(
+            f"(COALESCE({asp}.belief, 0.0), {c.fiber}) < "
+            f"(({refs['after_belief']})::real, {refs['after_fiber']})"
+        )
+    return clauses
+
+
+def _known_predicate(alias: str, known: Optional[str]) -> str:
+    """Transaction-time filter: the version recorded at ``known``, or the current one.
+
+    ``observed_to`` is compared directly rather than through COALESCE so that, with
+    partitioned aspects (``storage.partitions``), current reads only touch the current
+    partition and ASOF KNOWN skips history partitions closed before ``known``.
+    """
+    if known is None:
+        return f"{alias}.observed_to IS NULL"
+    return (
+        f"({alias}.observed_to IS NULL OR {alias}.observed_to > {known}) "
+        f"AND COALESCE({alias}.observed_at, '-infinity'::timestamptz) <= {known}"
+    )
+
+
+def _from_clause(strategy: str, known: Optional[str]) -> str:
+    """FROM clause for ``strategy`` reading the aspect versions visible at ``known``.
+
+    The current_fibers read model only holds current versions, so it serves no ASOF KNOWN.
+    """
+    if strategy == "current":
+        assert known is None
+        return "FROM current_fibers cf "
+    return _FROM_BY_STRATEGY[strategy].format(version=_known_predicate("asp", known))
 
-    # Planner step (simple heuristic estimates for now)
+
+def _routed(plan: Plan, strategy: str, batched: bool = False) -> str:
+    """The strategy a query actually runs with, given the cost planner's choice."""
+    if reads_current(plan):
+        return "current"
+    return "natural" if batched else strategy
+
+
+def _planner_step(q: CqlQuery, batched: bool = False) -> Tuple[ExplainStep, PhysicalPlan]:
+    """Cost-based plan for ``q`` as an EXPLAIN step.
+
+    Present-time queries are routed to current_fibers (strategy "current"). Other
+    batched statements cover many queries and are left to Postgres, so their plans
+    report the natural strategy. Callers add ``actual_rows`` after execution.
+    """
+    t0 = time.perf_counter()
+    plan = q.plan()
+    physical = choose(plan, table_stats())
+    strategy = _routed(plan, physical.strategy, batched)
+    if strategy != physical.strategy:
+        index, join_order = STRATEGIES[strategy]
+        physical = dataclasses.replace(
+            physical, strategy=strategy, index=index, join_order=join_order
+        )
     plan_extra: Dict[str, Any] = {}
     if q.label:
         plan_extra["label"] = q.label
@@ -34,12 +283,182 @@ def execute(q: CqlQuery) -> Dict[str, Any]:
         plan_extra["predicate"] = q.predicate
     if q.asof_iso:
         plan_extra["asof"] = q.asof_iso
+    if q.known_iso:
+        plan_extra["known"] = q.known_iso
     if q.belief_ge is not None:
         plan_extra["belief_ge"] = q.belief_ge
-    # naive estimates
-    plan_extra["est_base"] = 1 if q.label else 10
-    plan_extra["est_fanout"] = 2 if q.predicate else 5
-    steps.append(ExplainStep(name="planner", ms=0.0, extra=plan_extra))
+    if q.path is not None:
+        plan_extra["hops"] = len(q.path.edges)
+    if q.count:
+        plan_extra["aggregate"] = "count" + (f" by {q.group_by}" if q.group_by else "")
+    plan_extra["est_base"] = round(physical.est_base, 2)
+    plan_extra["est_fanout"] = round(physical.est_fanout, 2)
+    plan_extra.update(physical.extra())
+    ms = (time.perf_counter() - t0) * 1000.0
+    return ExplainStep(name="planner", ms=ms, extra=plan_extra), physical
+
+
+def _row_to_raw(row: Sequence[Any]) -> RawRow:
+    subj, pred, obj, base_conf, observed_at, prov_json, fiber_id, source_ref = row
+    return (
+        subj,
+        pred,
+        obj,
+        float(base_conf or 0.0),
+        observed_at,
+        prov_json,
+        int(fiber_id),
+        int(source_ref),
+    )
+
+
+def _source_refs(raw_rows: Iterable[RawRow]) -> Set[int]:
+    return {raw[7] for raw in raw_rows}
+
+
+class _BeliefAccumulator:
+    """Aggregates belief_compute EXPLAIN metrics as rows are scored.
+
+    ``sources`` maps source_ref to its ``sources`` row (``storage.sources.fetch_sources``)
+    and must cover the rows scored, which are all cited (``_cited``). Per-fiber term
+    breakdowns are optional so streaming execution stays constant-memory.
+    """
+
+    def __init__(
+        self, keep_terms: bool = True, sources: Optional[Dict[int, Dict[str, Any]]] = None
+    ) -> None:
+        self.sources: Dict[int, Dict[str, Any]] = sources if sources is not None else {}
+        self.items = 0
+        self._sum_base = 0.0
+        self._sum_conf = 0.0
+        self._sum_rec = 0.0
+        self._keep_terms = keep_terms
+        self.belief_terms: Dict[int, Dict[str, Any]] = {}
+
+    def score(self, raw: RawRow) -> ResultItem:
+        """Return the scored result for a row, citing its source."""
+        subj, pred, obj, base_conf, observed_at, prov_json, fiber_id, source_ref = raw
+        source = self.sources[source_ref]
+        conf, details = belief_compute(base_conf, observed_at)
+        self.items += 1
+        self._sum_base += float(base_conf or 0.0)
+        self._sum_conf += float(conf)
+        self._sum_rec += float(details.get("recency", 0.0))
+        if self._keep_terms:
+            # record terms breakdown by fiber_id
+            self.belief_terms[fiber_id] = {
+                "before": float(base_conf or 0.0),
+                "after": float(conf),
+                "terms": dict(details),
+            }
+        detail: Dict[str, Any] = prov_json if isinstance(prov_json, dict) else {}
+        prov: List[Provenance] = [
+            Provenance(
+                source_id=source["source_id"] or f"fiber:{fiber_id}",
+                uri=source["uri"],
+                line_span=detail.get("line_span"),
+                fetched_at=source["fetched_at"],
+                hash=source["hash"],
+            )
+        ]
+        return ResultItem(
+            subject_label=subj,
+            predicate=pred,
+            object_label=obj,
+            confidence=conf,
+            provenance=prov,
+            belief_details=details,
+        )
+
+    def extra(self) -> Dict[str, Any]:
+        extra: Dict[str, Any] = {"items": self.items}
+        if self._keep_terms:
+            extra["belief_terms"] = self.belief_terms
+        if self.items > 0:
+            extra.update(
+                {
+                    "avg_base_belief": self._sum_base / self.items,
+                    "avg_confidence": self._sum_conf / self.items,
+                    "avg_recency": self._sum_rec / self.items,
+                }
+            )
+        return extra
+
+
+# Payloads are built field by field rather than with dataclasses.asdict: asdict
+# deep-copies recursively (including EXPLAIN extras) and shows up in API profiles.
+def _provenance_dict(p: Provenance) -> Dict[str, Any]:
+    return {
+        "source_id": p.source_id,
+        "uri": p.uri,
+        "line_span": p.line_span,
+        "fetched_at": p.fetched_at,
+        "hash": p.hash,
+    }
+
+
+def _result_dict(r: ResultItem) -> Dict[str, Any]:
+    return {
+        "subject_label": r.subject_label,
+        "predicate": r.predicate,
+        "object_label": r.object_label,
+        "confidence": r.confidence,
+        "provenance": [_provenance_dict(p) for p in r.provenance],
+    }
+
+
+def _explain_dict(steps: List[ExplainStep], t0: float) -> Dict[str, Any]:
+    total_ms = (time.perf_counter() - t0) * 1000.0
+    report = ExplainReport(steps=steps, total_ms=total_ms)
+    return {
+        "total_ms": report.total_ms,
+        "steps": [{"name": s.name, "ms": s.ms, "extra": s.extra} for s in report.steps],
+    }
+
+
+def _finalize(
+    q: CqlQuery,
+    raw_rows: List[RawRow],
+    steps: List[ExplainStep],
+    t0: float,
+    sources: Dict[int, Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Run belief compute, then shape the response payload."""
+    # Belief compute step (aggregate) with timing
+    t_bel0 = time.perf_counter()
+    acc = _BeliefAccumulator(sources=sources)
+    results = [acc.score(raw) for raw in raw_rows]
+    t_bel1 = time.perf_counter()
+    steps.append(
+        ExplainStep(name="belief_compute", ms=(t_bel1 - t_bel0) * 1000.0, extra=acc.extra())
+    )
+    _record_metrics(q, steps, len(raw_rows))
+
+    payload: Dict[str, Any] = {"results": [_result_dict(r) for r in results]}
+    # A full page may have more rows behind it; the cursor comes from its last row. TOP
+    # and DISTINCT results are not paged.
+    limit = q.limit if q.limit is not None else DEFAULT_LIMIT
+    if raw_rows and len(raw_rows) >= limit and q.top is None and not q.distinct:
+        payload["next_cursor"] = encode_cursor(raw_rows[-1][3], raw_rows[-1][6])
+    if q.explain:
+        payload["explain"] = _explain_dict(steps, t0)
+    return payload
+
+
+def _mask_extra(q: CqlQuery) -> Dict[str, Any]:
+    extra: Dict[str, Any] = {"asof": q.asof_iso}
+    if q.known_iso:
+        extra["known"] = q.known_iso
+    return extra
+
+
+def _prelude_steps(q: CqlQuery) -> Tuple[List[ExplainStep], Optional[datetime], PhysicalPlan]:
+    """Planner, ANN shortlist and temporal mask steps.
+
+    Returns the steps, the ASOF bound and the chosen physical plan.
+    """
+    planner_step, physical = _planner_step(q)
+    steps: List[ExplainStep] = [planner_step]
 
     # Step 1: ANN shortlist (placeholder for Phase 1; 0ms)
     t_ann0 = time.perf_counter()
@@ -49,192 +468,542 @@ def execute(q: CqlQuery) -> Dict[str, Any]:
 
     # Step 2: temporal mask bounds
     t_mask0 = time.perf_counter()
-    ts_from, ts_to = _asof_bounds(q.asof_iso)
+    ts_from, _ts_to = _asof_bounds(q.asof_iso)
     t_mask1 = time.perf_counter()
     steps.append(
-        ExplainStep(
-            name="temporal_mask", ms=(t_mask1 - t_mask0) * 1000.0, extra={"asof": q.asof_iso}
-        )
+        ExplainStep(name="temporal_mask", ms=(t_mask1 - t_mask0) * 1000.0, extra=_mask_extra(q))
     )
+    return steps, ts_from, physical
 
-    # Step 3: graph traverse and filters
-    t_trav0 = time.perf_counter()
-    base_select = (
-        "SELECT a_src.label AS subject_label, "
-        "f.predicate AS predicate, "
-        "a_dst.label AS object_label, "
-        "COALESCE(asp.belief, 0.0) AS base_confidence, "
-        "asp.observed_at AS observed_at, "
-        "asp.provenance AS provenance_json, "
-        "f.id AS fiber_id "
-        "FROM fibers f "
-        "JOIN atoms a_src ON a_src.id = f.src "
-        "JOIN atoms a_dst ON a_dst.id = f.dst "
-        "LEFT JOIN aspects asp ON asp.subject_kind='fiber' AND asp.subject_id=f.id "
-    )
-    where_clauses: list[str] = []
-    params: dict[str, object] = {}
 
+def _single_filters(
+    q: CqlQuery, ts: Optional[datetime], c: _Columns = _TABLES
+) -> Tuple[List[str], Dict[str, object]]:
+    """WHERE clauses and their parameters for one query (row or aggregate)."""
+    where_clauses = _where_clauses(
+        _query_shape(q),
+        {
+            "label": "%(label)s",
+            "predicate": "%(predicate)s",
+            "ts_from": "%(ts_from)s",
+            "ts_to": "%(ts_to)s",
+            "belief_ge": "%(belief_ge)s",
+            "after_belief": "%(after_belief)s",
+            "after_fiber": "%(after_fiber)s",
+        },
+        c,
+    )
+    params: Dict[str, object] = {}
     if q.label is not None:
-        where_clauses.append("a_src.label = %(label)s")
         params["label"] = q.label
     if q.predicate is not None:
-        where_clauses.append("f.predicate = %(predicate)s")
         params["predicate"] = q.predicate
-    if ts_from is not None:
-        where_clauses.append("COALESCE(asp.valid_from, '-infinity'::timestamptz) <= %(ts_from)s")
-        params["ts_from"] = ts_from
-        # Configurable end boundary predicate
-        end_pred = cns_config.temporal_predicate()
-        where_clauses.append(end_pred)
-        params["ts_to"] = ts_to
+    if ts is not None:
+        params["ts_from"] = ts
+        params["ts_to"] = ts
     if q.belief_ge is not None:
-        where_clauses.append("COALESCE(asp.belief, 0.0) >= %(belief_ge)s")
         params["belief_ge"] = q.belief_ge
+    if q.after is not None:
+        params["after_belief"], params["after_fiber"] = decode_cursor(q.after)
+    if q.known_iso:
+        params["known"] = isoparse(q.known_iso)
+    return where_clauses, params
+
+
+def _single_sql(
+    q: CqlQuery, ts: Optional[datetime], limit: Optional[int], strategy: str = "natural"
+) -> Tuple[str, Dict[str, object]]:
+    c = _columns(strategy)
+    where_clauses, params = _single_filters(q, ts, c)
+    from_clause = _from_clause(strategy, "%(known)s" if q.known_iso else None)
+    # LIMIT NULL is "no limit" in Postgres, so an unbounded query binds None.
+    params["limit"] = limit
+    where = "WHERE " + " AND ".join(where_clauses) + " "
+    if q.distinct:
+        # Keep the highest-belief cited fiber of each triple, then rank as usual.
+        inner = (
+            f"SELECT DISTINCT ON ({_triple(c)}) "
+            + _select_columns(c)
+            + from_clause
+            + where
+            + f"ORDER BY {_triple(c)}, COALESCE({c.aspect}.belief, 0.0) DESC, {c.fiber} DESC"
+        )
+        sql = (
+            f"SELECT * FROM ({inner}) d "
+            "ORDER BY d.base_confidence DESC, d.fiber_id DESC LIMIT %(limit)s"
+        )
+        return sql, params
+    sql = "SELECT " + _select_columns(c) + from_clause + where
+    sql += _order_by(c) + "LIMIT %(limit)s"
+    return sql, params
+
 
-    sql = base_select
-    if where_clauses:
-        sql += "WHERE " + " AND ".join(where_clauses) + " "
-    sql += "ORDER BY COALESCE(asp.belief, 0.0) DESC LIMIT 100"
+def _aggregate_sql(
+    q: CqlQuery, ts: Optional[datetime], limit: int, strategy: str = "natural"
+) -> Tuple[str, Dict[str, object]]:
+    """Compile ``RETURN COUNT`` (optionally GROUP BY / DISTINCT / TOP) into one statement.
 
-    results: List[ResultItem] = []
-    raw_rows: List[
-        Tuple[str, str, str, float, Optional[datetime], Optional[Dict[str, Any]], int]
-    ] = []
+    Only cited rows are counted. Groups are ranked by count, or with TOP by their best
+    base belief; either way ``limit`` caps the number of groups.
+    """
+    c = _columns(strategy)
+    where_clauses, params = _single_filters(q, ts, c)
+    from_clause = _from_clause(strategy, "%(known)s" if q.known_iso else None)
+    measure = f"count(DISTINCT ({_triple(c)}))" if q.distinct else "count(*)"
+    where = "WHERE " + " AND ".join(where_clauses) + " "
+    if q.group_by is None:
+        return f"SELECT {measure} " + from_clause + where, params
+    key = _group_column(c, q.group_by)
+    order = "max_belief DESC, n DESC" if q.top is not None else "n DESC, max_belief DESC"
+    params["limit"] = limit
+    sql = (
+        f"SELECT {key} AS group_key, {measure} AS n, "
+        f"max(COALESCE({c.aspect}.belief, 0.0)) AS max_belief "
+        + from_clause
+        + where
+        + f"GROUP BY {key} ORDER BY {order}, group_key LIMIT %(limit)s"
+    )
+    return sql, params
+
+
+def _execute_aggregate(
+    q: CqlQuery,
+    steps: List[ExplainStep],
+    ts: Optional[datetime],
+    physical: PhysicalPlan,
+    t0: float,
+) -> Dict[str, Any]:
+    """Run a COUNT query; results are ``{"count": n}`` or one item per group."""
+    t_trav0 = time.perf_counter()
+    limit = _row_limit(q) or DEFAULT_LIMIT
+    sql, params = _aggregate_sql(q, ts, limit, physical.strategy)
     with get_conn() as conn:
+        _apply_strategy(conn, physical)
         with conn.cursor() as cur:
-            # Debug: Test if the query works without temporal filter
-            if q.label == "FrameworkX" and q.asof_iso:
-                test_sql = (
-                    base_select + "WHERE a_src.label = %(label)s AND f.predicate = %(predicate)s"
-                )
-                test_params = {"label": q.label, "predicate": q.predicate}
-                print(f"[CQL DEBUG] Test SQL: {test_sql}")
-                print(f"[CQL DEBUG] Test params: {test_params}")
-                cur.execute(test_sql, test_params)
-                test_rows = cur.fetchall()
-                print(f"[CQL DEBUG] Without temporal filter: {len(test_rows)} rows")
-                for row in test_rows:
-                    print(f"  Row: {row}")
-
-            # Debug: print SQL and params to diagnose empty results
-            print(f"[CQL DEBUG] SQL: {sql}")
-            print(f"[CQL DEBUG] Params: {params}")
-            try:
-                cur.execute(sql, params)
-            except Exception:
-                # Debug output to help diagnose SQL/params issues during early Phase 1
-                debug = {
-                    "sql": sql,
-                    "params": {k: (str(v) if v is not None else None) for k, v in params.items()},
-                }
-                print("[CQL DEBUG] execute failed:", debug)
-                raise
+            t_db0 = time.perf_counter()
+            cur.execute(sql, params)
             rows = cur.fetchall()
-            print(f"[CQL DEBUG] Rows returned: {len(rows)}")
-            for row in rows:
-                subj, pred, obj, base_conf, observed_at, prov_json, fiber_id = row
-                raw_rows.append(
-                    (
-                        subj,
-                        pred,
-                        obj,
-                        float(base_conf or 0.0),
-                        observed_at,
-                        prov_json,
-                        int(fiber_id),
-                    )
-                )
+            metrics.DB_ROUNDTRIP_SECONDS.observe(time.perf_counter() - t_db0, op="cql_aggregate")
+            t_trav1 = time.perf_counter()
+            extra: Dict[str, Any] = {"rows": len(rows)}
+            if q.analyze:
+                extra["pg"] = _analyze(cur, sql, params)
+    steps.append(ExplainStep(name="graph_traverse", ms=(t_trav1 - t_trav0) * 1000.0, extra=extra))
+    steps[0].extra["actual_rows"] = len(rows)
+    _record_metrics(q, steps, len(rows))
 
-    t_trav1 = time.perf_counter()
-    steps.append(
-        ExplainStep(
-            name="graph_traverse", ms=(t_trav1 - t_trav0) * 1000.0, extra={"rows": len(results)}
-        )
-    )
+    results: List[Dict[str, Any]]
+    if q.group_by is None:
+        results = [{"count": int(rows[0][0])}]
+    else:
+        results = [
+            {q.group_by: key, "count": int(n), "max_belief": float(best)} for key, n, best in rows
+        ]
+    payload: Dict[str, Any] = {"results": results}
+    if q.explain:
+        payload["explain"] = _explain_dict(steps, t0)
+    return payload
 
-    # Belief compute step (aggregate) with timing and citations enforcement
-    t_bel0 = time.perf_counter()
-    belief_items = 0
-    _sum_base = 0.0
-    _sum_conf = 0.0
-    _sum_rec = 0.0
-    belief_terms: Dict[int, Dict[str, Any]] = {}
-    for subj, pred, obj, base_conf, observed_at, prov_json, fiber_id in raw_rows:
-        # Enforce citations: require provenance JSON dict with at least one informative field
-        has_citation = isinstance(prov_json, dict) and (
-            bool(prov_json.get("source_id")) or bool(prov_json.get("uri"))
-        )
-        if not has_citation:
-            continue
-        conf, details = belief_compute(base_conf, observed_at)
-        belief_items += 1
-        _sum_base += float(base_conf or 0.0)
-        _sum_conf += float(conf)
-        _sum_rec += float(details.get("recency", 0.0))
-        # record terms breakdown by fiber_id
-        belief_terms[fiber_id] = {
-            "before": float(base_conf or 0.0),
-            "after": float(conf),
-            "terms": dict(details),
-        }
-        prov_dict: Dict[str, Any] = prov_json if isinstance(prov_json, dict) else {}
-        prov: List[Provenance] = [
-            Provenance(
-                source_id=prov_dict.get("source_id") or f"fiber:{fiber_id}",
-                uri=prov_dict.get("uri"),
-                line_span=prov_dict.get("line_span"),
-                fetched_at=prov_dict.get("fetched_at"),
-                hash=prov_dict.get("hash"),
-            )
+
+def _path_sql(
+    q: CqlQuery, ts: Optional[datetime], limit: Optional[int]
+) -> Tuple[str, Dict[str, object]]:
+    """Compile a path pattern into one statement joining atoms n0..nk through fibers f1..fk.
+
+    Each hop brings its own aspects row (asp1..aspk), and the ASOF, ASOF KNOWN and BELIEF
+    filters and the citations contract apply to every one of them. A variable used on
+    several nodes binds them to the same atom. Paths are ranked by the product of their
+    edges' base beliefs.
+    """
+    assert q.path is not None
+    nodes, edges = q.path.nodes, q.path.edges
+    columns = ["n0.label"]
+    joins = ["FROM atoms n0"]
+    clauses: List[str] = []
+    params: Dict[str, object] = {"limit": limit}
+    if ts is not None:
+        params["ts"] = ts
+    if q.belief_ge is not None:
+        params["belief_ge"] = q.belief_ge
+    if q.known_iso:
+        params["known"] = isoparse(q.known_iso)
+    for i, edge in enumerate(edges, start=1):
+        columns += [
+            f"f{i}.predicate",
+            f"n{i}.label",
+            f"COALESCE(asp{i}.belief, 0.0)",
+            f"asp{i}.observed_at",
+            f"asp{i}.provenance",
+            f"f{i}.id",
+            f"asp{i}.source_ref",
+        ]
+        joins += [
+            f"JOIN fibers f{i} ON f{i}.src = n{i - 1}.id",
+            f"JOIN atoms n{i} ON n{i}.id = f{i}.dst",
+            f"LEFT JOIN aspects asp{i} "
+            f"ON asp{i}.subject_kind='fiber' AND asp{i}.subject_id=f{i}.id AND "
+            + _known_predicate(f"asp{i}", "%(known)s" if q.known_iso else None),
         ]
+        if edge.predicate is not None:
+            params[f"predicate{i}"] = edge.predicate
+            clauses.append(f"f{i}.predicate = %(predicate{i})s")
+        if ts is not None:
+            clauses.append(f"COALESCE(asp{i}.valid_from, '-infinity'::timestamptz) <= %(ts)s")
+            clauses.append(cns_config.temporal_predicate("%(ts)s", alias=f"asp{i}"))
+        if q.belief_ge is not None:
+            clauses.append(f"COALESCE(asp{i}.belief, 0.0) >= %(belief_ge)s")
+        clauses.append(_cited(f"asp{i}"))
+    first_use: Dict[str, int] = {}
+    for i, node in enumerate(nodes):
+        if node.label is not None:
+            params[f"label{i}"] = node.label
+            clauses.append(f"n{i}.label = %(label{i})s")
+        if node.var is not None:
+            if node.var in first_use:
+                clauses.append(f"n{i}.id = n{first_use[node.var]}.id")
+            else:
+                first_use[node.var] = i
+
+    score = " * ".join(f"COALESCE(asp{i}.belief, 0.0)" for i in range(1, len(edges) + 1))
+    order = ", ".join([f"{score} DESC"] + [f"f{i}.id DESC" for i in range(1, len(edges) + 1)])
+    sql = f"SELECT {', '.join(columns)} {' '.join(joins)} "
+    sql += "WHERE " + " AND ".join(clauses) + " "
+    sql += f"ORDER BY {order} LIMIT %(limit)s"
+    return sql, params
+
+
+def _execute_path(
+    q: CqlQuery, steps: List[ExplainStep], ts: Optional[datetime], t0: float
+) -> Dict[str, Any]:
+    """Run a path pattern as a single statement and score it edge by edge.
+
+    SQL only returns paths whose every edge is cited; a path's confidence is the product
+    of the edges' computed confidences.
+    """
+    assert q.path is not None
+    hops = len(q.path.edges)
+    t_trav0 = time.perf_counter()
+    limit = q.limit if q.limit is not None else DEFAULT_LIMIT
+    sql, params = _path_sql(q, ts, limit)
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            t_db0 = time.perf_counter()
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+            refs = {row[7 + 7 * i] for row in rows for i in range(hops)}
+            sources = fetch_sources(cur, refs)
+            metrics.DB_ROUNDTRIP_SECONDS.observe(time.perf_counter() - t_db0, op="cql_path")
+            t_trav1 = time.perf_counter()
+            extra: Dict[str, Any] = {"rows": len(rows), "hops": hops}
+            if q.analyze:
+                extra["pg"] = _analyze(cur, sql, params)
+    steps.append(ExplainStep(name="graph_traverse", ms=(t_trav1 - t_trav0) * 1000.0, extra=extra))
+    steps[0].extra["actual_rows"] = len(rows)
+
+    t_bel0 = time.perf_counter()
+    acc = _BeliefAccumulator(sources=sources)
+    results: List[Dict[str, Any]] = []
+    for row in rows:
+        labels = [row[0]]
+        items: List[ResultItem] = []
+        for i in range(hops):
+            raw = _row_to_raw((labels[-1],) + tuple(row[1 + 7 * i : 8 + 7 * i]))
+            labels.append(raw[2])
+            items.append(acc.score(raw))
+        confidence = 1.0
+        for item in items:
+            confidence *= item.confidence or 0.0
         results.append(
-            ResultItem(
-                subject_label=subj,
-                predicate=pred,
-                object_label=obj,
-                confidence=conf,
-                provenance=prov,
-                belief_details=details,
-            )
-        )
-    t_bel1 = time.perf_counter()
-    extra: Dict[str, Any] = {"items": belief_items, "belief_terms": belief_terms}
-    if belief_items > 0:
-        extra.update(
             {
-                "avg_base_belief": _sum_base / belief_items,
-                "avg_confidence": _sum_conf / belief_items,
-                "avg_recency": _sum_rec / belief_items,
+                "nodes": labels,
+                "edges": [_result_dict(item) for item in items],
+                "confidence": confidence,
             }
         )
-    steps.append(ExplainStep(name="belief_compute", ms=(t_bel1 - t_bel0) * 1000.0, extra=extra))
-
-    total_ms = (time.perf_counter() - t0) * 1000.0
-    report = ExplainReport(steps=steps, total_ms=total_ms)
+    steps.append(
+        ExplainStep(
+            name="belief_compute", ms=(time.perf_counter() - t_bel0) * 1000.0, extra=acc.extra()
+        )
+    )
+    _record_metrics(q, steps, len(rows))
 
-    payload: Dict[str, Any] = {
-        "results": [
-            {
-                "subject_label": r.subject_label,
-                "predicate": r.predicate,
-                "object_label": r.object_label,
-                "confidence": r.confidence,
-                "provenance": [asdict(p) for p in r.provenance],
-            }
-            for r in results
-        ]
-    }
+    payload: Dict[str, Any] = {"results": results}
     if q.explain:
-        payload["explain"] = {
-            "total_ms": report.total_ms,
-            "steps": [asdict(s) for s in report.steps],
-        }
+        payload["explain"] = _explain_dict(steps, t0)
     return payload
 
 
+def _apply_strategy(conn: Any, physical: PhysicalPlan) -> None:
+    # Connections are per query, so the setting never leaks into other statements.
+    if physical.strategy != "natural":
+        conn.execute("SET join_collapse_limit = 1")
+
+
+def _analyze(cur: Any, sql: str, params: Mapping[str, object]) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    plan = explain_analyze(cur, sql, params)
+    metrics.DB_ROUNDTRIP_SECONDS.observe(time.perf_counter() - t0, op="explain_analyze")
+    return plan
+
+
+def execute(q: CqlQuery) -> Dict[str, Any]:
+    """Execute ``q`` buffered.
+
+    With ``q.analyze`` the SQL runs a second time under EXPLAIN ANALYZE and the plan
+    lands in the graph_traverse step's ``pg`` extra (its ``ms`` excludes that run). With
+    ``q.profile`` the whole execution is profiled into ``explain.profile``.
+    """
+    if not q.profile:
+        return _execute(q)
+    with PythonProfile() as prof:
+        payload = _execute(q)
+    if "explain" in payload:
+        payload["explain"]["profile"] = prof.report()
+    return payload
+
+
+def _execute(q: CqlQuery) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    steps, ts, physical = _prelude_steps(q)
+    if q.path is not None:
+        return _execute_path(q, steps, ts, t0)
+    if q.count:
+        return _execute_aggregate(q, steps, ts, physical, t0)
+
+    # Step 3: graph traverse and filters
+    t_trav0 = time.perf_counter()
+    limit = _row_limit(q) or DEFAULT_LIMIT
+    sql, params = _single_sql(q, ts, limit, physical.strategy)
+
+    raw_rows: List[RawRow] = []
+    with get_conn() as conn:
+        _apply_strategy(conn, physical)
+        with conn.cursor() as cur:
+            t_db0 = time.perf_counter()
+            cur.execute(sql, params)
+            for row in cur.fetchall():
+                raw_rows.append(_row_to_raw(row))
+            sources = fetch_sources(cur, _source_refs(raw_rows))
+            metrics.DB_ROUNDTRIP_SECONDS.observe(time.perf_counter() - t_db0, op="cql")
+            t_trav1 = time.perf_counter()
+            extra: Dict[str, Any] = {"rows": len(raw_rows), "sources": len(sources)}
+            if q.analyze:
+                extra["pg"] = _analyze(cur, sql, params)
+
+    steps.append(ExplainStep(name="graph_traverse", ms=(t_trav1 - t_trav0) * 1000.0, extra=extra))
+    steps[0].extra["actual_rows"] = len(raw_rows)
+
+    return _finalize(q, raw_rows, steps, t0, sources)
+
+
+def execute_stream(q: CqlQuery) -> Iterator[Dict[str, Any]]:
+    """Yield result items as rows arrive from a server-side cursor.
+
+    Rows are fetched ``STREAM_FETCH_ROWS`` at a time, together with the sources they
+    cite, and scored one at a time, so memory stays constant and
+    the first result is available once the first batch arrives. Unlike ``execute``,
+    a query without LIMIT is unbounded. After the last result a trailer item is yielded
+    when there is something to report: ``explain`` if the query requests EXPLAIN (its
+    belief_compute step carries aggregates only, no per-fiber terms) and ``next_cursor``
+    if a LIMIT was reached. ``q.analyze`` runs EXPLAIN ANALYZE once the cursor is
+    drained; ``q.profile`` is ignored because the consumer's time would be profiled too.
+    Path patterns and COUNT queries are executed buffered and replayed.
+    """
+    if q.path is not None or q.count:
+        payload = _execute(q)
+        yield from payload["results"]
+        if "explain" in payload:
+            yield {"explain": payload["explain"]}
+        return
+    t0 = time.perf_counter()
+    steps, ts, physical = _prelude_steps(q)
+    sql, params = _single_sql(q, ts, _row_limit(q), physical.strategy)
+
+    acc = _BeliefAccumulator(keep_terms=False)
+    rows = 0
+    last: Optional[RawRow] = None
+    fetch_ms = 0.0
+    score_ms = 0.0
+    with get_conn() as conn:
+        _apply_strategy(conn, physical)
+        # Named (server-side) cursors only live inside a transaction.
+        with conn.transaction():
+            with conn.cursor(name="cql_stream") as cur, conn.cursor() as src_cur:
+                t_fetch = time.perf_counter()
+                cur.execute(sql, params)
+                while True:
+                    batch = [_row_to_raw(row) for row in cur.fetchmany(STREAM_FETCH_ROWS)]
+                    if not batch:
+                        break
+                    # Sources not seen in earlier batches, in one round trip.
+                    missing = _source_refs(batch) - acc.sources.keys()
+                    acc.sources.update(fetch_sources(src_cur, missing))
+                    fetch_ms += (time.perf_counter() - t_fetch) * 1000.0
+                    for last in batch:
+                        t_row = time.perf_counter()
+                        rows += 1
+                        item = acc.score(last)
+                        score_ms += (time.perf_counter() - t_row) * 1000.0
+                        yield _result_dict(item)
+                    t_fetch = time.perf_counter()
+        traverse_extra: Dict[str, Any] = {"rows": rows, "sources": len(acc.sources)}
+        if q.analyze:
+            with conn.cursor() as cur:
+                traverse_extra["pg"] = _analyze(cur, sql, params)
+
+    steps.append(ExplainStep(name="graph_traverse", ms=fetch_ms, extra=traverse_extra))
+    steps[0].extra["actual_rows"] = rows
+    steps.append(ExplainStep(name="belief_compute", ms=score_ms, extra=acc.extra()))
+    metrics.DB_ROUNDTRIP_SECONDS.observe(fetch_ms / 1000.0, op="cql_stream")
+    _record_metrics(q, steps, rows)
+
+    trailer: Dict[str, Any] = {}
+    paged = q.top is None and not q.distinct
+    if paged and q.limit is not None and last is not None and rows >= q.limit:
+        trailer["next_cursor"] = encode_cursor(last[3], last[6])
+    if q.explain:
+        trailer["explain"] = _explain_dict(steps, t0)
+    if trailer:
+        yield trailer
+
+
+def _batch_sql(
+    shape: Shape, queries: Sequence[CqlQuery], ordinals: Sequence[int], strategy: str = "natural"
+) -> Tuple[str, Dict[str, object]]:
+    """Compile same-shaped queries into one statement over their unnested parameters.
+
+    Each parameter set (including its limit) drives a LATERAL subquery identical to the
+    single-query SQL, so ordering and LIMIT stay per query. Rows are tagged with the
+    query's ordinal.
+    """
+    columns = ["ord", "lim"]
+    arrays = ["%(b_ord)s::int[]", "%(b_lim)s::int8[]"]
+    params: Dict[str, object] = {
+        "b_ord": [int(i) for i in ordinals],
+        "b_lim": [_row_limit(q) or DEFAULT_LIMIT for q in queries],
+    }
+    values: Dict[str, List[Any]] = {
+        "label": [q.label for q in queries],
+        "predicate": [q.predicate for q in queries],
+        "ts": [_asof_bounds(q.asof_iso)[0] for q in queries],
+        "belief_ge": [q.belief_ge for q in queries],
+        "known": [isoparse(q.known_iso) if q.known_iso else None for q in queries],
+    }
+    if shape[4]:
+        cursors = [decode_cursor(q.after) for q in queries if q.after is not None]
+        values["after_belief"] = [c[0] for c in cursors]
+        values["after_fiber"] = [c[1] for c in cursors]
+    for used, slot in zip(shape, _BATCH_SLOTS):
+        if not used:
+            continue
+        for name, sql_type in slot:
+            columns.append(name)
+            arrays.append(f"%(b_{name})s::{sql_type}")
+            params[f"b_{name}"] = values[name]
+
+    c = _columns(strategy)
+    where_clauses = _where_clauses(
+        shape,
+        {
+            "label": "q.label",
+            "predicate": "q.predicate",
+            "ts_from": "q.ts",
+            "ts_to": "q.ts",
+            "belief_ge": "q.belief_ge",
+            "after_belief": "q.after_belief",
+            "after_fiber": "q.after_fiber",
+        },
+        c,
+    )
+    from_clause = _from_clause(strategy, "q.known" if shape[5] else None)
+    inner = "SELECT " + _select_columns(c) + from_clause
+    inner += "WHERE " + " AND ".join(where_clauses) + " "
+    inner += _order_by(c) + "LIMIT q.lim"
+    sql = (
+        "SELECT q.ord, r.* "
+        f"FROM unnest({', '.join(arrays)}) AS q({', '.join(columns)}) "
+        f"CROSS JOIN LATERAL ({inner}) r "
+        "ORDER BY q.ord, r.base_confidence DESC, r.fiber_id DESC"
+    )
+    return sql, params
+
+
+def execute_many(queries: Sequence[CqlQuery]) -> List[Dict[str, Any]]:
+    """Execute several queries with one SQL round trip per query shape.
+
+    Queries using the same set of filters are grouped into a single statement (see
+    ``_batch_sql``) on a single connection. Returns one payload per query, in input
+    order, shaped exactly like ``execute``'s; the graph_traverse step reports the
+    shared statement time and the batch size. Members asking for ANALYZE get the plan
+    of their shared statement; PROFILE is not supported here. Path patterns, COUNT,
+    DISTINCT and TOP queries compile to their own statement and run on their own. The
+    sources cited across the batch are fetched in one further round trip.
+    """
+    t0 = time.perf_counter()
+    groups: Dict[Shape, List[int]] = {}
+    for idx, q in enumerate(queries):
+        if _batchable(q):
+            groups.setdefault(_query_shape(q), []).append(idx)
+
+    raw_by_query: List[List[RawRow]] = [[] for _ in queries]
+    traverse: List[ExplainStep] = [ExplainStep(name="graph_traverse", ms=0.0) for _ in queries]
+    sources: Dict[int, Dict[str, Any]] = {}
+    if groups:
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                for shape, members in groups.items():
+                    t_trav0 = time.perf_counter()
+                    # Members share a shape, so they share ASOF/KNOWN and thus the route.
+                    strategy = _routed(queries[members[0]].plan(), "natural", batched=True)
+                    sql, params = _batch_sql(
+                        shape, [queries[i] for i in members], members, strategy
+                    )
+                    cur.execute(sql, params)
+                    for row in cur.fetchall():
+                        raw_by_query[int(row[0])].append(_row_to_raw(row[1:]))
+                    ms = (time.perf_counter() - t_trav0) * 1000.0
+                    metrics.DB_ROUNDTRIP_SECONDS.observe(ms / 1000.0, op="cql_batch")
+                    plan = None
+                    if any(queries[i].analyze for i in members):
+                        plan = _analyze(cur, sql, params)
+                    for i in members:
+                        extra: Dict[str, Any] = {
+                            "rows": len(raw_by_query[i]),
+                            "batch_size": len(members),
+                        }
+                        if plan is not None and queries[i].analyze:
+                            extra["pg"] = plan
+                        traverse[i] = ExplainStep(name="graph_traverse", ms=ms, extra=extra)
+                # One lookup for the sources cited anywhere in the batch.
+                sources = fetch_sources(
+                    cur, set().union(*(_source_refs(rows) for rows in raw_by_query))
+                )
+
+    payloads: List[Dict[str, Any]] = []
+    for idx, q in enumerate(queries):
+        if not _batchable(q):
+            payloads.append(_execute(q))
+            continue
+        planner_step, _physical = _planner_step(q, batched=True)
+        planner_step.extra["actual_rows"] = len(raw_by_query[idx])
+        steps: List[ExplainStep] = [
+            planner_step,
+            ExplainStep(name="ann_shortlist", ms=0.0, extra={}),
+            ExplainStep(name="temporal_mask", ms=0.0, extra=_mask_extra(q)),
+            traverse[idx],
+        ]
+        payloads.append(_finalize(q, raw_by_query[idx], steps, t0, sources))
+    return payloads
+
+
 def cql(query: str) -> Dict[str, Any]:
     from .parser import parse
 
     q = parse(query)
     return execute(q)
+
+
+def cql_many(queries: Sequence[str]) -> List[Dict[str, Any]]:
+    from .parser import parse
+
+    return execute_many([parse(query) for query in queries])
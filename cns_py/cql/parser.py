@@ -1,7 +1,19 @@
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+
+from dateutil.parser import isoparse
+
+from .planner import AsOf, Belief, Edge, Match, Node, Path, Plan, Return
+
+# Result cap for buffered execution when a query does not ask for one.
+DEFAULT_LIMIT = 100
+# Longest path pattern; every hop adds three joins to the compiled SQL.
+MAX_PATH_HOPS = 4
+# Columns a COUNT may be grouped by.
+GROUP_KEYS = ("predicate", "object")
 
 
 @dataclass
@@ -10,80 +22,426 @@ class CqlQuery:
     predicate: Optional[str] = None
     asof_iso: Optional[str] = None
     belief_ge: Optional[float] = None
+    # ASOF KNOWN: read aspect versions as recorded at this time instead of the current ones.
+    known_iso: Optional[str] = None
     explain: bool = True
     provenance: bool = True
+    # Maximum rows per page; None means DEFAULT_LIMIT for buffered execution and
+    # unbounded for streaming.
+    limit: Optional[int] = None
+    # Opaque continuation token from a previous page's ``next_cursor``.
+    after: Optional[str] = None
+    # Attach the Postgres EXPLAIN ANALYZE plan to the graph_traverse step.
+    analyze: bool = False
+    # Attach a cProfile capture of the executor (buffered execution only).
+    profile: bool = False
+    # Path pattern; replaces label/predicate and yields one result per matching path.
+    path: Optional[Path] = None
+    # Aggregate in SQL: a count (per GROUP_KEYS value with group_by) instead of rows.
+    count: bool = False
+    group_by: Optional[str] = None
+    # One row per subject/predicate/object triple, keeping its highest-belief fiber.
+    distinct: bool = False
+    # TOP k BY confidence: the k best rows (or groups); replaces LIMIT and is not paged.
+    top: Optional[int] = None
+
+    @classmethod
+    def from_plan(cls, plan: Plan) -> "CqlQuery":
+        return cls(
+            label=plan.match.label if plan.match else None,
+            predicate=plan.match.predicate if plan.match else None,
+            asof_iso=plan.asof.timestamp_iso if plan.asof else None,
+            belief_ge=plan.belief.ge if plan.belief else None,
+            known_iso=plan.known.timestamp_iso if plan.known else None,
+            path=plan.path,
+            count=plan.ret.count,
+            group_by=plan.group_by,
+            distinct=plan.ret.distinct,
+            top=plan.top,
+            explain=plan.ret.explain,
+            provenance=plan.ret.provenance,
+            limit=plan.limit,
+            after=plan.after,
+            analyze=plan.ret.analyze,
+            profile=plan.ret.profile,
+        )
+
+    def plan(self) -> Plan:
+        """The query as a hashable ``Plan``, e.g. for cache keys."""
+        match = None
+        if self.label is not None or self.predicate is not None:
+            match = Match(label=self.label, predicate=self.predicate)
+        return Plan(
+            match=match,
+            belief=Belief(ge=self.belief_ge) if self.belief_ge is not None else None,
+            asof=AsOf(timestamp_iso=self.asof_iso) if self.asof_iso else None,
+            known=AsOf(timestamp_iso=self.known_iso) if self.known_iso else None,
+            path=self.path,
+            ret=Return(
+                explain=self.explain,
+                provenance=self.provenance,
+                analyze=self.analyze,
+                profile=self.profile,
+                count=self.count,
+                distinct=self.distinct,
+            ),
+            limit=self.limit,
+            after=self.after,
+            group_by=self.group_by,
+            top=self.top,
+        )
+
+
+class CqlSyntaxError(ValueError):
+    """A query that does not follow the CQL grammar; ``pos`` is a 0-based offset."""
+
+    def __init__(self, message: str, query: str, pos: int) -> None:
+        self.message = message
+        self.query = query
+        self.pos = pos
+        self.line = query.count("\n", 0, pos) + 1
+        self.column = pos - (query.rfind("\n", 0, pos) + 1) + 1
+        super().__init__(f"{message} at line {self.line}, column {self.column}")
+
+
+@dataclass(frozen=True)
+class Token:
+    kind: str  # "string" | "op" | "word" | "eof"
+    text: str  # source text (strings keep their quotes)
+    value: str  # unescaped string contents, otherwise the text
+    pos: int
+
+
+_TOKEN_RE = re.compile(
+    r"""
+      (?P<ws>\s+)
+    | (?P<string>"(?:[^"\\]|\\.)*")
+    | (?P<op>>=|>|=|\(|\)|-\[|\]->)
+    | (?P<word>[^\s"=<>()\[\],]+)
+    """,
+    re.VERBOSE,
+)
+_ESCAPE_RE = re.compile(r"\\(.)")
+
+_RETURN_ITEMS = ("EXPLAIN", "PROVENANCE", "PROFILE", "COUNT", "DISTINCT")
+
+# Clauses that cannot be used together: (clause, conflicting clause, reason).
+_CONFLICTS = (
+    ("LABEL", "path", "a path pattern"),
+    ("PREDICATE", "path", "a path pattern"),
+    ("AFTER", "path", "a path pattern"),
+    ("COUNT", "path", "a path pattern"),
+    ("DISTINCT", "path", "a path pattern"),
+    ("TOP", "path", "a path pattern"),
+    ("AFTER", "COUNT", "COUNT"),
+    ("AFTER", "DISTINCT", "DISTINCT"),
+    ("AFTER", "TOP", "TOP"),
+    ("LIMIT", "TOP", "TOP"),
+)
+
+
+def tokenize(query: str) -> List[Token]:
+    """Split ``query`` into tokens in one pass; the list always ends with an eof token.
+
+    Words are maximal runs of characters other than whitespace, quotes, comparison
+    operators and brackets, so timestamps and identifiers are single words. Path
+    patterns use the operators ``(``, ``)``, ``-[`` and ``]->``. Strings
+    are double-quoted and may contain spaces and ``\\"`` / ``\\\\`` escapes.
+    """
+    tokens: List[Token] = []
+    pos = 0
+    while pos < len(query):
+        m = _TOKEN_RE.match(query, pos)
+        if m is None:
+            if query[pos] == '"':
+                raise CqlSyntaxError("unterminated string", query, pos)
+            raise CqlSyntaxError(f"unexpected character {query[pos]!r}", query, pos)
+        kind = m.lastgroup or ""
+        text = m.group()
+        if kind == "string":
+            tokens.append(Token(kind, text, _ESCAPE_RE.sub(r"\1", text[1:-1]), pos))
+        elif kind != "ws":
+            tokens.append(Token(kind, text, text, pos))
+        pos = m.end()
+    tokens.append(Token("eof", "", "", len(query)))
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser over ``tokenize`` output.
+
+    Grammar (keywords are case-insensitive; clauses may come in any order, once each)::
+
+        query     := ["MATCH"] clause* EOF
+        clause    := label | "PREDICATE" WORD | "ASOF" ["KNOWN"] WORD
+                   | "BELIEF" (">=" | ">") NUMBER
+                   | "LIMIT" INTEGER | "AFTER" (STRING | WORD) | path | return
+                   | "GROUP" "BY" ("predicate" | "object") | "TOP" INTEGER "BY" "confidence"
+        label     := "LABEL" ["="] (STRING | WORD)
+        path      := node ("-[" [WORD] "]->" node)+
+        node      := "(" [WORD] [label | STRING] ")"
+        return    := "RETURN" ("EXPLAIN" ["ANALYZE"] | "PROVENANCE" | "PROFILE"
+                               | "COUNT" | "DISTINCT")*
+
+    GROUP BY needs RETURN COUNT, and TOP with COUNT needs GROUP BY; see ``_CONFLICTS``
+    for clauses that exclude each other.
+    """
+
+    def __init__(self, query: str) -> None:
+        self.query = query
+        self.tokens = tokenize(query)
+        self.i = 0
+        self.seen: Dict[str, int] = {}
+
+    @property
+    def tok(self) -> Token:
+        return self.tokens[self.i]
+
+    def error(self, message: str, tok: Optional[Token] = None) -> CqlSyntaxError:
+        return CqlSyntaxError(message, self.query, (tok or self.tok).pos)
+
+    def describe(self, tok: Token) -> str:
+        return "end of query" if tok.kind == "eof" else repr(tok.text)
+
+    def advance(self) -> Token:
+        tok = self.tok
+        if tok.kind != "eof":
+            self.i += 1
+        return tok
+
+    def keyword(self) -> Optional[str]:
+        return self.tok.text.upper() if self.tok.kind == "word" else None
+
+    def expect(self, kinds: Tuple[str, ...], what: str, after: str) -> Token:
+        if self.tok.kind not in kinds:
+            raise self.error(f"expected {what} after {after}, got {self.describe(self.tok)}")
+        return self.advance()
+
+    def once(self, clause: str, tok: Token) -> None:
+        if clause in self.seen:
+            raise self.error(f"duplicate {clause} clause", tok)
+        self.seen[clause] = tok.pos
+
+    def parse(self) -> Plan:
+        label: Optional[str] = None
+        predicate: Optional[str] = None
+        asof: Optional[AsOf] = None
+        known: Optional[AsOf] = None
+        belief: Optional[Belief] = None
+        limit: Optional[int] = None
+        after: Optional[str] = None
+        path: Optional[Path] = None
+        group_by: Optional[str] = None
+        top: Optional[int] = None
+        ret = Return()
+
+        if self.keyword() == "MATCH":
+            self.advance()
+        while self.tok.kind != "eof":
+            tok = self.tok
+            kw = self.keyword()
+            if kw == "LABEL":
+                self.once("LABEL", self.advance())
+                label = self.label()
+            elif kw == "PREDICATE":
+                self.once("PREDICATE", self.advance())
+                predicate = self.expect(("word",), "a predicate name", "PREDICATE").value
+            elif kw == "ASOF":
+                self.advance()
+                if self.keyword() == "KNOWN":
+                    self.once("ASOF KNOWN", tok)
+                    self.advance()
+                    known = AsOf(timestamp_iso=self.timestamp("ASOF KNOWN"))
+                else:
+                    self.once("ASOF", tok)
+                    asof = AsOf(timestamp_iso=self.timestamp("ASOF"))
+            elif kw == "BELIEF":
+                self.once("BELIEF", self.advance())
+                belief = Belief(ge=self.belief())
+            elif kw == "LIMIT":
+                self.once("LIMIT", self.advance())
+                limit = self.limit()
+            elif kw == "AFTER":
+                self.once("AFTER", self.advance())
+                after = self.expect(("string", "word"), "a continuation token", "AFTER").value
+            elif kw == "RETURN":
+                self.once("RETURN", self.advance())
+                ret = self.returns()
+            elif kw == "GROUP":
+                self.once("GROUP", self.advance())
+                group_by = self.group_by()
+            elif kw == "TOP":
+                self.once("TOP", self.advance())
+                top = self.top()
+            elif tok.kind == "op" and tok.text == "(":
+                self.once("path", tok)
+                path = self.path()
+            elif kw in _RETURN_ITEMS or kw == "ANALYZE":
+                raise self.error(f"{tok.text} must follow RETURN")
+            else:
+                raise self.error(f"unexpected {self.describe(tok)}")
+
+        for clause, other, reason in _CONFLICTS:
+            if clause in self.seen and other in self.seen:
+                raise CqlSyntaxError(
+                    f"{clause} cannot be combined with {reason}", self.query, self.seen[clause]
+                )
+        if group_by is not None and not ret.count:
+            raise CqlSyntaxError("GROUP BY requires RETURN COUNT", self.query, self.seen["GROUP"])
+        if top is not None and ret.count and group_by is None:
+            raise CqlSyntaxError("TOP with COUNT requires GROUP BY", self.query, self.seen["TOP"])
+        match = None
+        if label is not None or predicate is not None:
+            match = Match(label=label, predicate=predicate)
+        return Plan(
+            match=match,
+            belief=belief,
+            asof=asof,
+            known=known,
+            path=path,
+            ret=ret,
+            limit=limit,
+            after=after,
+            group_by=group_by,
+            top=top,
+        )
+
+    def by(self, after: str) -> None:
+        if self.keyword() != "BY":
+            raise self.error(f"expected BY after {after}, got {self.describe(self.tok)}")
+        self.advance()
+
+    def group_by(self) -> str:
+        self.by("GROUP")
+        tok = self.expect(("word",), "predicate or object", "GROUP BY")
+        key = tok.value.lower()
+        if key not in GROUP_KEYS:
+            raise self.error(f"cannot GROUP BY {tok.text!r}; use predicate or object", tok)
+        return key
+
+    def top(self) -> int:
+        tok = self.expect(("word",), "a positive integer", "TOP")
+        if not tok.value.isdigit() or int(tok.value) < 1:
+            raise self.error(f"TOP must be a positive integer, got {tok.text!r}", tok)
+        self.by(f"TOP {tok.value}")
+        key = self.expect(("word",), "confidence", f"TOP {tok.value} BY")
+        if key.value.lower() != "confidence":
+            raise self.error(f"TOP can only rank BY confidence, got {key.text!r}", key)
+        return int(tok.value)
+
+    def expect_op(self, text: str, what: str) -> Token:
+        if self.tok.kind != "op" or self.tok.text != text:
+            raise self.error(f"expected '{text}' {what}, got {self.describe(self.tok)}")
+        return self.advance()
+
+    def path(self) -> Path:
+        start = self.tok
+        nodes = [self.node()]
+        edges: List[Edge] = []
+        while self.tok.kind == "op" and self.tok.text == "-[":
+            self.advance()
+            predicate = self.advance().value if self.tok.kind == "word" else None
+            self.expect_op("]->", "to close the edge")
+            edges.append(Edge(predicate=predicate))
+            nodes.append(self.node())
+        if not edges:
+            raise self.error("expected '-[' after a path node", self.tok)
+        if len(edges) > MAX_PATH_HOPS:
+            raise self.error(f"path patterns are limited to {MAX_PATH_HOPS} hops", start)
+        return Path(nodes=tuple(nodes), edges=tuple(edges))
+
+    def node(self) -> Node:
+        self.expect_op("(", "to open a path node")
+        var = None
+        if self.tok.kind == "word" and self.keyword() != "LABEL":
+            var = self.advance().value
+        label = None
+        if self.keyword() == "LABEL":
+            self.advance()
+            label = self.label()
+        elif self.tok.kind == "string":
+            label = self.advance().value
+        self.expect_op(")", "to close the path node")
+        return Node(var=var, label=label)
+
+    def label(self) -> str:
+        if self.tok.kind == "op":
+            if self.tok.text != "=":
+                raise self.error(f"expected '=' after LABEL, got {self.describe(self.tok)}")
+            self.advance()
+        return self.expect(("string", "word"), "a label", "LABEL").value
+
+    def timestamp(self, after: str) -> str:
+        tok = self.expect(("word", "string"), "an ISO-8601 timestamp", after)
+        try:
+            isoparse(tok.value)
+        except ValueError:
+            raise self.error(f"invalid timestamp {tok.text!r}", tok) from None
+        return tok.value
+
+    def belief(self) -> float:
+        if self.tok.kind != "op" or self.tok.text not in (">=", ">"):
+            raise self.error(f"expected '>=' or '>' after BELIEF, got {self.describe(self.tok)}")
+        op = self.advance().text
+        tok = self.expect(("word",), "a number", f"BELIEF {op}")
+        try:
+            value = float(tok.value)
+        except ValueError:
+            raise self.error(
+                f"expected a number after BELIEF {op}, got {tok.text!r}", tok
+            ) from None
+        if not 0.0 <= value <= 1.0:
+            raise self.error(f"BELIEF threshold must be between 0 and 1, got {tok.text}", tok)
+        return value
+
+    def limit(self) -> int:
+        tok = self.expect(("word",), "a positive integer", "LIMIT")
+        if not tok.value.isdigit() or int(tok.value) < 1:
+            raise self.error(f"LIMIT must be a positive integer, got {tok.text!r}", tok)
+        return int(tok.value)
+
+    def returns(self) -> Return:
+        # EXPLAIN and PROVENANCE are on by default (v0.1); naming them is documentation.
+        analyze = profile = count = distinct = False
+        while True:
+            kw = self.keyword()
+            if kw == "EXPLAIN":
+                self.advance()
+                if self.keyword() == "ANALYZE":
+                    self.advance()
+                    analyze = True
+            elif kw == "PROVENANCE":
+                self.advance()
+            elif kw == "PROFILE":
+                self.advance()
+                profile = True
+            elif kw in ("COUNT", "DISTINCT"):
+                self.once(kw, self.advance())
+                count = count or kw == "COUNT"
+                distinct = distinct or kw == "DISTINCT"
+            elif kw == "ANALYZE":
+                raise self.error("ANALYZE must follow EXPLAIN")
+            else:
+                return Return(analyze=analyze, profile=profile, count=count, distinct=distinct)
+
+
+def parse_plan(query: str) -> Plan:
+    """Parse ``query`` into a hashable ``Plan``; raises ``CqlSyntaxError``."""
+    return _Parser(query).parse()
 
 
 def parse(query: str) -> CqlQuery:
     """
-    Minimal parser for queries like:
+    Parse queries like:
     MATCH label="FrameworkX" PREDICATE supports_tls ASOF 2025-01-01T00:00:00Z
-    BELIEF >= 0.7 RETURN EXPLAIN PROVENANCE
+    ASOF KNOWN 2024-06-01T00:00:00Z
+    BELIEF >= 0.7 RETURN EXPLAIN PROVENANCE LIMIT 50 AFTER "<next_cursor>"
 
-    All keywords are optional; defaults:
+    All clauses are optional; defaults:
       - explain: True
       - provenance: True
+    ``RETURN EXPLAIN ANALYZE`` and ``PROFILE`` opt into query diagnostics; ``RETURN
+    COUNT`` / ``DISTINCT`` with ``GROUP BY`` and ``TOP k BY confidence`` aggregate. Labels with
+    spaces must be quoted. Anything outside the grammar raises ``CqlSyntaxError``.
     """
-    tokens = query.strip().replace("\n", " ").split()
-    i = 0
-    out = CqlQuery()
-
-    while i < len(tokens):
-        tok = tokens[i].upper()
-        if tok == "MATCH":
-            i += 1
-            continue
-        if tok.startswith("LABEL"):
-            # LABEL or label="..."
-            if "=" in tokens[i]:
-                k, v = tokens[i].split("=", 1)
-                out.label = v.strip().strip('"')
-                i += 1
-            else:
-                # LABEL <value>
-                if i + 1 < len(tokens):
-                    out.label = tokens[i + 1].strip('"')
-                    i += 2
-                else:
-                    i += 1
-            continue
-        if tok == "PREDICATE":
-            if i + 1 < len(tokens):
-                out.predicate = tokens[i + 1]
-                i += 2
-            else:
-                i += 1
-            continue
-        if tok == "ASOF":
-            if i + 1 < len(tokens):
-                out.asof_iso = tokens[i + 1]
-                i += 2
-            else:
-                i += 1
-            continue
-        if tok == "BELIEF":
-            # BELIEF >= 0.7
-            if i + 2 < len(tokens) and tokens[i + 1] in {">=", ">"}:
-                try:
-                    out.belief_ge = float(tokens[i + 2])
-                except ValueError:
-                    pass
-                i += 3
-            else:
-                i += 1
-            continue
-        if tok == "RETURN":
-            i += 1
-            continue
-        if tok == "EXPLAIN":
-            out.explain = True
-            i += 1
-            continue
-        if tok == "PROVENANCE":
-            out.provenance = True
-            i += 1
-            continue
-        # Unrecognized token; skip
-        i += 1
-
-    return out
+    return CqlQuery.from_plan(parse_plan(query))
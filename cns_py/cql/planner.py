@@ -1,47 +1,448 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Optional
+import bisect
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Sequence, Tuple
 
-# Minimal CQL planner skeleton for Phase 1/2
+from dateutil.parser import isoparse
 
+from cns_py import config as cns_config
+from cns_py import metrics
 
-@dataclass
+# CQL planner: the logical plan (Match/Similar/Belief/AsOf) and a cost model over
+# Postgres statistics (pg_class.reltuples, pg_stats MCVs and histograms) that picks
+# which filter drives the traversal.
+
+
+# The logical plan is immutable and hashable so parsed queries can key caches.
+@dataclass(frozen=True)
 class Match:
     label: Optional[str] = None  # e.g., entity label
     predicate: Optional[str] = None  # e.g., 'supports_tls'
 
 
-@dataclass
+@dataclass(frozen=True)
 class Similar:
     to_label: str
     k: int = 5
 
 
-@dataclass
+@dataclass(frozen=True)
 class Belief:
     ge: Optional[float] = None
 
 
-@dataclass
+@dataclass(frozen=True)
 class AsOf:
     timestamp_iso: str  # ISO8601 string
 
 
-@dataclass
+@dataclass(frozen=True)
+class Node:
+    var: Optional[str] = None  # repeated variables name the same atom
+    label: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Edge:
+    predicate: Optional[str] = None  # None matches any predicate
+
+
+@dataclass(frozen=True)
+class Path:
+    """``(a)-[p]->(b)-[q]->(c)``: ``len(nodes) == len(edges) + 1``."""
+
+    nodes: Tuple[Node, ...]
+    edges: Tuple[Edge, ...]
+
+
+@dataclass(frozen=True)
+class Return:
+    explain: bool = True
+    provenance: bool = True
+    analyze: bool = False
+    profile: bool = False
+    count: bool = False  # aggregate instead of returning rows
+    distinct: bool = False  # one row (or count) per subject/predicate/object triple
+
+
+@dataclass(frozen=True)
 class Plan:
     match: Optional[Match] = None
     similar: Optional[Similar] = None
     belief: Optional[Belief] = None
-    asof: Optional[AsOf] = None
+    asof: Optional[AsOf] = None  # valid time
+    known: Optional[AsOf] = None  # transaction time (ASOF KNOWN); None means current
+    path: Optional[Path] = None
+    ret: Return = Return()
+    limit: Optional[int] = None
+    after: Optional[str] = None
+    group_by: Optional[str] = None  # "predicate" | "object", with ret.count
+    top: Optional[int] = None  # TOP k BY confidence
+
+
+# Strategies, in tie-break order: the driving index and the join order it implies.
+STRATEGIES: Dict[str, Tuple[Optional[str], Tuple[str, ...]]] = {
+    "label_first": ("idx_atoms_label", ("atoms a_src", "fibers f", "atoms a_dst", "aspects asp")),
+    "predicate_first": (
+        "idx_fibers_predicate",
+        ("fibers f", "atoms a_src", "atoms a_dst", "aspects asp"),
+    ),
+    "validity_first": (
+        "idx_aspects_fiber_valid_from",
+        ("aspects asp", "fibers f", "atoms a_src", "atoms a_dst"),
+    ),
+    # No forced order: Postgres plans the query itself.
+    "natural": (None, ()),
+    # Present-time queries read the trigger-maintained current_fibers table (see
+    # ``reads_current``), one row per fiber; Postgres picks among its indexes.
+    "current": (None, ("current_fibers cf",)),
+}
+
+# Postgres' own fallbacks when a column has no statistics (selfuncs.h).
+DEFAULT_EQ_SEL = 0.005
+DEFAULT_INEQ_SEL = 1.0 / 3.0
+DEFAULT_ROWS = 1000.0
+# A driver that still touches this share of all fibers is no better than letting
+# Postgres scan; the query is then left to its planner.
+MAX_DRIVER_FRACTION = 0.2
+
+
+@dataclass(frozen=True)
+class ColumnStats:
+    """One ``pg_stats`` row; values of time columns are epoch seconds."""
+
+    null_frac: float = 0.0
+    # Absolute distinct count (pg_stats' negative "fraction of rows" form is resolved).
+    n_distinct: float = 0.0
+    mcv: Tuple[Tuple[Any, float], ...] = ()
+    bounds: Tuple[float, ...] = ()
+
+
+@dataclass(frozen=True)
+class TableStats:
+    atoms: float = DEFAULT_ROWS
+    fibers: float = DEFAULT_ROWS
+    aspects: float = DEFAULT_ROWS
+    # Keyed "table.column".
+    columns: Dict[str, ColumnStats] = field(default_factory=dict)
+    # "pg_stats" when read from the catalog, "default" when tables were never analyzed.
+    source: str = "default"
+
+
+@dataclass(frozen=True)
+class PhysicalPlan:
+    strategy: str
+    index: Optional[str]
+    join_order: Tuple[str, ...]
+    # Rows the query matches before LIMIT.
+    est_rows: float
+    # Rows entering the joins after the driving filter, per eligible strategy.
+    costs: Tuple[Tuple[str, float], ...]
+    # Source atoms the traversal starts from, and fibers per source atom.
+    est_base: float
+    est_fanout: float
+    stats_source: str
+
+    def extra(self) -> Dict[str, Any]:
+        return {
+            "strategy": self.strategy,
+            "index": self.index,
+            "join_order": list(self.join_order),
+            "est_rows": round(self.est_rows, 2),
+            "costs": {name: round(cost, 2) for name, cost in self.costs},
+            "stats": self.stats_source,
+        }
+
+
+_STATS_SQL = """
+SELECT tablename, attname, null_frac, n_distinct,
+       CASE WHEN attname IN ('valid_from', 'valid_to')
+            THEN ARRAY(SELECT extract(epoch FROM v::timestamptz)::float8
+                       FROM unnest(most_common_vals::text::text[]) v)::text[]
+            ELSE most_common_vals::text::text[] END,
+       most_common_freqs,
+       CASE WHEN attname IN ('valid_from', 'valid_to')
+            THEN ARRAY(SELECT extract(epoch FROM b::timestamptz)::float8
+                       FROM unnest(histogram_bounds::text::text[]) b)
+            WHEN attname = 'belief' THEN histogram_bounds::text::float8[] END
+FROM pg_stats
+WHERE schemaname = current_schema()
+  AND (tablename, attname) IN (('atoms', 'label'), ('fibers', 'predicate'), ('fibers', 'src'),
+       ('aspects', 'subject_kind'), ('aspects', 'valid_from'), ('aspects', 'valid_to'),
+       ('aspects', 'belief'))
+"""
+_NUMERIC_COLUMNS = ("valid_from", "valid_to", "belief")
+
+
+# A partitioned table's own reltuples is only set by a manual ANALYZE (autovacuum skips
+# partitioned parents), so its size is the sum over the leaves that have been analyzed.
+_SIZES_SQL = """
+SELECT c.relname,
+       CASE WHEN c.relkind <> 'p' THEN c.reltuples
+            ELSE (SELECT CASE WHEN max(l.reltuples) < 0 THEN -1
+                              ELSE sum(GREATEST(l.reltuples, 0)) END
+                  FROM pg_partition_tree(c.oid) t JOIN pg_class l ON l.oid = t.relid
+                  WHERE t.isleaf)
+       END
+FROM pg_class c
+WHERE c.oid IN (to_regclass('atoms'), to_regclass('fibers'), to_regclass('aspects'))
+"""
+
+
+def load_stats(cur: Any) -> TableStats:
+    """Read table sizes and column statistics for the CQL tables."""
+    cur.execute(_SIZES_SQL)
+    # reltuples is -1 until a table is first vacuumed or analyzed.
+    sizes = {str(name): float(n) for name, n in cur.fetchall() if n is not None and n >= 0}
+    if len(sizes) < 3:
+        return TableStats()
+    cur.execute(_STATS_SQL)
+    columns: Dict[str, ColumnStats] = {}
+    for table, column, null_frac, n_distinct, mcv, freqs, bounds in cur.fetchall():
+        rows = sizes[str(table)] * (1.0 - float(null_frac or 0.0))
+        distinct = float(n_distinct or 0.0)
+        if distinct < 0:
+            distinct = -distinct * rows
+        values = [float(v) if column in _NUMERIC_COLUMNS else v for v in (mcv or [])]
+        columns[f"{table}.{column}"] = ColumnStats(
+            null_frac=float(null_frac or 0.0),
+            n_distinct=distinct,
+            mcv=tuple(zip(values, (float(f) for f in (freqs or [])))),
+            bounds=tuple(float(b) for b in (bounds or [])),
+        )
+    return TableStats(
+        atoms=max(sizes["atoms"], 1.0),
+        fibers=max(sizes["fibers"], 1.0),
+        aspects=max(sizes["aspects"], 1.0),
+        columns=columns,
+        source="pg_stats",
+    )
+
+
+_cache_lock = threading.Lock()
+_cache: Dict[Tuple[Any, ...], Tuple[float, TableStats]] = {}
+
+
+def table_stats() -> TableStats:
+    """Statistics for the current database, cached for ``CNS_PLANNER_STATS_TTL_S``."""
+    from cns_py.storage.db import DbConfig, get_conn
+
+    cfg = DbConfig()
+    key = (cfg.host, cfg.port, cfg.dbname)
+    now = time.monotonic()
+    with _cache_lock:
+        hit = _cache.get(key)
+    if hit is not None and now - hit[0] < cns_config.planner_stats_ttl_s():
+        metrics.PLANNER_STATS_CACHE.inc(result="hit")
+        return hit[1]
+    metrics.PLANNER_STATS_CACHE.inc(result="miss")
+    with get_conn(cfg) as conn:
+        with conn.cursor() as cur:
+            stats = load_stats(cur)
+    with _cache_lock:
+        _cache[key] = (now, stats)
+    return stats
+
+
+def invalidate_stats() -> None:
+    """Drop cached statistics, e.g. after a bulk load and ANALYZE."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def _eq_sel(col: Optional[ColumnStats], value: Any) -> float:
+    if col is None:
+        return DEFAULT_EQ_SEL
+    for v, freq in col.mcv:
+        if v == value:
+            return freq
+    rest = 1.0 - col.null_frac - sum(f for _, f in col.mcv)
+    others = col.n_distinct - len(col.mcv)
+    if others < 1.0:
+        # Every distinct value is an MCV, so anything else is (nearly) absent.
+        return 0.0
+    return max(rest, 0.0) / others
+
+
+def _hist_cdf(bounds: Sequence[float], x: float) -> float:
+    """Share of histogram rows <= ``x``; buckets hold equal row counts."""
+    if len(bounds) < 2:
+        return DEFAULT_INEQ_SEL
+    if x < bounds[0]:
+        return 0.0
+    if x >= bounds[-1]:
+        return 1.0
+    i = bisect.bisect_right(bounds, x) - 1
+    lo, hi = bounds[i], bounds[i + 1]
+    within = (x - lo) / (hi - lo) if hi > lo else 1.0
+    return (i + within) / (len(bounds) - 1)
+
+
+def _le_sel(col: Optional[ColumnStats], x: float) -> float:
+    """Share of all rows (nulls included in the denominator) with a value <= ``x``."""
+    if col is None:
+        return DEFAULT_INEQ_SEL
+    mcv_total = sum(f for _, f in col.mcv)
+    mcv_le = sum(f for v, f in col.mcv if v <= x)
+    hist_share = max(1.0 - col.null_frac - mcv_total, 0.0)
+    if not col.bounds:
+        return mcv_le + hist_share * (DEFAULT_INEQ_SEL if hist_share > 0 else 0.0)
+    return mcv_le + hist_share * _hist_cdf(col.bounds, x)
+
+
+def _validity_sel(stats: TableStats, ts: float) -> float:
+    """Share of aspects valid at ``ts``; NULL bounds are open, as in the executor."""
+    vf = stats.columns.get("aspects.valid_from")
+    vt = stats.columns.get("aspects.valid_to")
+    started = (vf.null_frac if vf else 0.0) + _le_sel(vf, ts)
+    not_ended = 1.0 - _le_sel(vt, ts)
+    # Bounds are treated as independent, which underestimates for long histories.
+    return min(started, 1.0) * min(max(not_ended, 0.0), 1.0)
+
+
+def _belief_sel(stats: TableStats, ge: float) -> float:
+    col = stats.columns.get("aspects.belief")
+    if col is None:
+        return DEFAULT_INEQ_SEL
+    # COALESCE(belief, 0.0) >= ge: NULLs only pass a non-positive threshold.
+    passing_nulls = col.null_frac if ge <= 0.0 else 0.0
+    below = _le_sel(col, ge) - sum(f for v, f in col.mcv if v == ge)
+    return min(max(1.0 - col.null_frac - below, 0.0) + passing_nulls, 1.0)
+
+
+def choose(plan: Plan, stats: TableStats) -> PhysicalPlan:
+    """Pick the driving strategy for ``plan`` from estimated driver sizes.
+
+    Each strategy starts from one filter's index: label-first from matching atoms and
+    their out-edges, predicate-first from fibers of the predicate, validity-first from
+    aspects valid at the ASOF time. Its cost is the rows it feeds into the remaining
+    joins; the cheapest wins unless it would still touch more than
+    ``MAX_DRIVER_FRACTION`` of all fibers. Path patterns are always left to Postgres;
+    only their row estimate is computed.
+    """
+    match = plan.match or Match()
+    n_fibers = stats.fibers
+    src = stats.columns.get("fibers.src")
+    distinct_src = src.n_distinct if src and src.n_distinct >= 1.0 else stats.atoms
+    fanout = n_fibers / max(distinct_src, 1.0)
+    if plan.path is not None:
+        return _choose_path(plan, plan.path, stats, distinct_src, fanout)
+
+    kind = stats.columns.get("aspects.subject_kind")
+    fiber_aspects = stats.aspects * _eq_sel(kind, "fiber") if kind else min(stats.aspects, n_fibers)
+
+    label_atoms: Optional[float] = None
+    sel = 1.0
+    costs: Dict[str, float] = {}
+    if match.label is not None:
+        label_atoms = max(stats.atoms * _eq_sel(stats.columns.get("atoms.label"), match.label), 1.0)
+        sel *= min(label_atoms / max(distinct_src, 1.0), 1.0)
+        costs["label_first"] = label_atoms + label_atoms * fanout
+    if match.predicate is not None:
+        pred_sel = _eq_sel(stats.columns.get("fibers.predicate"), match.predicate)
+        sel *= pred_sel
+        costs["predicate_first"] = n_fibers * pred_sel
+    if plan.asof is not None:
+        valid_sel = _validity_sel(stats, isoparse(plan.asof.timestamp_iso).timestamp())
+        sel *= valid_sel
+        costs["validity_first"] = fiber_aspects * valid_sel
+    if plan.belief is not None and plan.belief.ge is not None:
+        sel *= _belief_sel(stats, plan.belief.ge)
+
+    est_rows = n_fibers * sel
+    if costs:
+        est_rows = max(est_rows, 1.0)
+    strategy = "natural"
+    if costs and cns_config.cost_planner_enabled():
+        best = min(costs, key=lambda name: (costs[name], list(STRATEGIES).index(name)))
+        if costs[best] <= MAX_DRIVER_FRACTION * n_fibers:
+            strategy = best
+    index, join_order = STRATEGIES[strategy]
+    return PhysicalPlan(
+        strategy=strategy,
+        index=index,
+        join_order=join_order,
+        est_rows=est_rows,
+        costs=tuple(costs.items()),
+        est_base=label_atoms if label_atoms is not None else distinct_src,
+        est_fanout=fanout,
+        stats_source=stats.source,
+    )
+
+
+def reads_current(plan: Plan) -> bool:
+    """Whether ``plan`` is a present-time read served from current_fibers.
+
+    That table holds each fiber with its current aspect version. Queries with ASOF or
+    ASOF KNOWN keep the cost-based strategy from ``choose``, and path patterns still
+    join the base tables per hop.
+    """
+    return (
+        plan.asof is None
+        and plan.known is None
+        and plan.path is None
+        and cns_config.current_fibers_enabled()
+    )
+
+
+def _edge_sel(plan: Plan, stats: TableStats) -> float:
+    """Selectivity of the ASOF and BELIEF filters, which apply to every edge."""
+    sel = 1.0
+    if plan.asof is not None:
+        sel *= _validity_sel(stats, isoparse(plan.asof.timestamp_iso).timestamp())
+    if plan.belief is not None and plan.belief.ge is not None:
+        sel *= _belief_sel(stats, plan.belief.ge)
+    return sel
+
+
+def _choose_path(
+    plan: Plan, path: Path, stats: TableStats, distinct_src: float, fanout: float
+) -> PhysicalPlan:
+    label_col = stats.columns.get("atoms.label")
+    pred_col = stats.columns.get("fibers.predicate")
+    first = path.nodes[0]
+    start = distinct_src
+    if first.label is not None:
+        start = max(stats.atoms * _eq_sel(label_col, first.label), 1.0)
+    rows = start
+    edge_sel = _edge_sel(plan, stats)
+    for edge, node in zip(path.edges, path.nodes[1:]):
+        rows *= fanout * edge_sel
+        if edge.predicate is not None:
+            rows *= _eq_sel(pred_col, edge.predicate)
+        if node.label is not None:
+            rows *= _eq_sel(label_col, node.label)
+    index, join_order = STRATEGIES["natural"]
+    return PhysicalPlan(
+        strategy="natural",
+        index=index,
+        join_order=join_order,
+        est_rows=max(rows, 1.0),
+        costs=(),
+        est_base=start,
+        est_fanout=fanout,
+        stats_source=stats.source,
+    )
 
 
-def explain(plan: Plan) -> str:
+def explain(plan: Plan, physical: Optional[PhysicalPlan] = None) -> str:
     steps = []
+    if physical is not None and physical.strategy == "current":
+        steps.append("Read current_fibers")
+    elif physical is not None and physical.strategy != "natural":
+        steps.append(f"Drive {physical.strategy} via {physical.index}")
     if plan.similar:
         steps.append(f"ANN shortlist around '{plan.similar.to_label}' (k={plan.similar.k})")
     if plan.asof:
         steps.append(f"Temporal mask at {plan.asof.timestamp_iso}")
+    if plan.known:
+        steps.append(f"As known at {plan.known.timestamp_iso}")
+    if plan.path:
+        preds = [e.predicate or "*" for e in plan.path.edges]
+        steps.append(f"Path join over {len(preds)} hops ({' -> '.join(preds)})")
     if plan.match:
         if plan.match.predicate:
             steps.append(f"Graph expand via predicate '{plan.match.predicate}'")
@@ -49,6 +450,14 @@ def explain(plan: Plan) -> str:
             steps.append(f"Filter by label == '{plan.match.label}'")
     if plan.belief and plan.belief.ge is not None:
         steps.append(f"Belief >= {plan.belief.ge}")
+    if plan.ret.distinct:
+        steps.append("Distinct triples")
+    if plan.ret.count:
+        steps.append("Count" + (f" by {plan.group_by}" if plan.group_by else ""))
+    if plan.top is not None:
+        steps.append(f"Top {plan.top} by confidence")
+    if physical is not None:
+        steps.append(f"est {physical.est_rows:.0f} rows")
     if not steps:
         return "No-op plan"
     return " -> ".join(steps)
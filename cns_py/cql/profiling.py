@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import cProfile
+import pstats
+import time
+from typing import Any, Dict, Iterator, List, Mapping, Optional
+
+# Opt-in diagnostics for slow queries (``RETURN EXPLAIN ANALYZE`` / ``PROFILE``).
+#
+# ``explain_analyze`` re-runs a statement under EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)
+# and condenses the plan into per-node timings and buffer counts; ``PythonProfile``
+# captures the Python side with cProfile. Both cost real time, so the executor only
+# uses them when a query asks.
+
+# Plan node fields copied into the flattened per-node summary.
+_NODE_FIELDS = (
+    ("Node Type", "node"),
+    ("Relation Name", "relation"),
+    ("Index Name", "index"),
+    ("Plan Rows", "plan_rows"),
+    ("Actual Rows", "actual_rows"),
+    ("Actual Loops", "loops"),
+    ("Actual Total Time", "actual_total_ms"),
+    ("Shared Hit Blocks", "shared_hit_blocks"),
+    ("Shared Read Blocks", "shared_read_blocks"),
+)
+
+# Functions reported from a Python profile, by cumulative time.
+PROFILE_TOP = 25
+
+
+def _walk(node: Mapping[str, Any], depth: int = 0) -> Iterator[Dict[str, Any]]:
+    out: Dict[str, Any] = {"depth": depth}
+    for src, dst in _NODE_FIELDS:
+        if src in node:
+            out[dst] = node[src]
+    yield out
+    for child in node.get("Plans", ()):
+        yield from _walk(child, depth + 1)
+
+
+def summarize_plan(doc: Mapping[str, Any]) -> Dict[str, Any]:
+    """Condense one FORMAT JSON plan document (``[0]`` of the EXPLAIN output).
+
+    Buffer totals come from the root node, which already includes its children.
+    """
+    root = doc.get("Plan", {})
+    return {
+        "planning_ms": doc.get("Planning Time"),
+        "execution_ms": doc.get("Execution Time"),
+        "shared_hit_blocks": root.get("Shared Hit Blocks", 0),
+        "shared_read_blocks": root.get("Shared Read Blocks", 0),
+        "nodes": list(_walk(root)),
+        "plan": doc,
+    }
+
+
+def explain_analyze(cur: Any, sql: str, params: Optional[Mapping[str, object]]) -> Dict[str, Any]:
+    """Run ``sql`` under EXPLAIN ANALYZE on ``cur`` and return ``summarize_plan``'s output.
+
+    The statement executes a second time, so only read-only SQL belongs here.
+    """
+    t0 = time.perf_counter()
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+    row = cur.fetchone()
+    doc = row[0] if row else []
+    summary = summarize_plan(doc[0] if doc else {})
+    summary["explain_ms"] = (time.perf_counter() - t0) * 1000.0
+    return summary
+
+
+class PythonProfile:
+    """cProfile capture of the calling thread, reported as the top functions.
+
+    Python 3.12+ allows a single active profiler per process; when another request
+    already holds it, the capture is skipped and ``report`` says so.
+    """
+
+    def __init__(self, top: int = PROFILE_TOP) -> None:
+        self.top = top
+        self._prof: Optional[cProfile.Profile] = None
+        self._error: Optional[str] = None
+
+    def __enter__(self) -> "PythonProfile":
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError as exc:
+            self._error = str(exc)
+        else:
+            self._prof = prof
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        if self._prof is not None:
+            self._prof.disable()
+
+    def report(self) -> Dict[str, Any]:
+        if self._prof is None:
+            return {"error": self._error or "profiler not run"}
+        stats = pstats.Stats(self._prof)
+        rows: List[Dict[str, Any]] = []
+        entries = stats.stats.items()  # type: ignore[attr-defined]
+        for (filename, line, func), (_cc, ncalls, tottime, cumtime, _callers) in entries:
+            rows.append(
+                {
+                    "function": f"{filename}:{line}({func})",
+                    "calls": ncalls,
+                    "total_ms": tottime * 1000.0,
+                    "cumulative_ms": cumtime * 1000.0,
+                }
+            )
+        rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+        return {"total_calls": stats.total_calls, "functions": rows[: self.top]}  # type: ignore[attr-defined]
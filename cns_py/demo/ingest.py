@@ -4,10 +4,18 @@ from datetime import datetime
 from typing import Any, Dict
 
 from dateutil.tz import UTC
-from psycopg.types.json import Json
 
+from cns_py.storage.aspects import record_aspect
 from cns_py.storage.db import get_conn
 
+# Every demo fact cites the same document, so they share one row in ``sources``.
+DEMO_SOURCE: Dict[str, Any] = {
+    "source_id": "demo_seed:tls-policy",
+    "uri": "https://example.org/demo/tls-policy",
+    "hash": "demo-sha256-placeholder",
+    "fetched_at": "2024-06-01T00:00:00+00:00",
+}
+
 
 def upsert_atom(cur: Any, kind: str, label: str, text: str | None = None) -> int:
     cur.execute(
@@ -46,24 +54,15 @@ def link_with_validity(
     )
     fiber_id = int(cur.fetchone()[0])
     if provenance is None:
-        provenance = {
-            "source_id": f"demo_seed:fiber:{fiber_id}",
-            "uri": "https://example.org/demo/tls-policy",
-            "hash": "demo-sha256-placeholder",
-            "fetched_at": datetime.now(tz=UTC).isoformat(),
-            "line_span": None,
-        }
-    cur.execute(
-        """
-        INSERT INTO aspects(subject_kind, subject_id, valid_from, valid_to, belief, provenance)
-        VALUES ('fiber', %s, %s, %s, %s, %s)
-        ON CONFLICT (subject_kind, subject_id)
-        DO UPDATE SET valid_from=excluded.valid_from,
-                      valid_to=excluded.valid_to,
-                      belief=excluded.belief,
-                      provenance=excluded.provenance
-        """,
-        (fiber_id, valid_from, valid_to, belief, Json(provenance)),
+        provenance = DEMO_SOURCE
+    record_aspect(
+        cur,
+        "fiber",
+        fiber_id,
+        valid_from=valid_from,
+        valid_to=valid_to,
+        belief=belief,
+        provenance=provenance,
     )
     return fiber_id
 
@@ -15,6 +15,7 @@ def tls_supported_as_of(label: str, ts: datetime) -> Optional[str]:
     JOIN atoms a_src ON a_src.id = f.src
     JOIN atoms a_dst ON a_dst.id = f.dst
     JOIN aspects asp ON asp.subject_kind='fiber' AND asp.subject_id=f.id
+      AND asp.observed_to IS NULL
     WHERE a_src.label=%s AND f.predicate='supports_tls'
       AND COALESCE(asp.valid_from, '-infinity'::timestamptz) <= %s
       AND COALESCE(asp.valid_to,   'infinity'::timestamptz)  >  %s
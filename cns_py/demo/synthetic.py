@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import math
+import random
+import sys
+import time
+from array import array
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from dateutil.tz import UTC
+from psycopg.types.json import Json
+
+from cns_py.cql.planner import invalidate_stats
+from cns_py.storage.bulk import copy_rows, reserve_ids
+from cns_py.storage.db import get_conn
+
+# Deterministic synthetic knowledge graph for benchmarking at production-like sizes.
+#
+# The same spec (including seed) always yields the same atoms and facts; only the
+# database ids differ between loads. Generation is streamed, so memory stays bounded
+# by the atom count rather than the fact count.
+
+KINDS: Tuple[Tuple[str, float], ...] = (
+    ("Entity", 0.55),
+    ("Concept", 0.25),
+    ("Event", 0.12),
+    ("Rule", 0.05),
+    ("Program", 0.03),
+)
+PREDICATE_NAMES = (
+    "depends_on",
+    "supports",
+    "implements",
+    "mentions",
+    "part_of",
+    "authored_by",
+    "cites",
+    "located_in",
+    "supersedes",
+    "uses",
+    "produces",
+    "related_to",
+)
+EMBEDDING_DIMS = 384
+EPOCH = datetime(2015, 1, 1, tzinfo=UTC)
+HORIZON_DAYS = 3800  # ~10.4 years: histories end mid-2025
+
+
+@dataclass(frozen=True)
+class SyntheticSpec:
+    atoms: int
+    facts: int
+    predicates: int = 12
+    # Zipf exponent for source popularity; larger means heavier hubs.
+    fanout_alpha: float = 1.1
+    # Share of facts that belong to a (src, predicate) validity history of 2-4 fibers.
+    history_ratio: float = 0.2
+    # Share of facts whose provenance lacks a citation (dropped by the CQL contract).
+    uncited_ratio: float = 0.02
+    embeddings: bool = False
+    seed: int = 0
+
+
+PRESETS: Dict[str, SyntheticSpec] = {
+    "10k": SyntheticSpec(atoms=2_000, facts=10_000),
+    "1m": SyntheticSpec(atoms=200_000, facts=1_000_000),
+    "10m": SyntheticSpec(atoms=2_000_000, facts=10_000_000),
+}
+
+
+@dataclass(frozen=True)
+class SyntheticFact:
+    src: int  # atom index into generate_atoms order
+    dst: int
+    predicate: str
+    valid_from: Optional[datetime]
+    valid_to: Optional[datetime]
+    belief: float
+    provenance: Dict[str, Any]
+
+
+def predicate_names(spec: SyntheticSpec) -> List[str]:
+    names = list(PREDICATE_NAMES[: spec.predicates])
+    names.extend(f"rel_{i}" for i in range(len(names), spec.predicates))
+    return names
+
+
+def atom_label(kind: str, index: int) -> str:
+    return f"syn-{kind.lower()}-{index}"
+
+
+def generate_atoms(spec: SyntheticSpec) -> Iterator[Tuple[str, str]]:
+    """Yield ``(kind, label)`` for each atom; labels are unique."""
+    rng = random.Random(f"{spec.seed}:atoms")
+    kinds = [k for k, _ in KINDS]
+    cum = list(itertools.accumulate(w for _, w in KINDS))
+    for i in range(spec.atoms):
+        kind = rng.choices(kinds, cum_weights=cum)[0]
+        yield kind, atom_label(kind, i)
+
+
+def _zipf_cum_weights(n: int, alpha: float) -> List[float]:
+    return list(itertools.accumulate(1.0 / (rank + 1) ** alpha for rank in range(n)))
+
+
+def _day(rng: random.Random, lo: int = 0, hi: int = HORIZON_DAYS) -> datetime:
+    return EPOCH + timedelta(days=rng.randint(lo, hi), seconds=rng.randrange(86400))
+
+
+def _document(spec: SyntheticSpec, doc: int) -> Dict[str, Any]:
+    # A document has one content hash and fetch time however many facts cite it, so the
+    # facts of a document share one sources row.
+    rng = random.Random(f"{spec.seed}:doc:{doc}")
+    return {
+        "source_id": f"synthetic:{spec.seed}:doc:{doc}",
+        "uri": f"https://example.org/synthetic/{spec.seed}/{doc}",
+        "hash": f"{rng.getrandbits(128):032x}",
+        "fetched_at": _day(rng).isoformat(),
+    }
+
+
+def _provenance(spec: SyntheticSpec, rng: random.Random, fetched: datetime) -> Dict[str, Any]:
+    if rng.random() < spec.uncited_ratio:
+        return {"note": "unverified", "fetched_at": fetched.isoformat()}
+    doc = rng.randrange(max(1, spec.facts // 20))
+    line = rng.randint(1, 5000)
+    return dict(_document(spec, doc), line_span=[line, line + rng.randint(0, 40)])
+
+
+def generate_facts(spec: SyntheticSpec) -> Iterator[SyntheticFact]:
+    """Yield exactly ``spec.facts`` facts.
+
+    Sources follow a Zipf distribution over a shuffled atom order, so a few hubs carry
+    most of the fan-out. Predicates are Zipf-distributed as well. A history is a chain
+    of facts sharing (src, predicate) with back-to-back validity windows, the last one
+    open-ended, like a framework moving from TLS1.2 to TLS1.3.
+    """
+    if spec.atoms < 2:
+        raise ValueError("need at least two atoms")
+    rng = random.Random(f"{spec.seed}:facts")
+    order = list(range(spec.atoms))
+    rng.shuffle(order)
+    src_cum = _zipf_cum_weights(spec.atoms, spec.fanout_alpha)
+    preds = predicate_names(spec)
+    pred_cum = _zipf_cum_weights(len(preds), 1.0)
+
+    def dst_for(src: int) -> int:
+        dst = rng.randrange(spec.atoms - 1)
+        return dst + 1 if dst >= src else dst
+
+    def fact(src: int, pred: str, vf: Optional[datetime], vt: Optional[datetime]) -> SyntheticFact:
+        fetched = (vf or EPOCH) + timedelta(days=rng.randint(0, 30))
+        return SyntheticFact(
+            src=src,
+            dst=dst_for(src),
+            predicate=pred,
+            valid_from=vf,
+            valid_to=vt,
+            belief=round(rng.betavariate(8.0, 2.0), 4),
+            provenance=_provenance(spec, rng, fetched),
+        )
+
+    emitted = 0
+    while emitted < spec.facts:
+        src = order[rng.choices(range(spec.atoms), cum_weights=src_cum)[0]]
+        pred = rng.choices(preds, cum_weights=pred_cum)[0]
+        if rng.random() < spec.history_ratio:
+            length = min(rng.randint(2, 4), spec.facts - emitted)
+            start = _day(rng, 0, HORIZON_DAYS // 2)
+            for step in range(length):
+                end = None if step == length - 1 else start + timedelta(days=rng.randint(30, 720))
+                yield fact(src, pred, start, end)
+                if end is not None:
+                    start = end
+            emitted += length
+            continue
+        vf = None if rng.random() < 0.3 else _day(rng)
+        vt = None
+        if vf is not None and rng.random() < 0.2:
+            vt = vf + timedelta(days=rng.randint(1, 1500))
+        yield fact(src, pred, vf, vt)
+        emitted += 1
+
+
+def embedding(spec: SyntheticSpec, index: int) -> str:
+    """Deterministic unit vector for atom ``index`` in pgvector text form."""
+    rng = random.Random(f"{spec.seed}:emb:{index}")
+    v = [rng.gauss(0.0, 1.0) for _ in range(EMBEDDING_DIMS)]
+    norm = math.sqrt(sum(x * x for x in v)) or 1.0
+    return "[" + ",".join(f"{x / norm:.5f}" for x in v) + "]"
+
+
+T = TypeVar("T")
+
+
+def _chunks(items: Iterator[T], size: int) -> Iterator[List[T]]:
+    while True:
+        chunk = list(itertools.islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def load(spec: SyntheticSpec, chunk_size: int = 50_000, progress: bool = False) -> Dict[str, Any]:
+    """Generate ``spec`` and bulk-load it with COPY; returns row counts and timing.
+
+    Each chunk commits on its own, so an interrupted load leaves whole chunks behind.
+    Tables are ANALYZEd at the end so the planner sees the new distribution.
+    """
+    t0 = time.perf_counter()
+    atom_ids = array("q")
+    stats = {"atoms": 0, "fibers": 0, "aspects": 0}
+
+    def report(what: str) -> None:
+        if progress:
+            print(f"[synthetic] {what}: {stats}", file=sys.stderr)
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            for chunk in _chunks(generate_atoms(spec), chunk_size):
+                with conn.transaction():
+                    ids = reserve_ids(cur, "atoms", len(chunk))
+                    copy_rows(
+                        cur,
+                        "atoms",
+                        ("id", "kind", "label"),
+                        ((i, kind, label) for i, (kind, label) in zip(ids, chunk)),
+                    )
+                atom_ids.extend(ids)
+                stats["atoms"] += len(chunk)
+                report("atoms")
+
+            for facts in _chunks(generate_facts(spec), chunk_size):
+                with conn.transaction():
+                    ids = reserve_ids(cur, "fibers", len(facts))
+                    copy_rows(
+                        cur,
+                        "fibers",
+                        ("id", "src", "dst", "predicate"),
+                        (
+                            (i, atom_ids[f.src], atom_ids[f.dst], f.predicate)
+                            for i, f in zip(ids, facts)
+                        ),
+                    )
+                    copy_rows(
+                        cur,
+                        "aspects",
+                        (
+                            "subject_kind",
+                            "subject_id",
+                            "valid_from",
+                            "valid_to",
+                            "observed_at",
+                            "belief",
+                            "provenance",
+                        ),
+                        (
+                            (
+                                "fiber",
+                                i,
+                                f.valid_from,
+                                f.valid_to,
+                                f.valid_from or EPOCH,
+                                f.belief,
+                                Json(f.provenance),
+                            )
+                            for i, f in zip(ids, facts)
+                        ),
+                    )
+                stats["fibers"] += len(facts)
+                stats["aspects"] += len(facts)
+                report("facts")
+
+            if spec.embeddings:
+                indexes: Sequence[int] = range(len(atom_ids))
+                for chunk_idx in _chunks(iter(indexes), chunk_size):
+                    with conn.transaction():
+                        copy_rows(
+                            cur,
+                            "aspects",
+                            ("subject_kind", "subject_id", "embedding"),
+                            (("atom", atom_ids[i], embedding(spec, i)) for i in chunk_idx),
+                        )
+                    stats["aspects"] += len(chunk_idx)
+                    report("embeddings")
+
+            cur.execute("ANALYZE atoms")
+            cur.execute("ANALYZE fibers")
+            cur.execute("ANALYZE aspects")
+    invalidate_stats()
+
+    return {**stats, "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser(description="Load a deterministic synthetic dataset")
+    ap.add_argument("--preset", choices=sorted(PRESETS), default="10k")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--atoms", type=int, help="override the preset's atom count")
+    ap.add_argument("--facts", type=int, help="override the preset's fact count")
+    ap.add_argument("--embeddings", action="store_true", help="add atom embeddings")
+    ap.add_argument("--chunk-size", type=int, default=50_000)
+    args = ap.parse_args(argv)
+
+    spec = replace(PRESETS[args.preset], seed=args.seed, embeddings=args.embeddings)
+    if args.atoms is not None:
+        spec = replace(spec, atoms=args.atoms)
+    if args.facts is not None:
+        spec = replace(spec, facts=args.facts)
+    stats = load(spec, chunk_size=args.chunk_size, progress=True)
+    print(f"Synthetic dataset loaded: {stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -1,18 +1,33 @@
-from typing import List, Optional, Sequence, Tuple
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, TypeVar
 
+from cns_py import metrics
 from cns_py.storage.db import get_conn
 
 Edge = Tuple[str, str, str]
+# (src atom id, predicate, dst atom id)
+IdEdge = Tuple[int, str, int]
+# (fiber id, src atom id, predicate, dst atom id)
+FiberEdge = Tuple[int, int, str, int]
+# atom id -> (label, kind)
+AtomInfo = Dict[int, Tuple[str, str]]
 
+N = TypeVar("N")
 
-def traverse_from(
+
+def traverse_ids(
     ids: Sequence[int],
     hops: int = 1,
     predicates: Optional[Sequence[str]] = None,
     limit: int = 1000,
-) -> List[Edge]:
+) -> Tuple[List[IdEdge], AtomInfo]:
+    """Like ``traverse_from`` but keeps atom identity.
+
+    Returns the edges as atom ids plus the label and kind of every endpoint, so
+    callers can tell apart atoms that share a label.
+    """
     if not ids:
-        return []
+        return [], {}
 
     # Use lists for psycopg array adaptation and cast to specific array types in SQL
     ids_list: List[int] = [int(i) for i in ids]
@@ -31,32 +46,167 @@ def traverse_from(
             preds_clause = " AND f.predicate = ANY(%(preds)s::text[])"
             params["preds"] = preds_list
 
-    results: List[Edge] = []
+    if hops <= 1:
+        sql = (
+            "SELECT a_src.id, a_src.label, a_src.kind, f.predicate, "
+            "a_dst.id, a_dst.label, a_dst.kind "
+            "FROM fibers f "
+            "JOIN atoms a_src ON a_src.id = f.src "
+            "JOIN atoms a_dst ON a_dst.id = f.dst "
+            f"WHERE f.src IN ({id_placeholders})" + preds_clause + " LIMIT %(limit)s"
+        )
+    else:
+        # 2-hop traversal
+        sql = (
+            "SELECT a1.id, a1.label, a1.kind, f1.predicate, a2.id, a2.label, a2.kind "
+            "FROM fibers f1 "
+            "JOIN fibers f2 ON f1.dst = f2.src "
+            "JOIN atoms a1 ON a1.id = f1.src "
+            "JOIN atoms a2 ON a2.id = f2.dst "
+            f"WHERE f1.src IN ({id_placeholders})"
+            + preds_clause.replace("f.", "f1.")
+            + " LIMIT %(limit)s"
+        )
+
+    edges: List[IdEdge] = []
+    atoms: AtomInfo = {}
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            t0 = time.perf_counter()
+            cur.execute(sql, params)
+            for src_id, src_label, src_kind, pred, dst_id, dst_label, dst_kind in cur.fetchall():
+                edges.append((int(src_id), str(pred), int(dst_id)))
+                atoms[int(src_id)] = (str(src_label), str(src_kind))
+                atoms[int(dst_id)] = (str(dst_label), str(dst_kind))
+            metrics.DB_ROUNDTRIP_SECONDS.observe(time.perf_counter() - t0, op="graph_traverse")
+    return edges, atoms
+
+
+def traverse_from(
+    ids: Sequence[int],
+    hops: int = 1,
+    predicates: Optional[Sequence[str]] = None,
+    limit: int = 1000,
+) -> List[Edge]:
+    edges, atoms = traverse_ids(ids, hops=hops, predicates=predicates, limit=limit)
+    return [(atoms[src][0], pred, atoms[dst][0]) for src, pred, dst in edges]
+
+
+def atom_info(ids: Sequence[int]) -> AtomInfo:
+    """Label and kind for each of ``ids`` that exists."""
+    if not ids:
+        return {}
     with get_conn() as conn:
         with conn.cursor() as cur:
-            if hops <= 1:
-                sql = (
-                    "SELECT a_src.label, f.predicate, a_dst.label "
-                    "FROM fibers f "
-                    "JOIN atoms a_src ON a_src.id = f.src "
-                    "JOIN atoms a_dst ON a_dst.id = f.dst "
-                    f"WHERE f.src IN ({id_placeholders})" + preds_clause + " LIMIT %(limit)s"
-                )
-                cur.execute(sql, params)
-                for row in cur.fetchall():
-                    results.append((str(row[0]), str(row[1]), str(row[2])))
-                return results
-
-            # 2-hop traversal
-            sql2 = (
-                "SELECT a1.label, f1.predicate, a2.label "
-                "FROM fibers f1 "
-                "JOIN fibers f2 ON f1.dst = f2.src "
-                "JOIN atoms a1 ON a1.id = f1.src "
-                "JOIN atoms a2 ON a2.id = f2.dst "
-                f"WHERE f1.src IN ({id_placeholders})" + preds_clause + " LIMIT %(limit)s"
+            cur.execute(
+                "SELECT id, label, kind FROM atoms WHERE id = ANY(%(ids)s::bigint[])",
+                {"ids": [int(i) for i in ids]},
             )
-            cur.execute(sql2, params)
-            for row in cur.fetchall():
-                results.append((str(row[0]), str(row[1]), str(row[2])))
-    return results
+            return {int(r[0]): (str(r[1]), str(r[2])) for r in cur.fetchall()}
+
+
+def expand_frontier(
+    frontier: Sequence[int],
+    known: Sequence[int] = (),
+    predicates: Optional[Sequence[str]] = None,
+    limit: int = 1000,
+) -> Tuple[List[FiberEdge], AtomInfo]:
+    """One hop out of ``frontier``, returning only what a client does not have yet.
+
+    ``known`` holds the atom ids the caller already renders; they (and the frontier
+    itself) are never returned as new atoms, and the database only ships label/kind
+    for the rest. Edges carry their fiber id so clients can dedupe across calls.
+    Returns ``(edges, new_atoms)``.
+    """
+    if not frontier:
+        return [], {}
+    seen = [int(i) for i in known] + [int(i) for i in frontier]
+    params: dict[str, object] = {
+        "frontier": [int(i) for i in frontier],
+        "seen": seen,
+        "limit": int(limit),
+    }
+    preds_clause = ""
+    if predicates:
+        preds_clause = " AND f.predicate = ANY(%(preds)s::text[])"
+        params["preds"] = [str(p) for p in predicates]
+    # Label/kind are only joined in for atoms outside the caller's set.
+    sql = (
+        "SELECT f.id, f.src, f.predicate, f.dst, a.label, a.kind "
+        "FROM fibers f "
+        "LEFT JOIN atoms a ON a.id = f.dst AND NOT (f.dst = ANY(%(seen)s::bigint[])) "
+        "WHERE f.src = ANY(%(frontier)s::bigint[])" + preds_clause + " "
+        "ORDER BY f.id LIMIT %(limit)s"
+    )
+    edges: List[FiberEdge] = []
+    new_atoms: AtomInfo = {}
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            t0 = time.perf_counter()
+            cur.execute(sql, params)
+            for fiber_id, src, pred, dst, label, kind in cur.fetchall():
+                edges.append((int(fiber_id), int(src), str(pred), int(dst)))
+                if label is not None:
+                    new_atoms[int(dst)] = (str(label), str(kind))
+            metrics.DB_ROUNDTRIP_SECONDS.observe(time.perf_counter() - t0, op="graph_expand")
+    return edges, new_atoms
+
+
+def cluster_key(src: object, predicate: str) -> str:
+    """Stable key for the fan-out of ``src`` over ``predicate``.
+
+    Predicates are identifiers, so the first '|' unambiguously splits the key.
+    """
+    return f"{predicate}|{src}"
+
+
+def fanout_counts(groups: Sequence[Tuple[int, str]]) -> Dict[Tuple[int, str], int]:
+    """Total fiber count of each ``(src atom id, predicate)`` group, in one query.
+
+    Traversals stop at their LIMIT, so counting their edges undercounts large hubs.
+    """
+    if not groups:
+        return {}
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            t0 = time.perf_counter()
+            cur.execute(
+                "SELECT f.src, f.predicate, count(*) FROM fibers f "
+                "JOIN unnest(%(srcs)s::bigint[], %(preds)s::text[]) g(src, predicate) "
+                "ON g.src = f.src AND g.predicate = f.predicate "
+                "GROUP BY f.src, f.predicate",
+                {"srcs": [int(src) for src, _ in groups], "preds": [p for _, p in groups]},
+            )
+            counts = {(int(src), str(pred)): int(n) for src, pred, n in cur.fetchall()}
+            metrics.DB_ROUNDTRIP_SECONDS.observe(time.perf_counter() - t0, op="graph_fanout")
+    return counts
+
+
+def collapse_fanout(
+    edges: Sequence[Tuple[N, str, N]],
+    threshold: int,
+    expand: Sequence[str] = (),
+    totals: Optional[Dict[Tuple[N, str], int]] = None,
+) -> Tuple[List[Tuple[N, str, N]], Dict[Tuple[N, str], int]]:
+    """Collapse high-degree fan-out into counted groups for level-of-detail views.
+
+    Edges are grouped by (source, predicate). Groups with more than ``threshold``
+    edges are removed and reported as ``{(src, predicate): count}`` unless their
+    ``cluster_key`` is listed in ``expand``. Returns the remaining edges (in input
+    order) and the collapsed groups. When ``edges`` were cut at a limit, pass the
+    true group sizes as ``totals`` (see ``fanout_counts``); otherwise the edges are
+    counted.
+    """
+    counts: Dict[Tuple[N, str], int] = {}
+    for src, pred, _dst in edges:
+        counts[(src, pred)] = counts.get((src, pred), 0) + 1
+    if totals is not None:
+        counts = {group: max(n, totals.get(group, 0)) for group, n in counts.items()}
+    expanded = set(expand)
+    collapsed = {
+        group: n
+        for group, n in counts.items()
+        if n > threshold and cluster_key(group[0], group[1]) not in expanded
+    }
+    kept = [e for e in edges if (e[0], e[1]) not in collapsed]
+    return kept, collapsed
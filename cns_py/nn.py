@@ -1,5 +1,7 @@
+import time
 from typing import List
 
+from cns_py import metrics
 from cns_py.storage.db import get_conn
 
 
@@ -8,12 +10,14 @@ def nn_search(query: str, k: int = 5, space: str = "default") -> List[int]:
     ids: List[int] = []
     with get_conn() as conn:
         with conn.cursor() as cur:
+            t0 = time.perf_counter()
             cur.execute(
                 "SELECT id FROM atoms WHERE label ILIKE %(q)s "
                 "ORDER BY LENGTH(label) ASC LIMIT %(k)s",
                 {"q": q, "k": k},
             )
             rows = cur.fetchall()
+            metrics.DB_ROUNDTRIP_SECONDS.observe(time.perf_counter() - t0, op="nn_search")
             for (atom_id,) in rows:
                 try:
                     ids.append(int(atom_id))
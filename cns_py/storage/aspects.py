@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from psycopg.types.json import Json
+
+from cns_py.storage.sources import PROVENANCE_SQL
+
+# Aspect versioning. Aspects are never updated in place: a new observation closes the
+# subject's current row (observed_to = the new row's observed_at) and inserts the next
+# version, so "what did we know at Y" stays answerable (CQL ``ASOF KNOWN``).
+
+_HISTORY_COLUMNS = (
+    "id",
+    "valid_from",
+    "valid_to",
+    "observed_at",
+    "observed_to",
+    "belief",
+)
+
+
+def record_aspect(
+    cur: Any,
+    subject_kind: str,
+    subject_id: int,
+    *,
+    valid_from: Optional[datetime] = None,
+    valid_to: Optional[datetime] = None,
+    belief: Optional[float] = None,
+    provenance: Optional[Dict[str, Any]] = None,
+    observed_at: Optional[datetime] = None,
+) -> int:
+    """Make a new version current for the subject and return its id.
+
+    The previous version (if any) is closed at the same instant the new one starts:
+    ``observed_at`` when given (backfills), otherwise the transaction time ``now()``.
+    Raises ValueError when that instant precedes the current version's observed_at,
+    which would leave it an inverted ``[observed_at, observed_to)`` interval.
+    """
+    with cur.connection.transaction():
+        cur.execute(
+            "SELECT observed_at, COALESCE(%(at)s, now()) FROM aspects "
+            "WHERE subject_kind = %(kind)s AND subject_id = %(id)s AND observed_to IS NULL "
+            "FOR UPDATE",
+            {"at": observed_at, "kind": subject_kind, "id": subject_id},
+        )
+        current = cur.fetchone()
+        if current is not None and current[1] < current[0]:
+            raise ValueError(
+                f"observed_at {current[1].isoformat()} precedes the current version's "
+                f"observed_at {current[0].isoformat()}"
+            )
+        cur.execute(
+            "UPDATE aspects SET observed_to = COALESCE(%(at)s, now()) "
+            "WHERE subject_kind = %(kind)s AND subject_id = %(id)s AND observed_to IS NULL",
+            {"at": observed_at, "kind": subject_kind, "id": subject_id},
+        )
+        cur.execute(
+            "INSERT INTO aspects(subject_kind, subject_id, valid_from, valid_to, belief, "
+            "provenance, observed_at) VALUES (%s, %s, %s, %s, %s, %s, COALESCE(%s, now())) "
+            "RETURNING id",
+            (
+                subject_kind,
+                subject_id,
+                valid_from,
+                valid_to,
+                belief,
+                Json(provenance) if provenance is not None else None,
+                observed_at,
+            ),
+        )
+        return int(cur.fetchone()[0])
+
+
+def aspect_history(cur: Any, subject_kind: str, subject_id: int) -> List[Dict[str, Any]]:
+    """All versions of a subject's aspect, oldest first, with provenance as written."""
+    columns = _HISTORY_COLUMNS + ("provenance",)
+    cur.execute(
+        f"SELECT {', '.join('asp.' + c for c in _HISTORY_COLUMNS)}, {PROVENANCE_SQL} "
+        "FROM aspects asp LEFT JOIN sources s ON s.id = asp.source_ref "
+        "WHERE asp.subject_kind = %s AND asp.subject_id = %s ORDER BY asp.observed_at, asp.id",
+        (subject_kind, subject_id),
+    )
+    return [dict(zip(columns, row)) for row in cur.fetchall()]
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from typing import Any, Iterable, List, Sequence
+
+from psycopg import sql
+
+# Bulk-load helpers shared by the synthetic generator and other loaders.
+#
+# COPY is an order of magnitude faster than row-at-a-time INSERTs, but it cannot return
+# generated ids. Callers therefore reserve ids from the table's sequence first and
+# COPY rows with explicit ids.
+
+
+def reserve_ids(cur: Any, table: str, count: int) -> List[int]:
+    """Draw ``count`` ids from ``table``'s ``id`` sequence.
+
+    Ids come from ``nextval`` so concurrent inserts never collide with them; they are
+    increasing but not necessarily contiguous.
+    """
+    if count <= 0:
+        return []
+    cur.execute(
+        "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+        (table, count),
+    )
+    return [int(r[0]) for r in cur.fetchall()]
+
+
+def copy_rows(cur: Any, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> int:
+    """COPY ``rows`` into ``table`` and return the row count.
+
+    Values are adapted by psycopg, so ``Json`` wrappers, datetimes and ``None`` work as
+    in regular queries. Vectors should be passed in their text form (``"[0.1,...]"``).
+    """
+    stmt = sql.SQL("COPY {} ({}) FROM STDIN").format(
+        sql.Identifier(table), sql.SQL(", ").join(sql.Identifier(c) for c in columns)
+    )
+    n = 0
+    with cur.copy(stmt) as copy:
+        for row in rows:
+            copy.write_row(row)
+            n += 1
+    return n
@@ -1,11 +1,17 @@
 import argparse
+import contextvars
 import os
 import sys
+import threading
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Iterator, List, Optional
 
 import psycopg
 
+from cns_py import metrics
+
 
 @dataclass
 class DbConfig:
@@ -29,16 +35,99 @@ class DbConfig:
             self.password = os.getenv("CNS_DB_PASSWORD", "cns")
 
 
+class QueryScope:
+    """Deadline and cancellation handle for the queries of one request.
+
+    Connections opened by ``get_conn`` while the scope is active get a
+    ``statement_timeout`` equal to the time left before the deadline, and ``cancel``
+    aborts whatever they are running server-side.
+    """
+
+    def __init__(self, timeout_ms: Optional[int] = None) -> None:
+        self.deadline = None if not timeout_ms else time.monotonic() + timeout_ms / 1000.0
+        self.cancelled = False
+        # Set when other requests share this scope's result; cancelling would fail them too.
+        self.pinned = False
+        self._lock = threading.Lock()
+        self._conns: List[psycopg.Connection] = []
+
+    def remaining_ms(self) -> Optional[int]:
+        if self.deadline is None:
+            return None
+        return int((self.deadline - time.monotonic()) * 1000)
+
+    def register(self, conn: psycopg.Connection) -> None:
+        with self._lock:
+            self._conns = [c for c in self._conns if not c.closed]
+            self._conns.append(conn)
+        if self.cancelled:
+            conn.cancel()
+
+    def pin(self) -> bool:
+        """Keep ``cancel`` from aborting this scope; returns False if it already did."""
+        with self._lock:
+            if self.cancelled:
+                return False
+            self.pinned = True
+            return True
+
+    def cancel(self) -> bool:
+        """Cancel running statements; returns False when the scope is pinned."""
+        with self._lock:
+            if self.pinned:
+                return False
+            self.cancelled = True
+            conns = [c for c in self._conns if not c.closed]
+        for conn in conns:
+            try:
+                conn.cancel()
+            except psycopg.Error:
+                pass
+        return True
+
+
+_scope: contextvars.ContextVar[Optional[QueryScope]] = contextvars.ContextVar(
+    "cns_query_scope", default=None
+)
+
+
+def current_query_scope() -> Optional[QueryScope]:
+    return _scope.get()
+
+
+@contextmanager
+def query_scope(scope: QueryScope) -> Iterator[QueryScope]:
+    """Run the enclosed queries under ``scope`` (deadline + cancellation)."""
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
 def get_conn(cfg: Optional[DbConfig] = None) -> psycopg.Connection:
     cfg = cfg or DbConfig()
-    return psycopg.connect(
+    scope = _scope.get()
+    options = None
+    if scope is not None:
+        remaining = scope.remaining_ms()
+        if remaining is not None:
+            if remaining <= 0:
+                raise TimeoutError("query deadline exceeded")
+            options = f"-c statement_timeout={remaining}"
+    conn = psycopg.connect(
         host=cfg.host,
         port=cfg.port,
         dbname=cfg.dbname,
         user=cfg.user,
         password=cfg.password,
         autocommit=True,
+        options=options,
     )
+    metrics.DB_CONNECTIONS.inc()
+    if scope is not None:
+        scope.register(conn)
+    return conn
 
 
 SCHEMA_SQL = r"""
@@ -62,27 +151,260 @@ CREATE TABLE IF NOT EXISTS fibers (
   created_at TIMESTAMPTZ DEFAULT now()
 );
 
--- Aspects associated to atoms or fibers (one row per subject+aspect type)
+-- Cited documents, stored once and referenced from aspects.source_ref
+-- (see cns_py.storage.sources)
+CREATE TABLE IF NOT EXISTS sources (
+  id BIGSERIAL PRIMARY KEY,
+  source_id TEXT,
+  uri TEXT,
+  hash TEXT,
+  fetched_at TEXT,
+  digest TEXT NOT NULL UNIQUE    -- md5 of the fields above, for deduplication
+);
+
+-- Aspects associated to atoms or fibers: a version history per subject, of which the
+-- row with observed_to IS NULL is current (see cns_py.storage.aspects)
 CREATE TABLE IF NOT EXISTS aspects (
   id BIGSERIAL PRIMARY KEY,
   subject_kind TEXT NOT NULL CHECK (subject_kind IN ('atom','fiber')),
   subject_id BIGINT NOT NULL,
-  -- bitemporal tape
+  -- bitemporal tape: valid time [valid_from, valid_to), transaction time
+  -- [observed_at, observed_to); NULL bounds are open
   valid_from TIMESTAMPTZ,
   valid_to   TIMESTAMPTZ,
   observed_at TIMESTAMPTZ DEFAULT now(),
+  observed_to TIMESTAMPTZ,
   -- belief
   belief REAL,                   -- 0..1 confidence
-  -- provenance
-  provenance JSONB,              -- {source:..., evidence:...}
+  -- provenance: the cited source, plus per-fact detail such as line_span
+  source_ref BIGINT REFERENCES sources(id),
+  provenance JSONB,
   -- vectors (multi-space); use separate table for real workloads; simple here
-  embedding vector(384),
-  UNIQUE(subject_kind, subject_id)
+  embedding vector(384)
 );
+-- Databases created before aspect history kept one row per subject
+ALTER TABLE aspects ADD COLUMN IF NOT EXISTS observed_to TIMESTAMPTZ;
+ALTER TABLE aspects DROP CONSTRAINT IF EXISTS aspects_subject_kind_subject_id_key;
+-- Databases created before sources kept each citation in provenance
+ALTER TABLE aspects ADD COLUMN IF NOT EXISTS source_ref BIGINT REFERENCES sources(id);
+-- A partitioned aspects enforces this per partition (see cns_py.storage.partitions)
+DO $$
+BEGIN
+  IF (SELECT relkind FROM pg_class WHERE oid = 'aspects'::regclass) = 'r' THEN
+    CREATE UNIQUE INDEX IF NOT EXISTS uniq_aspects_current
+      ON aspects(subject_kind, subject_id) WHERE observed_to IS NULL;
+  END IF;
+END $$;
 
 CREATE INDEX IF NOT EXISTS idx_fibers_src ON fibers(src);
 CREATE INDEX IF NOT EXISTS idx_fibers_dst ON fibers(dst);
 CREATE INDEX IF NOT EXISTS idx_aspects_subject ON aspects(subject_kind, subject_id);
+-- Driving indexes for the CQL planner's label-, predicate- and validity-first strategies
+CREATE INDEX IF NOT EXISTS idx_atoms_label ON atoms(label);
+CREATE INDEX IF NOT EXISTS idx_fibers_predicate ON fibers(predicate);
+CREATE INDEX IF NOT EXISTS idx_aspects_fiber_valid_from
+  ON aspects ((COALESCE(valid_from, '-infinity'::timestamptz)))
+  WHERE subject_kind = 'fiber';
+-- Fiber versions by transaction time, then valid time, for ASOF ... ASOF KNOWN lookups
+CREATE INDEX IF NOT EXISTS idx_aspects_fiber_bitemporal
+  ON aspects (subject_id, (COALESCE(observed_to, 'infinity'::timestamptz)),
+              (COALESCE(observed_at, '-infinity'::timestamptz)),
+              (COALESCE(valid_from, '-infinity'::timestamptz)))
+  WHERE subject_kind = 'fiber';
+-- Keyset pagination order for CQL results: (belief, fiber id) descending. CQL only
+-- returns cited facts (source_ref set), so the index holds those alone.
+DROP INDEX IF EXISTS idx_aspects_fiber_belief;
+CREATE INDEX IF NOT EXISTS idx_aspects_fiber_cited
+  ON aspects ((COALESCE(belief, 0.0)) DESC, subject_id DESC)
+  WHERE subject_kind = 'fiber' AND source_ref IS NOT NULL;
+-- Foreign key lookups from sources
+CREATE INDEX IF NOT EXISTS idx_aspects_source_ref ON aspects(source_ref);
+
+-- Writers keep passing full provenance JSON: a citation (source_id or uri) moves its
+-- document fields into sources and leaves per-fact keys behind, NULL when none remain.
+-- Updating provenance replaces all of it, so an update without a citation uncites the
+-- aspect. An insert without one keeps the source_ref it was given (bulk loaders resolve
+-- sources themselves).
+CREATE OR REPLACE FUNCTION aspects_normalize_source() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+  doc JSONB;
+  ref BIGINT;
+BEGIN
+  IF jsonb_typeof(NEW.provenance) IS DISTINCT FROM 'object'
+     OR (COALESCE(NEW.provenance->>'source_id', '') = ''
+         AND COALESCE(NEW.provenance->>'uri', '') = '') THEN
+    IF TG_OP = 'UPDATE' THEN
+      NEW.source_ref := NULL;
+    END IF;
+    RETURN NEW;
+  END IF;
+  doc := jsonb_build_object(
+    'source_id', NEW.provenance->>'source_id', 'uri', NEW.provenance->>'uri',
+    'hash', NEW.provenance->>'hash', 'fetched_at', NEW.provenance->>'fetched_at');
+  SELECT id INTO ref FROM sources WHERE digest = md5(doc::text);
+  IF ref IS NULL THEN
+    INSERT INTO sources(source_id, uri, hash, fetched_at, digest)
+    VALUES (doc->>'source_id', doc->>'uri', doc->>'hash', doc->>'fetched_at', md5(doc::text))
+    ON CONFLICT (digest) DO NOTHING
+    RETURNING id INTO ref;
+    IF ref IS NULL THEN  -- inserted concurrently
+      SELECT id INTO ref FROM sources WHERE digest = md5(doc::text);
+    END IF;
+  END IF;
+  NEW.source_ref := ref;
+  NEW.provenance := NULLIF(jsonb_strip_nulls(
+    NEW.provenance - ARRAY['source_id', 'uri', 'hash', 'fetched_at']), '{}'::jsonb);
+  RETURN NEW;
+END $$;
+CREATE OR REPLACE TRIGGER trg_aspects_source
+  BEFORE INSERT OR UPDATE OF provenance ON aspects
+  FOR EACH ROW EXECUTE FUNCTION aspects_normalize_source();
+
+-- Present-time read model: each fiber with its labels and current aspect version
+-- (NULLs without one), kept in step with atoms, fibers and aspects by the triggers
+-- below. CQL queries without ASOF KNOWN read it instead of joining four tables.
+CREATE TABLE IF NOT EXISTS current_fibers (
+  fiber_id BIGINT PRIMARY KEY REFERENCES fibers(id) ON DELETE CASCADE,
+  src BIGINT NOT NULL,
+  dst BIGINT NOT NULL,
+  subject_label TEXT NOT NULL,
+  predicate TEXT NOT NULL,
+  object_label TEXT NOT NULL,
+  valid_from TIMESTAMPTZ,
+  valid_to   TIMESTAMPTZ,
+  observed_at TIMESTAMPTZ,
+  belief REAL,
+  source_ref BIGINT,
+  provenance JSONB
+);
+ALTER TABLE current_fibers ADD COLUMN IF NOT EXISTS source_ref BIGINT;
+-- Label- and predicate-driven lookups come back in result order (belief, fiber id).
+-- Partial on the citations contract, so uncited fibers are never scanned.
+DROP INDEX IF EXISTS idx_current_fibers_label;
+DROP INDEX IF EXISTS idx_current_fibers_predicate;
+DROP INDEX IF EXISTS idx_current_fibers_belief;
+CREATE INDEX IF NOT EXISTS idx_current_fibers_label_cited
+  ON current_fibers (subject_label, predicate, (COALESCE(belief, 0.0)) DESC, fiber_id DESC)
+  WHERE source_ref IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_current_fibers_predicate_cited
+  ON current_fibers (predicate, (COALESCE(belief, 0.0)) DESC, fiber_id DESC)
+  WHERE source_ref IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_current_fibers_belief_cited
+  ON current_fibers ((COALESCE(belief, 0.0)) DESC, fiber_id DESC)
+  WHERE source_ref IS NOT NULL;
+-- Label renames
+CREATE INDEX IF NOT EXISTS idx_current_fibers_src ON current_fibers(src);
+CREATE INDEX IF NOT EXISTS idx_current_fibers_dst ON current_fibers(dst);
+
+-- Recompute the current_fibers rows of the fibers whose ids the query %s returns. The
+-- triggers below EXECUTE it over their transition tables, so every call is planned
+-- for the actual number of changed rows: a plan cached for a handful of ids turns a
+-- bulk COPY into a nested loop over every current aspect.
+CREATE OR REPLACE FUNCTION current_fibers_upsert_sql() RETURNS text
+LANGUAGE sql IMMUTABLE AS $fn$ SELECT $sql$
+  INSERT INTO current_fibers AS cf
+    (fiber_id, src, dst, subject_label, predicate, object_label,
+     valid_from, valid_to, observed_at, belief, source_ref, provenance)
+  SELECT f.id, f.src, f.dst, a_src.label, f.predicate, a_dst.label,
+         asp.valid_from, asp.valid_to, asp.observed_at, asp.belief, asp.source_ref,
+         asp.provenance
+  FROM (SELECT DISTINCT id FROM (%s) changed(id)) n
+  JOIN fibers f ON f.id = n.id
+  JOIN atoms a_src ON a_src.id = f.src
+  JOIN atoms a_dst ON a_dst.id = f.dst
+  LEFT JOIN aspects asp
+    ON asp.subject_kind = 'fiber' AND asp.subject_id = f.id AND asp.observed_to IS NULL
+  ON CONFLICT (fiber_id) DO UPDATE SET
+    src = EXCLUDED.src, dst = EXCLUDED.dst, subject_label = EXCLUDED.subject_label,
+    predicate = EXCLUDED.predicate, object_label = EXCLUDED.object_label,
+    valid_from = EXCLUDED.valid_from, valid_to = EXCLUDED.valid_to,
+    observed_at = EXCLUDED.observed_at, belief = EXCLUDED.belief,
+    source_ref = EXCLUDED.source_ref, provenance = EXCLUDED.provenance
+$sql$ $fn$;
+
+-- Recompute the current_fibers rows of the given fibers
+CREATE OR REPLACE FUNCTION current_fibers_refresh(ids BIGINT[]) RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+  EXECUTE format(current_fibers_upsert_sql(), 'SELECT unnest($1)') USING ids;
+END $$;
+
+-- Statement-level triggers over transition tables keep COPY and bulk INSERTs set-based
+CREATE OR REPLACE FUNCTION current_fibers_on_fiber() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  EXECUTE format(current_fibers_upsert_sql(), 'SELECT id FROM new_rows');
+  RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION current_fibers_on_aspect() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    EXECUTE format(current_fibers_upsert_sql(),
+      'SELECT subject_id FROM new_rows WHERE subject_kind = ''fiber''');
+  ELSIF TG_OP = 'UPDATE' THEN
+    EXECUTE format(current_fibers_upsert_sql(),
+      'SELECT subject_id FROM new_rows WHERE subject_kind = ''fiber'' '
+      'UNION SELECT subject_id FROM old_rows WHERE subject_kind = ''fiber''');
+  ELSE
+    EXECUTE format(current_fibers_upsert_sql(),
+      'SELECT subject_id FROM old_rows WHERE subject_kind = ''fiber''');
+  END IF;
+  RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION current_fibers_on_label() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  UPDATE current_fibers SET subject_label = NEW.label WHERE src = NEW.id;
+  UPDATE current_fibers SET object_label = NEW.label WHERE dst = NEW.id;
+  RETURN NULL;
+END $$;
+
+CREATE OR REPLACE TRIGGER trg_current_fibers_fiber_insert
+  AFTER INSERT ON fibers REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION current_fibers_on_fiber();
+CREATE OR REPLACE TRIGGER trg_current_fibers_fiber_update
+  AFTER UPDATE ON fibers REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION current_fibers_on_fiber();
+CREATE OR REPLACE TRIGGER trg_current_fibers_aspect_insert
+  AFTER INSERT ON aspects REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION current_fibers_on_aspect();
+CREATE OR REPLACE TRIGGER trg_current_fibers_aspect_update
+  AFTER UPDATE ON aspects REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION current_fibers_on_aspect();
+CREATE OR REPLACE TRIGGER trg_current_fibers_aspect_delete
+  AFTER DELETE ON aspects REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION current_fibers_on_aspect();
+CREATE OR REPLACE TRIGGER trg_current_fibers_label
+  AFTER UPDATE OF label ON atoms
+  FOR EACH ROW WHEN (OLD.label IS DISTINCT FROM NEW.label)
+  EXECUTE FUNCTION current_fibers_on_label();
+
+-- Populate once for databases created before the read model existed
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM current_fibers) THEN
+    PERFORM current_fibers_refresh(ARRAY(SELECT id FROM fibers));
+  END IF;
+END $$;
+
+-- Move citations written before sources existed (the triggers above do the work)
+UPDATE aspects SET provenance = provenance
+WHERE source_ref IS NULL AND jsonb_typeof(provenance) = 'object'
+  AND (COALESCE(provenance->>'source_id', '') <> '' OR COALESCE(provenance->>'uri', '') <> '');
+
+-- Journal segments replayed into this database (cns_py.storage.journal). A replay
+-- limited to a transaction time records it in known; NULL means fully applied.
+CREATE TABLE IF NOT EXISTS journal_segments (
+  segment BIGINT PRIMARY KEY,
+  checksum TEXT NOT NULL,
+  rows BIGINT NOT NULL,
+  known TIMESTAMPTZ,
+  applied_at TIMESTAMPTZ DEFAULT now()
+);
 """
 
 
@@ -0,0 +1,474 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import psycopg
+from dateutil.parser import isoparse
+from psycopg.types.json import Json
+
+from cns_py.cql.planner import invalidate_stats
+from cns_py.storage.bulk import copy_rows, reserve_ids
+from cns_py.storage.db import get_conn
+from cns_py.storage.sources import SOURCE_FIELDS, SourceKey, resolve_sources, split_citation
+
+# Parallel bulk ingestion of facts from JSONL, CSV or Parquet files.
+#
+# One record is one fact: ``subject`` --``predicate``--> ``object`` with an optional
+# aspect (validity window, observed_at, belief, provenance). Atoms are keyed by
+# (kind, label). Loading runs in three phases over a pool of worker processes, each with
+# its own connection:
+#
+#   1. Atoms. The distinct atom keys are sharded by key hash, and each worker resolves
+#      its shard: existing atoms are looked up, missing ones get ids from the atoms
+#      sequence and are COPYed in. Shards are disjoint, so no two workers ever insert
+#      the same atom and no unique index or ON CONFLICT retry is needed.
+#   2. Sources. The distinct cited documents are upserted into ``sources`` in digest
+#      order from this process. Fact chunks then carry their ``source_ref`` and never
+#      insert a source themselves: concurrent chunks inserting the same new documents
+#      in different orders would deadlock on each other's uncommitted rows.
+#   3. Facts. Records are sharded by subject key and shipped in chunks with their atom
+#      and source ids resolved; workers resolve fibers by (src, predicate, dst),
+#      inserting the missing ones, and COPY the facts' aspects as new versions. Sharding
+#      by subject, with one chunk per shard in flight, keeps concurrent chunks from ever
+#      inserting the same fiber, and their current_fibers refreshes touch disjoint rows.
+#
+# Each chunk commits on its own, like ``demo.synthetic.load``: an interrupted ingest
+# leaves whole chunks behind. Atom resolution assumes no other writer inserts the same
+# atoms concurrently.
+
+FORMATS = ("jsonl", "csv", "parquet")
+DEFAULT_KIND = "Entity"
+CHUNK_ROWS = 20_000
+
+AtomKey = Tuple[str, str]  # (kind, label)
+
+
+@dataclass(frozen=True)
+class FactRecord:
+    subject_kind: str
+    subject: str
+    predicate: str
+    object_kind: str
+    object: str
+    valid_from: Optional[datetime] = None
+    valid_to: Optional[datetime] = None
+    observed_at: Optional[datetime] = None
+    belief: Optional[float] = None
+    provenance: Optional[Dict[str, Any]] = None
+
+    @property
+    def subject_key(self) -> AtomKey:
+        return (self.subject_kind, self.subject)
+
+    @property
+    def object_key(self) -> AtomKey:
+        return (self.object_kind, self.object)
+
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value
+    return isoparse(str(value))
+
+
+def parse_record(raw: Dict[str, Any]) -> FactRecord:
+    """Build a fact from one input record.
+
+    ``provenance`` may be an object or a JSON string. Top-level ``source_id``, ``uri``,
+    ``hash`` and ``fetched_at`` columns (flat CSV or Parquet files) are merged into it.
+    Raises ValueError when subject, predicate or object is missing.
+    """
+    for name in ("subject", "predicate", "object"):
+        if not raw.get(name):
+            raise ValueError(f"record is missing {name!r}: {raw!r}")
+    prov = raw.get("provenance")
+    if isinstance(prov, str):
+        prov = json.loads(prov) if prov else None
+    flat = {f: raw[f] for f in SOURCE_FIELDS if raw.get(f) not in (None, "")}
+    if flat:
+        prov = {**(prov or {}), **flat}
+    belief = raw.get("belief")
+    return FactRecord(
+        subject_kind=raw.get("subject_kind") or DEFAULT_KIND,
+        subject=str(raw["subject"]),
+        predicate=str(raw["predicate"]),
+        object_kind=raw.get("object_kind") or DEFAULT_KIND,
+        object=str(raw["object"]),
+        valid_from=_timestamp(raw.get("valid_from")),
+        valid_to=_timestamp(raw.get("valid_to")),
+        observed_at=_timestamp(raw.get("observed_at")),
+        belief=None if belief in (None, "") else float(belief),
+        provenance=prov or None,
+    )
+
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    if ext in ("jsonl", "ndjson"):
+        return "jsonl"
+    if ext in FORMATS:
+        return ext
+    raise ValueError(f"cannot tell the format of {path!r}; expected one of {FORMATS}")
+
+
+def _read_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _read_csv(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, newline="", encoding="utf-8") as fh:
+        yield from csv.DictReader(fh)
+
+
+def _read_parquet(path: str) -> Iterator[Dict[str, Any]]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise RuntimeError("reading Parquet requires pyarrow (pip install cns[arrow])") from exc
+    for batch in pq.ParquetFile(path).iter_batches():
+        yield from batch.to_pylist()
+
+
+_READERS = {"jsonl": _read_jsonl, "csv": _read_csv, "parquet": _read_parquet}
+
+
+def read_records(path: str, fmt: Optional[str] = None) -> Iterator[FactRecord]:
+    """Stream the facts of one file; ``fmt`` defaults to the file extension."""
+    for raw in _READERS[fmt or detect_format(path)](path):
+        yield parse_record(raw)
+
+
+def shard_of(key: AtomKey, shards: int) -> int:
+    """Stable shard for an atom key (the same in every process and run)."""
+    return zlib.crc32(f"{key[0]}\x1f{key[1]}".encode("utf-8")) % shards
+
+
+# Worker side: one connection per process, opened by the pool initializer.
+_worker_conn: Optional[psycopg.Connection] = None
+
+
+def _init_worker() -> None:
+    global _worker_conn
+    _worker_conn = get_conn()
+
+
+def _conn() -> psycopg.Connection:
+    # Tasks also run in-process when ingesting with a single worker.
+    global _worker_conn
+    if _worker_conn is None or _worker_conn.closed:
+        _worker_conn = get_conn()
+    return _worker_conn
+
+
+def resolve_atoms(cur: Any, keys: Sequence[AtomKey]) -> Tuple[Dict[AtomKey, int], int]:
+    """Map every key to an atom id, inserting the atoms that are missing.
+
+    Returns the mapping and the number of atoms inserted. Existing duplicates of a key
+    resolve to the lowest id, as demo ingestion does. Runs in the caller's transaction
+    and assumes no other writer inserts the same keys concurrently.
+    """
+    cur.execute("CREATE TEMP TABLE ingest_keys (kind TEXT, label TEXT) ON COMMIT DROP")
+    copy_rows(cur, "ingest_keys", ("kind", "label"), keys)
+    cur.execute(
+        "SELECT a.kind, a.label, min(a.id) FROM atoms a "
+        "JOIN ingest_keys k ON k.kind = a.kind AND k.label = a.label "
+        "GROUP BY a.kind, a.label"
+    )
+    found = {(kind, label): int(i) for kind, label, i in cur.fetchall()}
+    cur.execute("DROP TABLE ingest_keys")
+    missing = [k for k in keys if k not in found]
+    ids = reserve_ids(cur, "atoms", len(missing))
+    copy_rows(
+        cur,
+        "atoms",
+        ("id", "kind", "label"),
+        ((i, kind, label) for i, (kind, label) in zip(ids, missing)),
+    )
+    found.update(zip(missing, ids))
+    return found, len(missing)
+
+
+FiberKey = Tuple[int, str, int]  # (src atom id, predicate, dst atom id)
+
+
+def resolve_fibers(cur: Any, keys: Sequence[FiberKey]) -> Tuple[Dict[FiberKey, int], int]:
+    """Map every ``(src, predicate, dst)`` key to a fiber id, inserting missing fibers.
+
+    Returns the mapping and the number of fibers inserted. Existing duplicates of a key
+    resolve to the lowest id. Runs in the caller's transaction and, like
+    ``resolve_atoms``, assumes no other writer inserts the same keys concurrently.
+    """
+    cur.execute(
+        "CREATE TEMP TABLE ingest_fibers (src BIGINT, predicate TEXT, dst BIGINT) " "ON COMMIT DROP"
+    )
+    copy_rows(cur, "ingest_fibers", ("src", "predicate", "dst"), keys)
+    cur.execute(
+        "SELECT f.src, f.predicate, f.dst, min(f.id) FROM fibers f "
+        "JOIN ingest_fibers k ON k.src = f.src AND k.predicate = f.predicate AND k.dst = f.dst "
+        "GROUP BY f.src, f.predicate, f.dst"
+    )
+    found = {(int(s), p, int(d)): int(i) for s, p, d, i in cur.fetchall()}
+    cur.execute("DROP TABLE ingest_fibers")
+    missing = [k for k in keys if k not in found]
+    ids = reserve_ids(cur, "fibers", len(missing))
+    copy_rows(
+        cur, "fibers", ("id", "src", "predicate", "dst"), ((i,) + k for i, k in zip(ids, missing))
+    )
+    found.update(zip(missing, ids))
+    return found, len(missing)
+
+
+def _resolve_atoms(keys: Sequence[AtomKey]) -> Tuple[List[Tuple[str, str, int]], int]:
+    conn = _conn()
+    with conn.transaction():
+        with conn.cursor() as cur:
+            found, created = resolve_atoms(cur, keys)
+    return [(kind, label, i) for (kind, label), i in found.items()], created
+
+
+# A fact with its atom and source ids resolved, as shipped to workers: (src, dst,
+# predicate, valid_from, valid_to, observed_at, belief, source_ref, provenance), the
+# provenance holding only per-fact keys when source_ref is set.
+FactRow = Tuple[
+    int,
+    int,
+    str,
+    Optional[datetime],
+    Optional[datetime],
+    Optional[datetime],
+    Optional[float],
+    Optional[int],
+    Optional[Dict[str, Any]],
+]
+
+
+def _load_facts(rows: Sequence[FactRow]) -> int:
+    """Load one chunk of facts, each a new aspect version of its fiber. Returns the row count.
+
+    Fibers are resolved by ``(src, predicate, dst)``, so re-ingesting a fact adds a
+    version to the existing fiber instead of a duplicate fiber. A fiber's facts become
+    versions in observed_at order (input order breaks ties), each closed by the next;
+    the first closes the stored current version, as ``storage.journal`` replay does.
+    """
+    conn = _conn()
+    # COPY does not apply column defaults to the columns it is given.
+    now = datetime.now(timezone.utc)
+    with conn.transaction():
+        with conn.cursor() as cur:
+            keys = list(dict.fromkeys((r[0], r[2], r[1]) for r in rows))
+            fiber_ids, created = resolve_fibers(cur, keys)
+            versions: Dict[int, List[FactRow]] = {}
+            for r in rows:
+                versions.setdefault(fiber_ids[(r[0], r[2], r[1])], []).append(r)
+            aspects = []
+            for fiber_id, facts in versions.items():
+                facts.sort(key=lambda r: r[5] or now)
+                for i, r in enumerate(facts):
+                    closed = (facts[i + 1][5] or now) if i + 1 < len(facts) else None
+                    prov = None if r[8] is None else Json(r[8])
+                    aspects.append(
+                        ("fiber", fiber_id, r[3], r[4], r[5] or now, closed, r[6], r[7], prov)
+                    )
+            if created < len(keys):
+                cur.execute(
+                    "CREATE TEMP TABLE ingest_close (id BIGINT, at TIMESTAMPTZ) ON COMMIT DROP"
+                )
+                copy_rows(
+                    cur,
+                    "ingest_close",
+                    ("id", "at"),
+                    ((i, facts[0][5] or now) for i, facts in versions.items()),
+                )
+                cur.execute(
+                    "UPDATE aspects a SET observed_to = c.at FROM ingest_close c "
+                    "WHERE a.subject_kind = 'fiber' AND a.subject_id = c.id "
+                    "AND a.observed_to IS NULL"
+                )
+                cur.execute("DROP TABLE ingest_close")
+            copy_rows(
+                cur,
+                "aspects",
+                (
+                    "subject_kind",
+                    "subject_id",
+                    "valid_from",
+                    "valid_to",
+                    "observed_at",
+                    "observed_to",
+                    "belief",
+                    "source_ref",
+                    "provenance",
+                ),
+                aspects,
+            )
+    return len(rows)
+
+
+def _chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    it = iter(items)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def ingest(
+    paths: Sequence[str],
+    workers: Optional[int] = None,
+    chunk_rows: int = CHUNK_ROWS,
+    fmt: Optional[str] = None,
+    progress: bool = False,
+) -> Dict[str, Any]:
+    """Load the facts of ``paths`` with ``workers`` processes; returns counts and timing.
+
+    Files are read twice: once for the atom keys and cited documents, once for the
+    facts, so memory is bounded by the number of distinct atoms and documents (their
+    resolved ids), not facts.
+    ``workers`` defaults to the CPU count; 1 runs everything in this process.
+    """
+    t0 = time.perf_counter()
+    workers = max(1, workers or os.cpu_count() or 1)
+    stats: Dict[str, Any] = {
+        "atoms": 0,
+        "atoms_created": 0,
+        "sources": 0,
+        "facts": 0,
+        "workers": workers,
+    }
+
+    def report(what: str) -> None:
+        if progress:
+            print(f"[ingest] {what}: {stats}", file=sys.stderr)
+
+    def records() -> Iterator[FactRecord]:
+        for path in paths:
+            yield from read_records(path, fmt)
+
+    keys: Dict[AtomKey, None] = {}
+    docs: Dict[SourceKey, None] = {}
+    for rec in records():
+        keys[rec.subject_key] = None
+        keys[rec.object_key] = None
+        doc, _rest = split_citation(rec.provenance)
+        if doc is not None:
+            docs[doc] = None
+    shards: List[List[AtomKey]] = [[] for _ in range(workers)]
+    for key in keys:
+        shards[shard_of(key, workers)].append(key)
+
+    pool: Optional[ProcessPoolExecutor] = None
+    if workers > 1:
+        # Spawned, not forked: workers must not inherit the parent's connections.
+        pool = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker
+        )
+    try:
+        atom_ids: Dict[AtomKey, int] = {}
+        tasks = [chunk for shard in shards for chunk in _chunks(shard, chunk_rows)]
+        resolved = pool.map(_resolve_atoms, tasks) if pool else map(_resolve_atoms, tasks)
+        for rows, created in resolved:
+            atom_ids.update(((kind, label), i) for kind, label, i in rows)
+            stats["atoms_created"] += created
+        stats["atoms"] = len(atom_ids)
+        report("atoms")
+
+        source_ids: Dict[SourceKey, int] = {}
+        with get_conn() as conn:
+            for chunk in _chunks(docs, chunk_rows):
+                with conn.transaction():
+                    with conn.cursor() as cur:
+                        source_ids.update(resolve_sources(cur, chunk))
+        stats["sources"] = len(source_ids)
+        report("sources")
+
+        # Facts: one buffer per shard, flushed to the pool as chunks fill. A shard has
+        # one chunk in flight at a time, so its chunks resolve fibers and add versions in
+        # input order, and reading never runs far ahead of loading.
+        buffers: List[List[FactRow]] = [[] for _ in range(workers)]
+        pending: Dict[int, Future[int]] = {}
+
+        def flush(shard: int) -> None:
+            rows, buffers[shard] = buffers[shard], []
+            if not rows:
+                return
+            if pool is None:
+                stats["facts"] += _load_facts(rows)
+                return
+            if shard in pending:
+                stats["facts"] += pending.pop(shard).result()
+            pending[shard] = pool.submit(_load_facts, rows)
+
+        for rec in records():
+            shard = shard_of(rec.subject_key, workers)
+            doc, provenance = split_citation(rec.provenance)
+            buffers[shard].append(
+                (
+                    atom_ids[rec.subject_key],
+                    atom_ids[rec.object_key],
+                    rec.predicate,
+                    rec.valid_from,
+                    rec.valid_to,
+                    rec.observed_at,
+                    rec.belief,
+                    None if doc is None else source_ids[doc],
+                    provenance,
+                )
+            )
+            if len(buffers[shard]) >= chunk_rows:
+                flush(shard)
+        for shard in range(workers):
+            flush(shard)
+        for fut in pending.values():
+            stats["facts"] += fut.result()
+        report("facts")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("ANALYZE atoms")
+            cur.execute("ANALYZE fibers")
+            cur.execute("ANALYZE aspects")
+    invalidate_stats()
+    return {**stats, "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(description="Bulk-load facts from JSONL, CSV or Parquet")
+    ap.add_argument("paths", nargs="+", help="input files")
+    ap.add_argument("--format", choices=FORMATS, help="override the file extension")
+    ap.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    ap.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = ap.parse_args(argv)
+    stats = ingest(
+        args.paths,
+        workers=args.workers,
+        chunk_rows=args.chunk_rows,
+        fmt=args.format,
+        progress=True,
+    )
+    print(f"Ingested: {stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
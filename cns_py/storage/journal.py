@@ -0,0 +1,600 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from dateutil.parser import isoparse
+from psycopg.types.json import Json
+
+from cns_py.cql.planner import invalidate_stats
+from cns_py.storage.bulk import copy_rows
+from cns_py.storage.db import get_conn
+from cns_py.storage.ingest import AtomKey, resolve_atoms, resolve_fibers
+
+# Append-only write journal for atoms, fibers and aspects.
+#
+# Writers append upserts to a ``Journal`` and return without touching Postgres;
+# ``replay`` applies sealed segments to a database later, in bulk. Everything is keyed
+# naturally, so replay is deterministic and a segment applies the same way to any
+# database: atoms by (kind, label), fibers by (src atom, predicate, dst atom), aspects
+# by their subject. An aspect op is a new version of the subject's aspect, as with
+# ``storage.aspects.record_aspect``; its observed_at is fixed when it is appended, so a
+# rebuild reproduces the transaction-time history exactly.
+#
+# A directory holds numbered segments: ``<n>.open`` while being written, renamed to
+# ``<n>.seg`` once sealed. A segment is
+#
+#   MAGIC
+#   block*   b"B" | u32 header length | u32 body length | header JSON | body
+#   footer   b"F" | u32 length | footer JSON
+#
+# Each block holds rows of one op kind, stored by column: the body is the zlib-compressed
+# JSON object {column: [values...]}. Block headers carry the row count, a CRC32 of the
+# body and the block's bitemporal bounds (observed_at range, and for aspects the valid
+# time range), which replay uses to skip blocks outside ``known``. The footer carries
+# the same bounds for the whole segment and a SHA-256 of every byte before it.
+#
+# Appends are buffered and written as blocks by ``flush``, with one fsync per flush:
+# an append is durable once the flush that follows it returns. Flushes happen every
+# ``flush_rows`` appends, on ``flush``/``close``, and from a background thread once the
+# oldest buffered append is ``flush_interval`` old, so an append is durable within about
+# ``flush_interval`` even if no other append follows it. A segment is sealed by the first
+# flush that brings it to ``segment_rows`` rows. A crash leaves an ``.open`` segment; the
+# next ``Journal`` on the directory drops its torn tail and seals it.
+
+MAGIC = b"CNSJ\x01"
+SEGMENT_ROWS = 100_000
+FLUSH_ROWS = 1_000
+FLUSH_INTERVAL = 0.05  # seconds
+
+FiberKey = Tuple[AtomKey, str, AtomKey]  # (src, predicate, dst)
+
+COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "atom": ("kind", "label", "text", "observed_at"),
+    "fiber": ("src_kind", "src", "predicate", "dst_kind", "dst", "observed_at"),
+    # Atom subjects use kind/label only; fiber subjects name both endpoints.
+    "aspect": (
+        "subject_kind",
+        "kind",
+        "label",
+        "predicate",
+        "dst_kind",
+        "dst",
+        "valid_from",
+        "valid_to",
+        "observed_at",
+        "belief",
+        "provenance",
+        "embedding",
+    ),
+}
+_TIME_COLUMNS = frozenset(("valid_from", "valid_to", "observed_at"))
+_SEGMENT_RE = re.compile(r"^(\d{12})\.(open|seg)$")
+
+Row = Tuple[Any, ...]
+
+
+class JournalError(Exception):
+    """A segment failed verification (bad magic, checksum or framing)."""
+
+
+def _iso(ts: Optional[datetime]) -> Optional[str]:
+    return None if ts is None else ts.isoformat()
+
+
+def _parse_ts(value: Optional[str]) -> Optional[datetime]:
+    return None if value is None else isoparse(value)
+
+
+def _encode_block(kind: str, rows: Sequence[Row]) -> Tuple[Dict[str, Any], bytes]:
+    columns = COLUMNS[kind]
+    data = {
+        col: [_iso(r[i]) if col in _TIME_COLUMNS else r[i] for r in rows]
+        for i, col in enumerate(columns)
+    }
+    body = zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+    observed = [r[columns.index("observed_at")] for r in rows]
+    header: Dict[str, Any] = {
+        "kind": kind,
+        "rows": len(rows),
+        "crc32": zlib.crc32(body),
+        "observed_from": _iso(min(observed)),
+        "observed_to": _iso(max(observed)),
+    }
+    if kind == "aspect":
+        # NULL bounds are open-ended, so one open row makes the block's bound open.
+        starts = [r[columns.index("valid_from")] for r in rows]
+        ends = [r[columns.index("valid_to")] for r in rows]
+        header["valid_from"] = None if None in starts else _iso(min(starts))
+        header["valid_to"] = None if None in ends else _iso(max(ends))
+    head = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return header, b"B" + struct.pack(">II", len(head), len(body)) + head + body
+
+
+def _decode_rows(kind: str, body: bytes) -> List[Row]:
+    data = json.loads(zlib.decompress(body))
+    columns = [
+        [_parse_ts(v) for v in data[col]] if col in _TIME_COLUMNS else data[col]
+        for col in COLUMNS[kind]
+    ]
+    return list(zip(*columns))
+
+
+def _scan_blocks(data: bytes) -> Iterator[Tuple[int, Dict[str, Any], bytes]]:
+    """Yield ``(end offset, header, body)`` for each intact block after the magic.
+
+    Stops at the footer, at the end of the data or at the first torn or corrupt block.
+    """
+    pos = len(MAGIC)
+    while pos + 9 <= len(data) and data[pos : pos + 1] == b"B":
+        head_len, body_len = struct.unpack(">II", data[pos + 1 : pos + 9])
+        end = pos + 9 + head_len + body_len
+        if end > len(data):
+            return
+        try:
+            header = json.loads(data[pos + 9 : pos + 9 + head_len])
+        except ValueError:
+            return
+        body = data[pos + 9 + head_len : end]
+        if zlib.crc32(body) != header.get("crc32"):
+            return
+        yield end, header, body
+        pos = end
+
+
+def _footer(number: int, blocks: List[Dict[str, Any]], sha256: str) -> bytes:
+    starts = [b["observed_from"] for b in blocks]
+    ends = [b["observed_to"] for b in blocks]
+    footer = {
+        "segment": number,
+        "blocks": len(blocks),
+        "rows": sum(b["rows"] for b in blocks),
+        "observed_from": min(starts, key=isoparse) if starts else None,
+        "observed_to": max(ends, key=isoparse) if ends else None,
+        "sha256": sha256,
+    }
+    body = json.dumps(footer, separators=(",", ":")).encode("utf-8")
+    return b"F" + struct.pack(">I", len(body)) + body
+
+
+def read_segment(path: str) -> Tuple[Dict[str, Any], List[Tuple[str, Dict[str, Any], List[Row]]]]:
+    """Verify a sealed segment and return its footer and ``(kind, header, rows)`` blocks.
+
+    Raises JournalError when the magic, a block CRC, the framing or the SHA-256 does
+    not match.
+    """
+    with open(path, "rb") as fh:
+        data = fh.read()
+    if not data.startswith(MAGIC):
+        raise JournalError(f"{path}: not a journal segment")
+    blocks = []
+    pos = len(MAGIC)
+    for end, header, body in _scan_blocks(data):
+        blocks.append((header["kind"], header, _decode_rows(header["kind"], body)))
+        pos = end
+    if data[pos : pos + 1] != b"F" or pos + 5 > len(data):
+        raise JournalError(f"{path}: corrupt block at offset {pos}")
+    (length,) = struct.unpack(">I", data[pos + 1 : pos + 5])
+    if pos + 5 + length != len(data):
+        raise JournalError(f"{path}: bad footer length")
+    footer = json.loads(data[pos + 5 :])
+    if hashlib.sha256(data[:pos]).hexdigest() != footer["sha256"]:
+        raise JournalError(f"{path}: checksum mismatch")
+    return footer, blocks
+
+
+def _segment_files(directory: str, state: str) -> List[Tuple[int, str]]:
+    found = []
+    for name in os.listdir(directory):
+        m = _SEGMENT_RE.match(name)
+        if m and m.group(2) == state:
+            found.append((int(m.group(1)), os.path.join(directory, name)))
+    return sorted(found)
+
+
+def segments(directory: str) -> List[str]:
+    """Paths of the sealed segments in ``directory``, oldest first."""
+    return [path for _, path in _segment_files(directory, "seg")]
+
+
+def _fsync_dir(directory: str) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _seal(path: str, number: int) -> str:
+    """Drop the torn tail of an open segment, append its footer and rename it."""
+    with open(path, "r+b") as fh:
+        data = fh.read()
+        if not data.startswith(MAGIC):
+            data = MAGIC  # crashed before the magic was written
+        end = len(MAGIC)
+        headers = []
+        for end, header, _body in _scan_blocks(data):
+            headers.append(header)
+        fh.seek(0)
+        fh.truncate()
+        fh.write(data[:end])
+        fh.write(_footer(number, headers, hashlib.sha256(data[:end]).hexdigest()))
+        fh.flush()
+        os.fsync(fh.fileno())
+    sealed = path[: -len(".open")] + ".seg"
+    os.rename(path, sealed)
+    _fsync_dir(os.path.dirname(path) or ".")
+    return sealed
+
+
+class Journal:
+    """Appends atom, fiber and aspect upserts to segment files in ``directory``.
+
+    Thread-safe. Use as a context manager, or call ``close`` to flush and seal and to stop
+    the background flusher. A failed background flush is raised by the next call.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_rows: int = SEGMENT_ROWS,
+        flush_rows: int = FLUSH_ROWS,
+        flush_interval: float = FLUSH_INTERVAL,
+    ) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_rows = segment_rows
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._pending: Dict[str, List[Row]] = {kind: [] for kind in COLUMNS}
+        self._pending_rows = 0
+        self._pending_since = 0.0
+        self._file: Optional[BinaryIO] = None
+        self._hash = hashlib.sha256()
+        self._blocks: List[Dict[str, Any]] = []
+        self._segment_rows = 0
+        for number, path in _segment_files(directory, "open"):
+            _seal(path, number)
+        numbers = [n for n, _ in _segment_files(directory, "seg")]
+        self._number = max(numbers, default=0)
+        self._flusher = threading.Thread(target=self._flush_loop, name="journal-flush", daemon=True)
+        self._flusher.start()
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def atom(
+        self,
+        kind: str,
+        label: str,
+        text: Optional[str] = None,
+        observed_at: Optional[datetime] = None,
+    ) -> None:
+        """Upsert an atom; a non-NULL ``text`` replaces the stored one."""
+        self._append("atom", (kind, label, text, observed_at))
+
+    def fiber(
+        self, src: AtomKey, predicate: str, dst: AtomKey, observed_at: Optional[datetime] = None
+    ) -> None:
+        """Upsert a fiber between two atoms (created if missing)."""
+        self._append("fiber", (src[0], src[1], predicate, dst[0], dst[1], observed_at))
+
+    def aspect(
+        self,
+        subject: Union[AtomKey, FiberKey],
+        *,
+        valid_from: Optional[datetime] = None,
+        valid_to: Optional[datetime] = None,
+        belief: Optional[float] = None,
+        provenance: Optional[Dict[str, Any]] = None,
+        embedding: Optional[Sequence[float]] = None,
+        observed_at: Optional[datetime] = None,
+    ) -> None:
+        """Record a new aspect version of an atom ``(kind, label)`` or a fiber
+        ``((kind, label), predicate, (kind, label))``; the subject is created if missing."""
+        if len(subject) == 3:
+            (kind, label), predicate, (dst_kind, dst) = subject
+            head: Row = ("fiber", kind, label, predicate, dst_kind, dst)
+        else:
+            head = ("atom", subject[0], subject[1], None, None, None)
+        vector = None if embedding is None else [float(x) for x in embedding]
+        self._append(
+            "aspect", head + (valid_from, valid_to, observed_at, belief, provenance, vector)
+        )
+
+    def _append(self, kind: str, row: Row) -> None:
+        at = COLUMNS[kind].index("observed_at")
+        if row[at] is None:
+            row = row[:at] + (datetime.now(timezone.utc),) + row[at + 1 :]
+        with self._lock:
+            if self._closed:
+                raise JournalError("journal is closed")
+            self._raise_locked()
+            if not self._pending_rows:
+                self._pending_since = time.monotonic()
+                self._wake.notify()
+            self._pending[kind].append(row)
+            self._pending_rows += 1
+            if self._pending_rows >= self.flush_rows:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        """Write buffered appends and fsync; they are durable when this returns."""
+        with self._lock:
+            self._raise_locked()
+            self._flush_locked()
+
+    def close(self) -> None:
+        """Flush and seal the current segment; later appends raise ``JournalError``."""
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        self._flusher.join()
+        with self._lock:
+            self._raise_locked()
+            self._flush_locked()
+            self._seal_locked()
+
+    def _flush_loop(self) -> None:
+        # Flush the buffer once its oldest append is flush_interval old.
+        with self._lock:
+            while not self._closed:
+                if not self._pending_rows or self._error is not None:
+                    self._wake.wait()
+                    continue
+                due = self._pending_since + self.flush_interval - time.monotonic()
+                if due > 0:
+                    self._wake.wait(due)
+                    continue
+                try:
+                    self._flush_locked()
+                except BaseException as exc:  # surfaced by the next append/flush/close
+                    self._error = exc
+
+    def _raise_locked(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            self._wake.notify()
+            raise error
+
+    def _flush_locked(self) -> None:
+        if not self._pending_rows:
+            return
+        if self._file is None:
+            self._number += 1
+            path = os.path.join(self.directory, f"{self._number:012d}.open")
+            self._file = open(path, "wb")
+            self._write(MAGIC)
+        for kind, rows in self._pending.items():
+            if rows:
+                header, block = _encode_block(kind, rows)
+                self._write(block)
+                self._blocks.append(header)
+                self._segment_rows += len(rows)
+                self._pending[kind] = []
+        self._pending_rows = 0
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        if self._segment_rows >= self.segment_rows:
+            self._seal_locked()
+
+    def _write(self, data: bytes) -> None:
+        assert self._file is not None
+        self._file.write(data)
+        self._hash.update(data)
+
+    def _seal_locked(self) -> None:
+        if self._file is None:
+            return
+        self._file.write(_footer(self._number, self._blocks, self._hash.hexdigest()))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        path = self._file.name
+        self._file.close()
+        os.rename(path, path[: -len(".open")] + ".seg")
+        _fsync_dir(self.directory)
+        self._file = None
+        self._hash = hashlib.sha256()
+        self._blocks = []
+        self._segment_rows = 0
+
+
+def _apply(
+    cur: Any,
+    blocks: List[Tuple[str, Dict[str, Any], List[Row]]],
+    after: Optional[datetime],
+    known: Optional[datetime],
+) -> Dict[str, int]:
+    """Apply the ops of one segment observed in ``(after, known]`` in a few statements."""
+
+    def wanted(ts: datetime) -> bool:
+        return (after is None or ts > after) and (known is None or ts <= known)
+
+    ops: Dict[str, List[Row]] = {kind: [] for kind in COLUMNS}
+    for kind, header, rows in blocks:
+        lo, hi = _parse_ts(header["observed_from"]), _parse_ts(header["observed_to"])
+        if (known is not None and lo is not None and lo > known) or (
+            after is not None and hi is not None and hi <= after
+        ):
+            continue
+        at = COLUMNS[kind].index("observed_at")
+        ops[kind].extend(r for r in rows if wanted(r[at]))
+
+    # Atoms: named by atom ops, fiber endpoints and aspect subjects.
+    keys: Dict[AtomKey, None] = {}
+    for kind, label, _text, _at in ops["atom"]:
+        keys[(kind, label)] = None
+    for src_kind, src, _pred, dst_kind, dst, _at in ops["fiber"]:
+        keys[(src_kind, src)] = keys[(dst_kind, dst)] = None
+    for row in ops["aspect"]:
+        keys[(row[1], row[2])] = None
+        if row[0] == "fiber":
+            keys[(row[4], row[5])] = None
+    atom_ids, atoms_created = resolve_atoms(cur, list(keys))
+
+    texts = {(r[0], r[1]): r[2] for r in ops["atom"] if r[2] is not None}
+    if texts:
+        cur.execute("CREATE TEMP TABLE journal_texts (id BIGINT, text TEXT) ON COMMIT DROP")
+        copy_rows(
+            cur, "journal_texts", ("id", "text"), ((atom_ids[k], t) for k, t in texts.items())
+        )
+        cur.execute(
+            "UPDATE atoms a SET text = t.text FROM journal_texts t "
+            "WHERE a.id = t.id AND a.text IS DISTINCT FROM t.text"
+        )
+        cur.execute("DROP TABLE journal_texts")
+
+    def fiber_key(src: AtomKey, predicate: str, dst: AtomKey) -> Tuple[int, str, int]:
+        return (atom_ids[src], predicate, atom_ids[dst])
+
+    fiber_keys: Dict[Tuple[int, str, int], None] = {}
+    for src_kind, src, pred, dst_kind, dst, _at in ops["fiber"]:
+        fiber_keys[fiber_key((src_kind, src), pred, (dst_kind, dst))] = None
+    for row in ops["aspect"]:
+        if row[0] == "fiber":
+            fiber_keys[fiber_key((row[1], row[2]), row[3], (row[4], row[5]))] = None
+    fiber_ids, _created = resolve_fibers(cur, list(fiber_keys))
+
+    # Aspects: versions of one subject in transaction-time order (journal order breaks
+    # ties); each is closed by the next, and the first closes the stored current one.
+    versions: Dict[Tuple[str, int], List[Row]] = {}
+    for row in ops["aspect"]:
+        if row[0] == "fiber":
+            subject = fiber_ids[fiber_key((row[1], row[2]), row[3], (row[4], row[5]))]
+        else:
+            subject = atom_ids[(row[1], row[2])]
+        versions.setdefault((row[0], subject), []).append(row)
+    aspects: List[Row] = []
+    for (subject_kind, subject), rows in versions.items():
+        rows.sort(key=lambda r: r[8])
+        for i, r in enumerate(rows):
+            closed = rows[i + 1][8] if i + 1 < len(rows) else None
+            vector = None if r[11] is None else "[" + ",".join(map(str, r[11])) + "]"
+            prov = None if r[10] is None else Json(r[10])
+            aspects.append((subject_kind, subject, r[6], r[7], r[8], closed, r[9], prov, vector))
+    if versions:
+        cur.execute(
+            "CREATE TEMP TABLE journal_close (kind TEXT, id BIGINT, at TIMESTAMPTZ) ON COMMIT DROP"
+        )
+        copy_rows(
+            cur,
+            "journal_close",
+            ("kind", "id", "at"),
+            ((k, i, rows[0][8]) for (k, i), rows in versions.items()),
+        )
+        cur.execute(
+            "UPDATE aspects a SET observed_to = c.at FROM journal_close c "
+            "WHERE a.subject_kind = c.kind AND a.subject_id = c.id AND a.observed_to IS NULL"
+        )
+        cur.execute("DROP TABLE journal_close")
+        copy_rows(
+            cur,
+            "aspects",
+            (
+                "subject_kind",
+                "subject_id",
+                "valid_from",
+                "valid_to",
+                "observed_at",
+                "observed_to",
+                "belief",
+                "provenance",
+                "embedding",
+            ),
+            aspects,
+        )
+    return {
+        "ops": sum(len(rows) for rows in ops.values()),
+        "atoms_created": atoms_created,
+        "aspects": len(aspects),
+    }
+
+
+def replay(directory: str, known: Optional[datetime] = None) -> Dict[str, Any]:
+    """Apply the sealed segments of ``directory`` that this database has not seen yet.
+
+    Each segment applies in one transaction and is recorded in ``journal_segments``,
+    so replay is idempotent and picks up where it left off. With ``known`` only ops
+    observed up to that transaction time are applied; a later replay applies the rest.
+    Raises JournalError when a segment fails verification or differs from the one
+    replayed under the same number.
+    """
+    t0 = time.perf_counter()
+    stats: Dict[str, Any] = {"segments": 0, "skipped": 0, "ops": 0, "atoms_created": 0}
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT segment, checksum, known FROM journal_segments")
+            applied = {int(n): (checksum, upto) for n, checksum, upto in cur.fetchall()}
+            for path in segments(directory):
+                footer, blocks = read_segment(path)
+                number = int(footer["segment"])
+                after: Optional[datetime] = None
+                if number in applied:
+                    checksum, after = applied[number]
+                    if checksum != footer["sha256"]:
+                        raise JournalError(f"{path}: differs from the segment replayed earlier")
+                    if after is None or (known is not None and known <= after):
+                        stats["skipped"] += 1
+                        continue
+                last = _parse_ts(footer["observed_to"])
+                complete = known is None or last is None or last <= known
+                with conn.transaction():
+                    done = _apply(cur, blocks, after, known)
+                    cur.execute(
+                        "INSERT INTO journal_segments(segment, checksum, rows, known) "
+                        "VALUES (%s, %s, %s, %s) ON CONFLICT (segment) DO UPDATE "
+                        "SET rows = journal_segments.rows + EXCLUDED.rows, "
+                        "known = EXCLUDED.known, applied_at = now()",
+                        (number, footer["sha256"], done["ops"], None if complete else known),
+                    )
+                stats["segments"] += 1
+                stats["ops"] += done["ops"]
+                stats["atoms_created"] += done["atoms_created"]
+            if stats["segments"]:
+                cur.execute("ANALYZE atoms")
+                cur.execute("ANALYZE fibers")
+                cur.execute("ANALYZE aspects")
+    if stats["segments"]:
+        invalidate_stats()
+    return {**stats, "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(description="Verify or replay a CNS write journal")
+    ap.add_argument("command", choices=("verify", "replay"))
+    ap.add_argument("directory")
+    ap.add_argument("--known", help="replay only ops observed up to this ISO timestamp")
+    args = ap.parse_args(argv)
+
+    if args.command == "verify":
+        for path in segments(args.directory):
+            footer, _blocks = read_segment(path)
+            print(
+                f"{os.path.basename(path)}\t{footer['rows']} rows\t{footer['blocks']} blocks\t"
+                f"{footer['observed_from']} .. {footer['observed_to']}"
+            )
+        return 0
+    stats = replay(args.directory, isoparse(args.known) if args.known else None)
+    print(f"Replayed: {stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from cns_py.storage.db import SCHEMA_SQL, get_conn
+
+# Declarative partitioning of ``aspects`` (opt-in; see ``migrate``).
+#
+#   aspects                 LIST (subject_kind)
+#     aspects_atom            'atom'
+#     aspects_fiber           'fiber', RANGE (observed_to)
+#       aspects_fiber_current   DEFAULT, CHECK (observed_to IS NULL): current versions
+#       aspects_fiber_hist      MINVALUE .. first month: history from before partitioning
+#       aspects_fiber_hYYYYMM   one month of superseded versions each
+#
+# Fiber versions are sub-partitioned by the end of their transaction time rather than
+# by valid_from or observed_at. The executor reads current versions unless a query
+# says ASOF KNOWN, and its ``observed_to IS NULL`` filter prunes every history
+# partition, so the hot set is one small partition. ASOF KNOWN skips months closed
+# before its timestamp. A revision moves the old row into the month it was superseded
+# in, which must exist: run ``ensure_partitions`` (``python -m
+# cns_py.storage.partitions ensure``) at least monthly.
+#
+# Postgres cannot enforce uniqueness across partitions, so the table has no primary
+# key. One current version per subject is enforced per partition instead.
+
+# Months of history partitions kept ready beyond the current one.
+PARTITION_AHEAD_MONTHS = 3
+
+_MONTH_RE = re.compile(r"^aspects_fiber_h(\d{4})(\d{2})$")
+
+# Run after the swap, once SCHEMA_SQL has recreated the partitioned indexes.
+_PARTITION_INDEXES_SQL = """
+CREATE INDEX IF NOT EXISTS idx_aspects_id ON aspects(id);
+CREATE UNIQUE INDEX IF NOT EXISTS uniq_aspects_fiber_current
+  ON aspects_fiber_current(subject_id);
+CREATE UNIQUE INDEX IF NOT EXISTS uniq_aspects_atom_current
+  ON aspects_atom(subject_id) WHERE observed_to IS NULL;
+"""
+
+
+def _month_start(ts: datetime) -> datetime:
+    return datetime(ts.year, ts.month, 1, tzinfo=timezone.utc)
+
+
+def _add_months(month: datetime, n: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + n
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def _month_name(month: datetime) -> str:
+    return f"aspects_fiber_h{month.year:04d}{month.month:02d}"
+
+
+def is_partitioned(cur: Any) -> bool:
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('aspects')")
+    row = cur.fetchone()
+    return bool(row) and row[0] == "p"
+
+
+def _history_months(cur: Any) -> List[datetime]:
+    cur.execute(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass('aspects_fiber')"
+    )
+    months = []
+    for (name,) in cur.fetchall():
+        m = _MONTH_RE.match(name)
+        if m:
+            months.append(datetime(int(m.group(1)), int(m.group(2)), 1, tzinfo=timezone.utc))
+    return sorted(months)
+
+
+def ensure_partitions(
+    cur: Any, ahead_months: int = PARTITION_AHEAD_MONTHS, now: Optional[datetime] = None
+) -> List[str]:
+    """Create the monthly history partitions up to ``ahead_months`` past ``now``.
+
+    Starts after the newest existing month, so a missed run leaves no gap. Returns the
+    names of the partitions created. Cheap when nothing is missing: the default
+    partition's CHECK constraint spares Postgres from scanning it on attach.
+    """
+    if not is_partitioned(cur):
+        raise RuntimeError("aspects is not partitioned; run migrate first")
+    current = _month_start(now or datetime.now(timezone.utc))
+    existing = _history_months(cur)
+    month = _add_months(existing[-1], 1) if existing else current
+    created: List[str] = []
+    while month <= _add_months(current, ahead_months):
+        name = _month_name(month)
+        # DDL takes no bind parameters; the bounds are formatted from datetimes.
+        cur.execute(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF aspects_fiber "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        created.append(name)
+        month = _add_months(month, 1)
+    return created
+
+
+def migrate(
+    conn: Any, ahead_months: int = PARTITION_AHEAD_MONTHS, now: Optional[datetime] = None
+) -> bool:
+    """Convert a plain ``aspects`` table into the partitioned layout, in one transaction.
+
+    Rows are copied, so this takes an exclusive lock for as long as the copy runs.
+    Returns False when ``aspects`` is already partitioned.
+    """
+    current = _month_start(now or datetime.now(timezone.utc))
+    with conn.transaction():
+        with conn.cursor() as cur:
+            if is_partitioned(cur):
+                return False
+            cur.execute("LOCK TABLE aspects IN ACCESS EXCLUSIVE MODE")
+            cur.execute("SELECT pg_get_serial_sequence('aspects', 'id')")
+            seq = cur.fetchone()[0]
+            cur.execute("ALTER TABLE aspects RENAME TO aspects_unpartitioned")
+            # Keep the id sequence alive when the old table is dropped.
+            cur.execute(f"ALTER SEQUENCE {seq} OWNED BY NONE")
+            cur.execute(
+                "CREATE TABLE aspects (LIKE aspects_unpartitioned "
+                "INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY LIST (subject_kind)"
+            )
+            cur.execute("CREATE TABLE aspects_atom PARTITION OF aspects FOR VALUES IN ('atom')")
+            cur.execute(
+                "CREATE TABLE aspects_fiber PARTITION OF aspects FOR VALUES IN ('fiber') "
+                "PARTITION BY RANGE (observed_to)"
+            )
+            cur.execute(
+                "CREATE TABLE aspects_fiber_current PARTITION OF aspects_fiber "
+                "(CONSTRAINT aspects_fiber_current_open CHECK (observed_to IS NULL)) DEFAULT"
+            )
+            cur.execute(
+                "CREATE TABLE aspects_fiber_hist PARTITION OF aspects_fiber "
+                f"FOR VALUES FROM (MINVALUE) TO ('{current.isoformat()}')"
+            )
+            ensure_partitions(cur, ahead_months, now=current)
+            # Superseded versions newer than the prepared months would have nowhere to go.
+            cur.execute(
+                "SELECT max(observed_to) FROM aspects_unpartitioned WHERE subject_kind = 'fiber'"
+            )
+            newest = cur.fetchone()[0]
+            if newest is not None and newest >= _add_months(current, ahead_months + 1):
+                ensure_partitions(cur, 0, now=newest)
+            cur.execute("INSERT INTO aspects SELECT * FROM aspects_unpartitioned")
+            cur.execute("DROP TABLE aspects_unpartitioned")
+            cur.execute(f"ALTER SEQUENCE {seq} OWNED BY aspects.id")
+            cur.execute(SCHEMA_SQL)
+            cur.execute(_PARTITION_INDEXES_SQL)
+            analyze(cur)
+    return True
+
+
+def analyze(cur: Any) -> None:
+    """ANALYZE the tables the CQL planner takes statistics from.
+
+    Autovacuum never analyzes a partitioned parent, so the planner's column statistics
+    for aspects come from here. atoms and fibers are included because the planner
+    falls back to default statistics while any of the three is unanalyzed.
+    """
+    for table in ("atoms", "fibers", "aspects"):
+        cur.execute(f"ANALYZE {table}")
+
+
+def partition_sizes(cur: Any) -> Dict[str, int]:
+    """Live row estimate per leaf partition of ``aspects``."""
+    cur.execute(
+        "SELECT c.relname, GREATEST(c.reltuples, 0)::bigint "
+        "FROM pg_partition_tree('aspects') t JOIN pg_class c ON c.oid = t.relid "
+        "WHERE t.isleaf ORDER BY c.relname"
+    )
+    return {str(name): int(n) for name, n in cur.fetchall()}
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Partition maintenance for aspects")
+    parser.add_argument("command", choices=("migrate", "ensure", "status"))
+    parser.add_argument(
+        "--ahead",
+        type=int,
+        default=PARTITION_AHEAD_MONTHS,
+        help="months of history partitions to keep ready",
+    )
+    args = parser.parse_args(argv)
+
+    with get_conn() as conn:
+        if args.command == "migrate":
+            done = migrate(conn, args.ahead)
+            print("Partitioned aspects." if done else "aspects is already partitioned.")
+            return 0
+        with conn.cursor() as cur:
+            if args.command == "ensure":
+                created = ensure_partitions(cur, args.ahead)
+                analyze(cur)
+                print(f"Created {len(created)} partitions: {', '.join(created) or '-'}")
+            else:
+                if not is_partitioned(cur):
+                    print("aspects is not partitioned.")
+                    return 0
+                for name, rows in partition_sizes(cur).items():
+                    print(f"{name}\t{rows}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
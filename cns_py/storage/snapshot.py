@@ -0,0 +1,540 @@
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import psycopg
+from dateutil.parser import isoparse
+from psycopg import IsolationLevel, sql
+
+from cns_py.config import asof_end_inclusive
+from cns_py.cql.planner import invalidate_stats
+from cns_py.storage.bulk import copy_rows
+from cns_py.storage.db import get_conn
+from cns_py.storage.partitions import ensure_partitions, is_partitioned
+
+# Columnar snapshots of a CNS store, for standing up replicas and test databases
+# without re-running ingestion.
+#
+# A snapshot is a directory with one or more Parquet (or Arrow IPC) files per table and
+# a ``manifest.json`` naming them, written last. Rows keep their ids, so references
+# between tables (fibers -> atoms, aspects -> sources) load unchanged; JSONB columns are
+# stored as JSON text and embeddings as lists of float32.
+#
+# Export splits each table into id ranges, one file per range, written by a pool of
+# worker processes. The workers share the coordinator's transaction snapshot
+# (``pg_export_snapshot``), so the files are consistent with one another even though
+# each worker reads on its own connection.
+#
+# Import loads each Parquet row group (Arrow record batch) as one COPY on a worker,
+# committed on its own. Tables load in stages so that foreign keys always find their
+# target. Like ``pg_restore --disable-triggers``, user triggers are off during the
+# load: rows arrive with ``source_ref`` already set, and ``current_fibers`` is rebuilt
+# once at the end instead of per COPY. Import therefore expects an empty, idle
+# database (``replace`` truncates it first).
+#
+# Both directions can filter aspect versions, as CQL does: ``asof`` keeps the versions
+# valid at a time, ``known`` keeps the history recorded up to a time, reopening the
+# versions that were still current then. Atoms and fibers are kept whole.
+
+FORMATS = ("parquet", "arrow")
+BATCH_ROWS = 100_000
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Columns per table and their types. The first column is the key used to split exports.
+TABLES: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "sources": (
+        ("id", "int"),
+        ("source_id", "text"),
+        ("uri", "text"),
+        ("hash", "text"),
+        ("fetched_at", "text"),
+        ("digest", "text"),
+    ),
+    "atoms": (
+        ("id", "int"),
+        ("kind", "text"),
+        ("label", "text"),
+        ("text", "text"),
+        ("symbol", "json"),
+        ("created_at", "ts"),
+    ),
+    "fibers": (
+        ("id", "int"),
+        ("src", "int"),
+        ("dst", "int"),
+        ("predicate", "text"),
+        ("created_at", "ts"),
+    ),
+    "aspects": (
+        ("id", "int"),
+        ("subject_kind", "text"),
+        ("subject_id", "int"),
+        ("valid_from", "ts"),
+        ("valid_to", "ts"),
+        ("observed_at", "ts"),
+        ("observed_to", "ts"),
+        ("belief", "real"),
+        ("source_ref", "int"),
+        ("provenance", "json"),
+        ("embedding", "vector"),
+    ),
+    # Which journal segments the data already contains, so replay can continue on a
+    # replica (see cns_py.storage.journal).
+    "journal_segments": (
+        ("segment", "int"),
+        ("checksum", "text"),
+        ("rows", "int"),
+        ("known", "ts"),
+        ("applied_at", "ts"),
+    ),
+}
+
+# Import order: tables only reference tables of earlier stages.
+STAGES = (("sources", "atoms", "journal_segments"), ("fibers", "aspects"))
+# Tables whose user triggers are disabled while importing.
+_TRIGGER_TABLES = ("atoms", "fibers", "aspects")
+# Tables with an id sequence to move past the imported ids.
+_SEQUENCE_TABLES = ("sources", "atoms", "fibers", "aspects")
+
+
+class SnapshotError(Exception):
+    """A snapshot that cannot be read, or a database it cannot be imported into."""
+
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow
+        import pyarrow.compute  # noqa: F401
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise RuntimeError("snapshots require pyarrow (pip install cns[arrow])") from exc
+    return pyarrow
+
+
+def arrow_schema(table: str) -> Any:
+    """The Arrow schema of ``table``'s snapshot files."""
+    pa = _pyarrow()
+    types = {
+        "int": pa.int64(),
+        "text": pa.string(),
+        "json": pa.string(),
+        "ts": pa.timestamp("us", tz="UTC"),
+        "real": pa.float32(),
+        "vector": pa.list_(pa.float32()),
+    }
+    return pa.schema([pa.field(name, types[kind]) for name, kind in TABLES[table]])
+
+
+def _select_sql(table: str) -> str:
+    casts = {"json": "{0}::text AS {0}", "vector": "{0}::real[] AS {0}"}
+    cols = ", ".join(casts.get(kind, "{0}").format(name) for name, kind in TABLES[table])
+    key = TABLES[table][0][0]
+    return f"SELECT {cols} FROM {table} WHERE {key} BETWEEN %s AND %s"
+
+
+def filter_aspects(data: Any, asof: Optional[datetime], known: Optional[datetime]) -> Any:
+    """Restrict an Arrow table of aspect versions to ``asof`` and ``known``.
+
+    ``known`` drops versions recorded after it and reopens (``observed_to`` NULL) the
+    ones superseded after it, leaving the history as it stood then. ``asof`` keeps the
+    versions whose validity window contains it, with CQL's end-boundary semantics.
+    """
+    pa = _pyarrow()
+    pc = pa.compute
+    ts = pa.timestamp("us", tz="UTC")
+    if known is not None:
+        at = pa.scalar(known, type=ts)
+        data = data.filter(
+            pc.or_kleene(pc.is_null(data["observed_at"]), pc.less_equal(data["observed_at"], at))
+        )
+        observed_to = data["observed_to"]
+        data = data.set_column(
+            data.schema.get_field_index("observed_to"),
+            "observed_to",
+            pc.if_else(pc.greater(observed_to, at), pa.scalar(None, type=ts), observed_to),
+        )
+    if asof is not None:
+        at = pa.scalar(asof, type=ts)
+        ends = pc.greater_equal if asof_end_inclusive() else pc.greater
+        started = pc.or_kleene(
+            pc.is_null(data["valid_from"]), pc.less_equal(data["valid_from"], at)
+        )
+        not_ended = pc.or_kleene(pc.is_null(data["valid_to"]), ends(data["valid_to"], at))
+        data = data.filter(pc.and_kleene(started, not_ended))
+    return data
+
+
+def _filter(table: str, data: Any, asof: Optional[datetime], known: Optional[datetime]) -> Any:
+    if table != "aspects" or (asof is None and known is None):
+        return data
+    return filter_aspects(data, asof, known)
+
+
+def _ranges(lo: int, hi: int, parts: int, batch_rows: int) -> List[Tuple[int, int]]:
+    """Split the key range [lo, hi] into at most ``parts`` ranges of ``batch_rows`` or more."""
+    span = hi - lo + 1
+    parts = max(1, min(parts, span // batch_rows))
+    step = -(-span // parts)
+    return [(start, min(start + step - 1, hi)) for start in range(lo, hi + 1, step)]
+
+
+# Worker processes keep one connection each (see _init_worker).
+_worker_conn: Optional[psycopg.Connection] = None
+
+
+def _init_worker() -> None:
+    global _worker_conn
+    _worker_conn = get_conn()
+
+
+def _conn() -> psycopg.Connection:
+    # Tasks also run in-process with a single worker.
+    global _worker_conn
+    if _worker_conn is None or _worker_conn.closed:
+        _worker_conn = get_conn()
+    return _worker_conn
+
+
+def _open_writer(path: str, schema: Any, fmt: str) -> Tuple[Callable[[Any], None], Any]:
+    pa = _pyarrow()
+    if fmt == "parquet":
+        writer = pa.parquet.ParquetWriter(path, schema)
+        return lambda data: writer.write_table(data, row_group_size=len(data) or 1), writer
+    writer = pa.ipc.new_file(path, schema)
+    return lambda data: writer.write_table(data), writer
+
+
+def _export_part(
+    snapshot: str,
+    table: str,
+    lo: int,
+    hi: int,
+    path: str,
+    fmt: str,
+    batch_rows: int,
+    asof: Optional[datetime],
+    known: Optional[datetime],
+) -> int:
+    """Write the rows of ``table`` with keys in [lo, hi] to ``path``; returns the count."""
+    pa = _pyarrow()
+    schema = arrow_schema(table)
+    conn = _conn()
+    rows = 0
+    conn.isolation_level = IsolationLevel.REPEATABLE_READ
+    try:
+        with conn.transaction():
+            # Must come first in the transaction: read what the coordinator sees.
+            conn.execute(sql.SQL("SET TRANSACTION SNAPSHOT {}").format(sql.Literal(snapshot)))
+            with conn.cursor(name="snapshot_export") as cur:
+                cur.execute(_select_sql(table), (lo, hi))
+                write, writer = _open_writer(path + ".tmp", schema, fmt)
+                with writer:
+                    while True:
+                        batch = cur.fetchmany(batch_rows)
+                        if not batch:
+                            break
+                        columns = [
+                            pa.array(values, type=field.type)
+                            for values, field in zip(zip(*batch), schema)
+                        ]
+                        data = _filter(
+                            table, pa.Table.from_arrays(columns, schema=schema), asof, known
+                        )
+                        if len(data):
+                            write(data)
+                            rows += len(data)
+    finally:
+        conn.isolation_level = None
+    os.replace(path + ".tmp", path)
+    return rows
+
+
+def _iso(ts: Optional[datetime]) -> Optional[str]:
+    return None if ts is None else ts.isoformat()
+
+
+def _plan_export(
+    cur: Any, workers: int, batch_rows: int
+) -> Tuple[str, datetime, Dict[str, List[Tuple[int, int]]]]:
+    """Export the transaction's snapshot and split each non-empty table into key ranges."""
+    cur.execute("SELECT pg_export_snapshot(), now()")
+    snapshot, exported_at = cur.fetchone()
+    ranges = {}
+    for table, columns in TABLES.items():
+        key = columns[0][0]
+        cur.execute(f"SELECT min({key}), max({key}) FROM {table}")
+        lo, hi = cur.fetchone()
+        if lo is not None:
+            ranges[table] = _ranges(lo, hi, workers, batch_rows)
+    return snapshot, exported_at, ranges
+
+
+def export_snapshot(
+    directory: str,
+    fmt: str = "parquet",
+    workers: Optional[int] = None,
+    asof: Optional[datetime] = None,
+    known: Optional[datetime] = None,
+    batch_rows: int = BATCH_ROWS,
+    progress: bool = False,
+) -> Dict[str, Any]:
+    """Write a snapshot of the database to ``directory``; returns the manifest plus timing.
+
+    Each table is split into up to ``workers`` files (default: the CPU count), each
+    written in row groups of ``batch_rows``.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown snapshot format {fmt!r}; expected one of {FORMATS}")
+    _pyarrow()
+    t0 = time.perf_counter()
+    workers = max(1, workers or os.cpu_count() or 1)
+    os.makedirs(directory, exist_ok=True)
+    ext = "parquet" if fmt == "parquet" else "arrow"
+    tables: Dict[str, Dict[str, Any]] = {t: {"rows": 0, "files": []} for t in TABLES}
+
+    pool: Optional[ProcessPoolExecutor] = None
+    if workers > 1:
+        # Spawned, not forked: workers must not inherit the parent's connections.
+        pool = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker
+        )
+    try:
+        with get_conn() as conn:
+            conn.isolation_level = IsolationLevel.REPEATABLE_READ
+            # The transaction stays open until every worker has read its part.
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    snapshot, exported_at, ranges = _plan_export(cur, workers, batch_rows)
+                tasks = []
+                for table, table_ranges in ranges.items():
+                    for part, (lo, hi) in enumerate(table_ranges):
+                        name = f"{table}-{part:04d}.{ext}"
+                        tables[table]["files"].append(name)
+                        path = os.path.join(directory, name)
+                        args = (snapshot, table, lo, hi, path, fmt, batch_rows, asof, known)
+                        tasks.append((table, args))
+                if pool is None:
+                    counts = [_export_part(*args) for _table, args in tasks]
+                else:
+                    counts = [
+                        f.result() for f in [pool.submit(_export_part, *args) for _t, args in tasks]
+                    ]
+                for (table, _args), n in zip(tasks, counts):
+                    tables[table]["rows"] += n
+                    if progress:
+                        print(f"[snapshot] exported {table}: {n} rows", file=sys.stderr)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "format": fmt,
+        "exported_at": _iso(exported_at),
+        "asof": _iso(asof),
+        "known": _iso(known),
+        "tables": tables,
+    }
+    # Written last: a directory without a manifest is an incomplete export.
+    tmp = os.path.join(directory, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(tmp, os.path.join(directory, MANIFEST))
+    return {**manifest, "workers": workers, "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def read_manifest(directory: str) -> Dict[str, Any]:
+    """Load and check ``directory``'s manifest."""
+    path = os.path.join(directory, MANIFEST)
+    try:
+        with open(path, encoding="utf-8") as fh:
+            manifest: Dict[str, Any] = json.load(fh)
+    except FileNotFoundError:
+        raise SnapshotError(f"{directory}: no {MANIFEST} (incomplete export?)") from None
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("format") not in FORMATS:
+        raise SnapshotError(f"{path}: unsupported snapshot version or format")
+    return manifest
+
+
+def _units(path: str, fmt: str) -> int:
+    """Number of row groups (record batches) in a snapshot file."""
+    pa = _pyarrow()
+    if fmt == "parquet":
+        return int(pa.parquet.ParquetFile(path).num_row_groups)
+    with pa.OSFile(path, "rb") as source:
+        return int(pa.ipc.open_file(source).num_record_batches)
+
+
+def _read_unit(path: str, fmt: str, index: int) -> Any:
+    pa = _pyarrow()
+    if fmt == "parquet":
+        return pa.parquet.ParquetFile(path).read_row_group(index)
+    with pa.OSFile(path, "rb") as source:
+        return pa.Table.from_batches([pa.ipc.open_file(source).get_batch(index)])
+
+
+def _import_unit(
+    table: str,
+    path: str,
+    fmt: str,
+    index: int,
+    asof: Optional[datetime],
+    known: Optional[datetime],
+) -> int:
+    """COPY one row group of ``path`` into ``table``; returns the row count."""
+    data = _filter(table, _read_unit(path, fmt, index), asof, known)
+    columns: List[List[Any]] = []
+    for name, kind in TABLES[table]:
+        values = data.column(name).to_pylist()
+        if kind == "vector":
+            values = [None if v is None else "[" + ",".join(map(str, v)) + "]" for v in values]
+        columns.append(values)
+    conn = _conn()
+    with conn.transaction():
+        with conn.cursor() as cur:
+            return copy_rows(cur, table, [name for name, _ in TABLES[table]], zip(*columns))
+
+
+def _prepare_target(cur: Any, replace: bool) -> None:
+    if replace:
+        cur.execute(
+            "TRUNCATE current_fibers, aspects, fibers, atoms, sources, journal_segments "
+            "RESTART IDENTITY"
+        )
+    else:
+        cur.execute(
+            "SELECT EXISTS (SELECT 1 FROM atoms) OR EXISTS (SELECT 1 FROM fibers) "
+            "OR EXISTS (SELECT 1 FROM aspects) OR EXISTS (SELECT 1 FROM sources)"
+        )
+        if cur.fetchone()[0]:
+            raise SnapshotError("import needs an empty database; pass replace to truncate it")
+    if is_partitioned(cur):
+        ensure_partitions(cur)
+
+
+def import_snapshot(
+    directory: str,
+    workers: Optional[int] = None,
+    asof: Optional[datetime] = None,
+    known: Optional[datetime] = None,
+    replace: bool = False,
+    progress: bool = False,
+) -> Dict[str, Any]:
+    """Load the snapshot in ``directory`` with ``workers`` processes; returns counts and timing.
+
+    ``workers`` defaults to the CPU count; 1 runs everything in this process. An
+    interrupted import leaves whole row groups behind: run it again with ``replace``.
+    """
+    manifest = read_manifest(directory)
+    _pyarrow()
+    t0 = time.perf_counter()
+    fmt = manifest["format"]
+    workers = max(1, workers or os.cpu_count() or 1)
+    stats: Dict[str, Any] = {"tables": {t: 0 for t in TABLES}, "workers": workers}
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            _prepare_target(cur, replace)
+            for table in _TRIGGER_TABLES:
+                cur.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER")
+    pool: Optional[ProcessPoolExecutor] = None
+    try:
+        if workers > 1:
+            pool = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker
+            )
+        for stage in STAGES:
+            tasks = []
+            for table in stage:
+                for name in manifest["tables"].get(table, {}).get("files", []):
+                    path = os.path.join(directory, name)
+                    for index in range(_units(path, fmt)):
+                        tasks.append((table, path, fmt, index, asof, known))
+            if pool is None:
+                counts = [_import_unit(*task) for task in tasks]
+            else:
+                counts = [f.result() for f in [pool.submit(_import_unit, *t) for t in tasks]]
+            for task, n in zip(tasks, counts):
+                stats["tables"][task[0]] += n
+            if progress:
+                print(f"[snapshot] imported {', '.join(stage)}: {stats}", file=sys.stderr)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                for table in _TRIGGER_TABLES:
+                    cur.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER")
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT current_fibers_refresh(ARRAY(SELECT id FROM fibers))")
+            for table in _SEQUENCE_TABLES:
+                cur.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"COALESCE(max(id), 1), max(id) IS NOT NULL) FROM {table}"
+                )
+            for table in TABLES:
+                cur.execute(f"ANALYZE {table}")
+            cur.execute("ANALYZE current_fibers")
+    invalidate_stats()
+    return {**stats, "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def _timestamp(value: Optional[str]) -> Optional[datetime]:
+    return None if value is None else isoparse(value)
+
+
+def main(argv: Sequence[str]) -> int:
+    ap = argparse.ArgumentParser(description="Export or import columnar CNS snapshots")
+    sub = ap.add_subparsers(dest="command", required=True)
+    exp = sub.add_parser("export", help="write a snapshot of the database")
+    exp.add_argument("directory")
+    exp.add_argument("--format", choices=FORMATS, default="parquet")
+    exp.add_argument("--batch-rows", type=int, default=BATCH_ROWS)
+    imp = sub.add_parser("import", help="load a snapshot into an empty database")
+    imp.add_argument("directory")
+    imp.add_argument("--replace", action="store_true", help="truncate the database first")
+    for p in (exp, imp):
+        p.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+        p.add_argument("--asof", help="keep aspect versions valid at this time")
+        p.add_argument("--known", help="keep aspect history recorded up to this time")
+    args = ap.parse_args(argv)
+
+    asof, known = _timestamp(args.asof), _timestamp(args.known)
+    if args.command == "export":
+        stats = export_snapshot(
+            args.directory,
+            fmt=args.format,
+            workers=args.workers,
+            asof=asof,
+            known=known,
+            batch_rows=args.batch_rows,
+            progress=True,
+        )
+        print(f"Exported: {stats}")
+    else:
+        stats = import_snapshot(
+            args.directory,
+            workers=args.workers,
+            asof=asof,
+            known=known,
+            replace=args.replace,
+            progress=True,
+        )
+        print(f"Imported: {stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+from cns_py.storage.bulk import copy_rows
+
+# Cited documents. Writers pass full provenance JSON as before; the aspects_normalize_source
+# trigger (storage.db) moves a citation's document fields into one deduplicated ``sources``
+# row and sets ``aspects.source_ref``, leaving only per-fact keys (line_span, notes) in
+# ``aspects.provenance``. An aspect is cited exactly when ``source_ref`` is set.
+
+# Provenance keys stored in ``sources`` rather than on the aspect.
+SOURCE_FIELDS = ("source_id", "uri", "hash", "fetched_at")
+
+# A cited document: the SOURCE_FIELDS values as text, as the trigger reads them (->>).
+SourceKey = Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]
+
+
+# An aspect's provenance as written (``asp`` joined to ``sources s``), for readers that
+# want the whole document rather than resolving sources themselves.
+PROVENANCE_SQL = (
+    "CASE WHEN s.id IS NULL THEN asp.provenance ELSE jsonb_strip_nulls(jsonb_build_object("
+    + ", ".join(f"'{f}', s.{f}" for f in SOURCE_FIELDS)
+    + ")) || COALESCE(asp.provenance, '{}'::jsonb) END"
+)
+
+
+def fetch_sources(cur: Any, ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """Source rows by id, in one round trip however many aspects cite them."""
+    wanted = sorted(set(ids))
+    if not wanted:
+        return {}
+    cur.execute(f"SELECT id, {', '.join(SOURCE_FIELDS)} FROM sources WHERE id = ANY(%s)", (wanted,))
+    return {int(row[0]): dict(zip(SOURCE_FIELDS, row[1:])) for row in cur.fetchall()}
+
+
+def _digest_sql(alias: str) -> str:
+    # The digest the trigger deduplicates on, over ``alias``'s SOURCE_FIELDS columns.
+    fields = ", ".join(f"'{f}', {alias}.{f}" for f in SOURCE_FIELDS)
+    return f"md5(jsonb_build_object({fields})::text)"
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def _strip_nulls(value: Any) -> Any:
+    # Python twin of jsonb_strip_nulls: drop null object fields, recursively.
+    if isinstance(value, dict):
+        return {k: _strip_nulls(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [_strip_nulls(v) for v in value]
+    return value
+
+
+def split_citation(
+    provenance: Optional[Dict[str, Any]],
+) -> Tuple[Optional[SourceKey], Optional[Dict[str, Any]]]:
+    """Split provenance as the trigger does: (cited document, per-fact remainder).
+
+    The document is None when the provenance carries no citation (no source_id or uri),
+    in which case the provenance is returned unchanged.
+    """
+    if not isinstance(provenance, dict):
+        return None, provenance
+    source_id, uri, hash_, fetched_at = (_text(provenance.get(f)) for f in SOURCE_FIELDS)
+    if not source_id and not uri:
+        return None, provenance
+    rest = _strip_nulls({k: v for k, v in provenance.items() if k not in SOURCE_FIELDS})
+    return (source_id, uri, hash_, fetched_at), rest or None
+
+
+def resolve_sources(cur: Any, keys: Sequence[SourceKey]) -> Dict[SourceKey, int]:
+    """Map cited documents to ``sources`` ids, inserting the missing ones.
+
+    Inserts go in digest order, so concurrent callers lock new rows in the same order
+    and cannot deadlock. Runs in the caller's transaction.
+    """
+    cur.execute(
+        "CREATE TEMP TABLE ingest_sources (source_id TEXT, uri TEXT, hash TEXT, "
+        "fetched_at TEXT) ON COMMIT DROP"
+    )
+    copy_rows(cur, "ingest_sources", SOURCE_FIELDS, keys)
+    fields = ", ".join(SOURCE_FIELDS)
+    cur.execute(
+        f"INSERT INTO sources ({fields}, digest) "
+        f"SELECT DISTINCT {fields}, {_digest_sql('k')} FROM ingest_sources k "
+        f"ORDER BY {_digest_sql('k')} ON CONFLICT (digest) DO NOTHING"
+    )
+    cur.execute(
+        f"SELECT {', '.join('k.' + f for f in SOURCE_FIELDS)}, s.id FROM ingest_sources k "
+        f"JOIN sources s ON s.digest = {_digest_sql('k')}"
+    )
+    found: Dict[SourceKey, int] = {
+        (source_id, uri, hash_, fetched_at): int(i)
+        for source_id, uri, hash_, fetched_at, i in cur.fetchall()
+    }
+    cur.execute("DROP TABLE ingest_sources")
+    return found
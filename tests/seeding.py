@@ -0,0 +1,32 @@
+from cns_py.storage.db import get_conn
+
+
+def seed_fanout(label: str, n: int, cited: bool = True) -> None:
+    """One ``Entity`` hub with ``n`` ``has_part`` fibers to fresh ``Concept`` atoms.
+
+    Beliefs take few distinct values, so pages and streams must break ties on fiber id.
+    """
+    prov = '{"source_id": "seed"}' if cited else "{}"
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO atoms(kind, label) VALUES ('Entity', %s) RETURNING id", (label,)
+            )
+            src = cur.fetchone()[0]
+            for i in range(n):
+                cur.execute(
+                    "INSERT INTO atoms(kind, label) VALUES ('Concept', %s) RETURNING id",
+                    (f"{label}-obj-{i}",),
+                )
+                dst = cur.fetchone()[0]
+                cur.execute(
+                    "INSERT INTO fibers(src, dst, predicate) VALUES (%s, %s, 'has_part') "
+                    "RETURNING id",
+                    (src, dst),
+                )
+                fid = cur.fetchone()[0]
+                cur.execute(
+                    "INSERT INTO aspects(subject_kind, subject_id, belief, provenance) "
+                    "VALUES ('fiber', %s, %s, %s::jsonb)",
+                    (fid, 0.5 + (i % 3) / 10.0, prov),
+                )
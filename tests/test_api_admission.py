@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import anyio
+import pytest
+from seeding import seed_fanout
+
+from cns_py.api import admission
+from cns_py.api.admission import Gate, Overloaded
+from cns_py.cql.parser import parse
+from cns_py.storage.db import get_conn
+
+try:
+    from fastapi.testclient import TestClient
+
+    from cns_py.api import server
+except Exception:  # pragma: no cover - FastAPI not installed
+    pytest.skip("fastapi not available", allow_module_level=True)
+
+QUERY = {"query": 'MATCH label="FrameworkX" PREDICATE supports_tls'}
+
+
+def test_gate_sheds_when_queue_is_full(monkeypatch):
+    monkeypatch.setenv("CNS_API_MAX_INFLIGHT", "1")
+    monkeypatch.setenv("CNS_API_MAX_QUEUE", "0")
+    gate = Gate("t")
+    with gate.admit():
+        with pytest.raises(Overloaded):
+            gate.acquire()
+    assert gate.shed == 1 and gate.active == 0
+
+
+def test_gate_queues_then_admits_or_times_out(monkeypatch):
+    monkeypatch.setenv("CNS_API_MAX_INFLIGHT", "1")
+    monkeypatch.setenv("CNS_API_QUEUE_TIMEOUT_MS", "2000")
+    gate = Gate("t")
+    gate.acquire()
+    waiter = threading.Thread(target=gate.acquire)
+    waiter.start()
+    time.sleep(0.1)
+    assert gate.waiting == 1
+    gate.release()
+    waiter.join(2)
+    assert gate.active == 1
+
+    monkeypatch.setenv("CNS_API_QUEUE_TIMEOUT_MS", "50")
+    with pytest.raises(Overloaded):
+        gate.acquire()
+
+
+def test_cql_endpoint_sheds_with_503_under_overload(monkeypatch):
+    monkeypatch.setenv("CNS_API_MAX_INFLIGHT_CQL", "1")
+    monkeypatch.setenv("CNS_API_MAX_QUEUE", "0")
+    monkeypatch.setenv("CNS_API_SINGLEFLIGHT", "0")
+    release = threading.Event()
+    entered = threading.Event()
+
+    def blocking_execute(q):
+        entered.set()
+        release.wait(5)
+        return {"results": [], "explain": {"steps": []}}
+
+    monkeypatch.setattr(server, "execute", blocking_execute)
+    client = TestClient(server.get_app())
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        first = pool.submit(client.post, "/cql", json=QUERY)
+        assert entered.wait(5)
+        shed = client.post("/cql", json=QUERY)
+        release.set()
+        assert first.result().status_code == 200
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == "1"
+
+
+def test_coalesced_followers_do_not_take_admission_slots(monkeypatch):
+    monkeypatch.setenv("CNS_API_MAX_INFLIGHT_CQL", "1")
+    monkeypatch.setenv("CNS_API_MAX_QUEUE", "0")
+    monkeypatch.setenv("CNS_API_SINGLEFLIGHT", "1")
+    release = threading.Event()
+    entered = threading.Event()
+    calls = []
+
+    def blocking_execute(q):
+        calls.append(q)
+        entered.set()
+        release.wait(5)
+        return {"results": [], "explain": {"steps": []}}
+
+    monkeypatch.setattr(server, "execute", blocking_execute)
+    client = TestClient(server.get_app())
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        leader = pool.submit(client.post, "/cql", json=QUERY)
+        assert entered.wait(5)
+        followers = [pool.submit(client.post, "/cql", json=QUERY) for _ in range(7)]
+        time.sleep(0.3)
+        release.set()
+        responses = [leader.result()] + [f.result() for f in followers]
+    # One slot, no queue: only the leader's run is admitted; the rest share its result.
+    assert [r.status_code for r in responses] == [200] * 8
+    assert len(calls) == 1
+
+
+def test_cql_endpoint_maps_deadline_to_504(monkeypatch):
+    monkeypatch.setenv("CNS_API_DEADLINE_MS", "100")
+
+    def slow_execute(q):
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_sleep(2)")
+        return {}
+
+    monkeypatch.setattr(server, "execute", slow_execute)
+    client = TestClient(server.get_app())
+    resp = client.post("/cql", json=QUERY)
+    assert resp.status_code == 504
+    assert resp.json()["detail"] == "query deadline exceeded"
+
+
+class _Client:
+    """Stands in for a Request whose client can go away mid-stream."""
+
+    gone = False
+
+    async def is_disconnected(self) -> bool:
+        return self.gone
+
+
+def _open_transactions() -> int:
+    with get_conn() as conn:
+        row = conn.execute(
+            "SELECT count(*) FROM pg_stat_activity WHERE datname = current_database() "
+            "AND state LIKE 'idle in transaction%'"
+        ).fetchone()
+    return int(row[0])
+
+
+def test_stream_disconnect_releases_its_slot_and_transaction():
+    seed_fanout("StreamGone", 1200)
+    gate = admission.gate("cql_stream")
+    active = gate.active
+    client = _Client()
+
+    async def consume() -> None:
+        q = parse('MATCH label="StreamGone" PREDICATE has_part')
+        body = (await server._stream_cql(q, client)).body_iterator  # type: ignore[arg-type]
+        await body.__anext__()  # the first row, pulled before the response started
+        await body.__anext__()  # one fetch batch
+        assert gate.active == active + 1 and _open_transactions() == 1
+        client.gone = True
+        with pytest.raises(StopAsyncIteration):
+            await body.__anext__()
+
+    anyio.run(consume)
+    assert gate.active == active and _open_transactions() == 0
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import json
+
 import pytest
+from seeding import seed_fanout
 
 try:
     from fastapi.testclient import TestClient
 
+    from cns_py.api import graph_codec
     from cns_py.api.server import get_app
 except ImportError:  # pragma: no cover - allows local pytest without fastapi installed
     pytest.skip("fastapi not installed; API tests skipped", allow_module_level=True)
@@ -50,8 +54,176 @@ def test_cql_endpoint_rejects_empty_query():
     assert resp.json()["detail"] == "query must be non-empty"
 
 
+def test_cql_endpoints_report_syntax_errors_as_400():
+    resp = client.post("/cql", json={"query": 'MATCH label="X" LIMIT none'})
+    assert resp.status_code == 400
+    assert (
+        resp.json()["detail"] == "LIMIT must be a positive integer, got 'none' at line 1, column 23"
+    )
+    resp = client.post("/cql/batch", json={"queries": ['MATCH label="X"', "MATCH BOGUS"]})
+    assert resp.status_code == 400
+    assert resp.json()["detail"].startswith("queries[1]: unexpected 'BOGUS'")
+
+
+def test_graph_neighborhood_includes_the_root_whatever_the_label_case():
+    # TLS1.3 has no outbound edges, and the request spells it in lower case.
+    resp = client.get("/graph/neighborhood", params={"label": "tls1.3", "hops": 1})
+    assert resp.status_code == 200
+    assert "TLS1.3" in [n["label"] for n in resp.json()["nodes"]]
+
+
 def test_graph_neighborhood_rejects_bad_params():
     resp = client.get("/graph/neighborhood", params={"label": "", "hops": 1})
     assert resp.status_code == 400
     resp = client.get("/graph/neighborhood", params={"label": "FrameworkX", "hops": 0})
     assert resp.status_code == 400
+
+
+def test_graph_neighborhood_collapses_fanout_into_cluster_nodes():
+    params = {"label": "FrameworkX", "hops": 1, "cluster_threshold": 1}
+    payload = client.get("/graph/neighborhood", params=params).json()
+    framework = next(n for n in payload["nodes"] if n["label"] == "FrameworkX")
+    key = f"supports_tls|{framework['id']}"
+    clusters = [n for n in payload["nodes"] if n["kind"] == "cluster"]
+    tls = [c for c in clusters if c["cluster"] == key]
+    assert len(tls) == 1 and tls[0]["count"] >= 2 and tls[0]["id"] < 0
+    labels = {n["label"] for n in payload["nodes"]}
+    assert "TLS1.3" not in labels
+
+    expanded = client.get("/graph/neighborhood", params={**params, "expand": [key]}).json()
+    assert "TLS1.3" in {n["label"] for n in expanded["nodes"]}
+
+    resp = client.get("/graph/neighborhood", params={**params, "cluster_threshold": 0})
+    assert resp.status_code == 400
+
+
+def test_cluster_counts_cover_fanout_beyond_the_traversal_limit():
+    seed_fanout("LodHub", 30)
+    params = {"label": "LodHub", "hops": 1, "limit": 10, "cluster_threshold": 5}
+    payload = client.get("/graph/neighborhood", params=params).json()
+    clusters = [n for n in payload["nodes"] if n["kind"] == "cluster"]
+    assert [c["count"] for c in clusters] == [30]
+
+
+def test_graph_expand_returns_only_the_delta():
+    hood = client.get("/graph/neighborhood", params={"label": "FrameworkX"}).json()
+    framework = next(n for n in hood["nodes"] if n["label"] == "FrameworkX")
+    known = [n["id"] for n in hood["nodes"]]
+
+    resp = client.post("/graph/expand", json={"frontier": [framework["id"]], "known": known})
+    assert resp.status_code == 200
+    delta = resp.json()
+    # Everything one hop out is already on screen: edges come back, nodes do not.
+    assert delta["nodes"] == []
+    assert delta["edges"] and all(e["src_id"] == framework["id"] for e in delta["edges"])
+    assert len({e["id"] for e in delta["edges"]}) == len(delta["edges"])
+
+    fresh = client.post("/graph/expand", json={"frontier": [framework["id"]]}).json()
+    new_ids = {n["id"] for n in fresh["nodes"]}
+    assert framework["id"] in new_ids
+    assert {e["dst_id"] for e in fresh["edges"]} <= new_ids
+
+    by_label = client.post("/graph/expand", json={"label": "FrameworkX"}).json()
+    assert "FrameworkX" in {n["label"] for n in by_label["nodes"]}
+    assert client.post("/graph/expand", json={}).status_code == 400
+    assert client.post("/graph/expand", json={"label": "x", "limit": 0}).status_code == 400
+
+
+def test_cql_batch_endpoint_returns_responses_in_order():
+    resp = client.post(
+        "/cql/batch",
+        json={
+            "queries": [
+                'MATCH label="FrameworkX" PREDICATE supports_tls ASOF 2025-01-01T00:00:00Z',
+                'MATCH label="FrameworkX" PREDICATE supports_tls ASOF 2024-12-31T12:00:00Z',
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    responses = resp.json()["responses"]
+    assert len(responses) == 2
+    assert responses[0]["results"][0]["object_label"] == "TLS1.3"
+    assert responses[1]["results"][0]["object_label"] == "TLS1.2"
+
+
+def test_cql_batch_endpoint_rejects_empty_batch_and_blank_queries():
+    resp = client.post("/cql/batch", json={"queries": []})
+    assert resp.status_code == 400
+    resp = client.post("/cql/batch", json={"queries": ['MATCH label="FrameworkX"', " "]})
+    assert resp.status_code == 400
+
+
+def test_cql_endpoint_streams_ndjson_with_explain_trailer():
+    resp = client.post(
+        "/cql",
+        json={
+            "query": 'MATCH label="FrameworkX" PREDICATE supports_tls '
+            "ASOF 2025-01-01T00:00:00Z RETURN EXPLAIN PROVENANCE",
+        },
+        headers={"Accept": "application/x-ndjson"},
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines() if line]
+    assert lines[0]["object_label"] == "TLS1.3"
+    assert "explain" in lines[-1]
+
+
+def test_cql_endpoint_validates_limit():
+    resp = client.post("/cql", json={"query": 'MATCH label="FrameworkX"', "limit": 0})
+    assert resp.status_code == 400
+    resp = client.post("/cql", json={"query": 'MATCH label="FrameworkX"', "limit": 10**6})
+    assert resp.status_code == 400
+    resp = client.post("/cql", json={"query": 'MATCH label="FrameworkX"', "limit": 1})
+    assert resp.status_code == 200
+    assert len(resp.json()["results"]) == 1
+
+
+def test_cql_endpoint_surfaces_next_cursor_and_rejects_bad_tokens():
+    resp = client.post(
+        "/cql", json={"query": 'MATCH label="FrameworkX" PREDICATE supports_tls LIMIT 1'}
+    )
+    assert resp.status_code == 200
+    token = resp.json()["next_cursor"]
+    resp = client.post(
+        "/cql",
+        json={"query": f'MATCH label="FrameworkX" PREDICATE supports_tls LIMIT 1 AFTER "{token}"'},
+    )
+    assert resp.status_code == 200
+    resp = client.post("/cql", json={"query": 'MATCH label="FrameworkX" AFTER "bogus"'})
+    assert resp.status_code == 400
+
+
+def test_fast_json_path_matches_standard_responses(monkeypatch):
+    query = {
+        "query": 'MATCH label="FrameworkX" PREDICATE supports_tls '
+        "ASOF 2025-01-01T00:00:00Z RETURN EXPLAIN PROVENANCE"
+    }
+    params = {"label": "FrameworkX", "hops": 1}
+    standard_cql = client.post("/cql", json=query).json()
+    standard_graph = client.get("/graph/neighborhood", params=params).json()
+
+    monkeypatch.setenv("CNS_API_FAST_JSON", "1")
+    fast_cql = client.post("/cql", json=query)
+    fast_graph = client.get("/graph/neighborhood", params=params)
+    assert fast_cql.status_code == 200 and fast_graph.status_code == 200
+    assert fast_cql.headers["content-type"].startswith("application/json")
+    fast_results = fast_cql.json()["results"]
+    assert len(fast_results) == len(standard_cql["results"])
+    for fast, std in zip(fast_results, standard_cql["results"]):
+        # Confidence carries a wall-clock recency term, so compare it approximately.
+        assert abs(fast.pop("confidence") - std.pop("confidence")) < 1e-6
+        assert fast == std
+    assert set(fast_cql.json()["explain"]) == set(standard_cql["explain"])
+    assert fast_graph.json() == standard_graph
+
+
+def test_graph_neighborhood_serves_binary_layout_when_accepted():
+    params = {"label": "FrameworkX", "hops": 1}
+    as_json = client.get("/graph/neighborhood", params=params).json()
+    resp = client.get(
+        "/graph/neighborhood", params=params, headers={"Accept": graph_codec.MEDIA_TYPE}
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith(graph_codec.MEDIA_TYPE)
+    assert graph_codec.decode_graph(resp.content) == as_json
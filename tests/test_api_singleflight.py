@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg
+import pytest
+
+from cns_py.storage.db import QueryScope, query_scope
+
+try:
+    from fastapi.testclient import TestClient
+
+    from cns_py.api import server
+except Exception:  # pragma: no cover - FastAPI not installed
+    pytest.skip("fastapi not available", allow_module_level=True)
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight = server._SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow() -> int:
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 42
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        leader = pool.submit(flight.do, "k", slow)
+        started.wait(5)
+        followers = [pool.submit(flight.do, "k", slow) for _ in range(7)]
+        time.sleep(0.05)
+        release.set()
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert results == [42] * 8
+    assert len(calls) == 1
+    # Nothing is cached after completion.
+    assert flight.do("k", lambda: 7) == 7
+
+
+def test_errors_propagate_to_every_waiter_and_clear_the_key():
+    flight = server._SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def boom() -> int:
+        started.set()
+        release.wait(5)
+        raise RuntimeError("db down")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(flight.do, "k", boom)
+        started.wait(5)
+        second = pool.submit(flight.do, "k", boom)
+        time.sleep(0.05)
+        release.set()
+        for fut in (first, second):
+            with pytest.raises(RuntimeError):
+                fut.result()
+    assert flight.do("k", lambda: 1) == 1
+
+
+def _in_scope(scope, fn):
+    def run():
+        with query_scope(scope):
+            return fn()
+
+    return run
+
+
+def test_callers_do_not_join_a_cancelled_leader():
+    flight = server._SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    leader_scope = QueryScope()
+
+    def slow() -> str:
+        started.set()
+        release.wait(5)
+        return "leader"
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(_in_scope(leader_scope, lambda: flight.do("k", slow)))
+        started.wait(5)
+        assert leader_scope.cancel()
+        # The cancelled leader is not joined; the caller runs its own call.
+        assert flight.do("k", lambda: "own") == "own"
+        release.set()
+        assert leader.result() == "leader"
+
+
+def test_waiters_outliving_the_leader_deadline_run_again():
+    flight = server._SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def run() -> str:
+        calls.append(1)
+        if len(calls) == 1:
+            started.set()
+            release.wait(5)
+            raise psycopg.errors.QueryCanceled("canceling statement due to statement timeout")
+        return "retried"
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(_in_scope(QueryScope(timeout_ms=1000), lambda: flight.do("k", run)))
+        started.wait(5)
+        follower = pool.submit(_in_scope(QueryScope(timeout_ms=5000), lambda: flight.do("k", run)))
+        time.sleep(0.05)
+        release.set()
+        with pytest.raises(psycopg.errors.QueryCanceled):
+            leader.result()
+        assert follower.result() == "retried"
+    assert len(calls) == 2
+
+
+def test_cql_endpoint_coalesces_identical_requests(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def fake_execute(q):
+        calls.append(q)
+        release.wait(5)
+        return {"results": [], "explain": {"steps": []}}
+
+    monkeypatch.setattr(server, "execute", fake_execute)
+    client = TestClient(server.get_app())
+    query = {"query": 'MATCH label="FrameworkX" PREDICATE supports_tls'}
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        futures = [pool.submit(client.post, "/cql", json=query) for _ in range(6)]
+        time.sleep(0.3)
+        release.set()
+        responses = [f.result() for f in futures]
+    assert all(r.status_code == 200 for r in responses)
+    assert 1 <= len(calls) < 6
+
+    calls.clear()
+    monkeypatch.setenv("CNS_API_SINGLEFLIGHT", "0")
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(client.post, "/cql", json=query) for _ in range(3)]
+        [f.result() for f in futures]
+    assert len(calls) == 3
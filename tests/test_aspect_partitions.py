@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import pytest
+
+from cns_py.cql.executor import _single_sql, cql
+from cns_py.cql.parser import parse
+from cns_py.cql.planner import load_stats
+from cns_py.demo.ingest import upsert_atom
+from cns_py.storage import partitions
+from cns_py.storage.aspects import aspect_history, record_aspect
+from cns_py.storage.db import SCHEMA_SQL, get_conn
+
+NOW = datetime(2026, 10, 19, tzinfo=timezone.utc)
+Q = 'MATCH label="FrameworkX" PREDICATE supports_tls ASOF 2025-06-01T00:00:00Z'
+
+
+def _migrate() -> None:
+    with get_conn() as conn:
+        assert partitions.migrate(conn, now=NOW)
+
+
+def _explain(query: str) -> str:
+    sql, params = _single_sql(parse(query), datetime(2025, 6, 1, tzinfo=timezone.utc), 10)
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            return str(cur.fetchone()[0])
+
+
+def _summary(query: str) -> tuple:
+    count = cql(query + " RETURN COUNT")["results"]
+    distinct = cql(query + " RETURN DISTINCT")["results"]
+    return count, sorted(r["object_label"] for r in distinct)
+
+
+def _aspect_rows() -> int:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM aspects")
+            return int(cur.fetchone()[0])
+
+
+def test_migrate_builds_the_partition_tree():
+    before = _summary(Q)
+    rows = _aspect_rows()
+    _migrate()
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            assert partitions.is_partitioned(cur)
+            leaves = set(partitions.partition_sizes(cur))
+            cur.execute(SCHEMA_SQL)  # init stays idempotent on the partitioned table
+        assert not partitions.migrate(conn, now=NOW)
+    assert {"aspects_atom", "aspects_fiber_current", "aspects_fiber_hist"} <= leaves
+    # The current month and three ahead.
+    assert {f"aspects_fiber_h2026{m}" for m in ("10", "11", "12")} <= leaves
+    assert "aspects_fiber_h202701" in leaves and "aspects_fiber_h202702" not in leaves
+    assert _summary(Q) == before and _aspect_rows() == rows
+
+
+def test_ensure_partitions_fills_gaps_and_is_idempotent():
+    _migrate()
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            later = datetime(2027, 4, 2, tzinfo=timezone.utc)
+            assert partitions.ensure_partitions(cur, 1, now=later) == [
+                f"aspects_fiber_h2027{m:02d}" for m in range(2, 6)
+            ]
+            assert partitions.ensure_partitions(cur, 1, now=later) == []
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DROP TABLE aspects_fiber_current, aspects_fiber, aspects_atom, aspects")
+            cur.execute(SCHEMA_SQL)
+            with pytest.raises(RuntimeError, match="not partitioned"):
+                partitions.ensure_partitions(cur)
+
+
+def test_revisions_move_to_history_and_current_reads_prune():
+    _migrate()
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            src = upsert_atom(cur, "Entity", "PtLib")
+            dst = upsert_atom(cur, "Concept", "PtTLS")
+            cur.execute(
+                "INSERT INTO fibers(src, dst, predicate) VALUES (%s, %s, 'pt_supports') "
+                "RETURNING id",
+                (src, dst),
+            )
+            fid = cur.fetchone()[0]
+            for observed_at, belief in [(datetime(2026, 9, 1), 0.4), (NOW, 0.8)]:
+                record_aspect(
+                    cur,
+                    "fiber",
+                    fid,
+                    valid_from=datetime(2024, 1, 1, tzinfo=timezone.utc),
+                    valid_to=None,
+                    belief=belief,
+                    provenance={"source_id": "pt"},
+                    observed_at=observed_at.replace(tzinfo=timezone.utc),
+                )
+            cur.execute(
+                "SELECT tableoid::regclass::text, observed_to IS NULL FROM aspects "
+                "WHERE subject_kind = 'fiber' AND subject_id = %s ORDER BY id",
+                (fid,),
+            )
+            assert cur.fetchall() == [
+                ("aspects_fiber_h202610", False),
+                ("aspects_fiber_current", True),
+            ]
+            assert [h["belief"] for h in aspect_history(cur, "fiber", fid)] == pytest.approx(
+                [0.4, 0.8]
+            )
+    q = 'MATCH label="PtLib" PREDICATE pt_supports ASOF 2025-06-01T00:00:00Z'
+    steps = {s["name"]: s for s in cql(q)["explain"]["steps"]}
+    assert [
+        round(t["before"], 2) for t in steps["belief_compute"]["extra"]["belief_terms"].values()
+    ] == [0.8]
+    steps = {s["name"]: s for s in cql(q + " ASOF KNOWN 2026-10-15T00:00:00Z")["explain"]["steps"]}
+    assert [
+        round(t["before"], 2) for t in steps["belief_compute"]["extra"]["belief_terms"].values()
+    ] == [0.4]
+
+    current = _explain(q)
+    assert "aspects_fiber_current" in current
+    assert "aspects_fiber_h" not in current and "aspects_atom" not in current
+    # Knowledge as of mid-October skips the history closed before October.
+    known_plan = _explain(q + " ASOF KNOWN 2026-10-15T00:00:00Z")
+    assert "aspects_fiber_h202610" in known_plan and "aspects_fiber_hist" not in known_plan
+
+
+def test_planner_stats_see_partitioned_aspects():
+    _migrate()
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM aspects")
+            rows = cur.fetchone()[0]
+            stats = load_stats(cur)
+    assert stats.source == "pg_stats"
+    assert stats.aspects == pytest.approx(rows, rel=0.1)
+    assert "aspects.subject_kind" in stats.columns
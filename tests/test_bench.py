@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from cns_py.bench import (
+    LatencyHistogram,
+    build_sync_op,
+    compare,
+    format_report,
+    main,
+    run_suite,
+    run_threads,
+    sample_subjects,
+)
+
+
+def test_histogram_percentiles_have_bounded_relative_error():
+    hist = LatencyHistogram()
+    for ms in range(1, 1001):
+        hist.record(ms / 1000.0)
+    summary = hist.summary()
+    assert hist.count == 1000
+    for key, expected in (("p50_ms", 500), ("p99_ms", 990), ("p999_ms", 999)):
+        assert abs(summary[key] - expected) <= expected * 0.011
+    assert summary["max_ms"] == 1000.0
+    assert summary["min_ms"] == 1.0
+
+
+def test_histogram_merge_matches_single_histogram():
+    a, b, both = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for i in range(200):
+        (a if i % 2 else b).record(i / 1e4)
+        both.record(i / 1e4)
+    a.merge(b)
+    assert a.summary() == both.summary()
+
+
+def _report(**workload: float) -> dict:
+    base = {"p50_ms": 10.0, "p95_ms": 20.0, "p99_ms": 30.0, "throughput_ops_s": 100.0}
+    return {"results": {"cql": {**base, "errors": 0, **workload}}}
+
+
+def test_compare_flags_latency_throughput_and_error_regressions():
+    baseline = _report()
+    assert compare(baseline, _report(p95_ms=21.0), tolerance=0.10) == []
+    assert compare(baseline, _report(p99_ms=40.0), tolerance=0.10) == ["cql p99_ms: 30.00 -> 40.00"]
+    assert compare(baseline, _report(throughput_ops_s=80.0), tolerance=0.10)
+    assert compare(baseline, _report(errors=3), tolerance=0.10)
+    # Workloads absent from the current run are not regressions.
+    assert compare(baseline, {"results": {}}) == []
+
+
+def test_run_threads_against_demo_data():
+    subjects = sample_subjects()
+    assert any(label == "FrameworkX" for _, label in subjects)
+    result = run_threads("cql", build_sync_op("cql", subjects), concurrency=2, iterations=10)
+    assert result.ops == 10 and result.errors == 0
+    row = result.to_dict()
+    assert row["throughput_ops_s"] > 0 and row["p50_ms"] <= row["p99_ms"] <= row["max_ms"]
+
+
+def test_warmup_failures_are_counted_not_raised():
+    def flaky(i: int) -> None:
+        if i < 2:
+            raise RuntimeError("cold")
+
+    result = run_threads("flaky", flaky, iterations=5, warmup=3)
+    assert result.warmup_errors == 2 and result.errors == 2 and result.ops == 3
+    assert result.to_dict()["warmup_errors"] == 2
+
+
+def test_asyncio_client_runs_http_workloads_only(capsys):
+    report = run_suite(["http_cql"], concurrency=2, duration_s=0.2, client="asyncio", warmup=1)
+    assert report["meta"]["client"] == report["results"]["http_cql"]["client"] == "asyncio"
+    with pytest.raises(ValueError, match="http_"):
+        run_suite(["http_cql", "cql"], concurrency=1, duration_s=0.1, client="asyncio")
+    with pytest.raises(SystemExit):
+        main(["--client", "asyncio", "--workloads", "cql,http_cql"])
+    assert "only runs http_* workloads, not cql" in capsys.readouterr().err
+
+
+def test_main_writes_baseline_and_compares(tmp_path, capsys):
+    out = tmp_path / "bench.json"
+    args = ["--workloads", "traverse_from,http_cql", "--concurrency", "2", "--duration", "0.3"]
+    assert main(args + ["--out", str(out)]) == 0
+    report = json.loads(out.read_text())
+    assert set(report["results"]) == {"traverse_from", "http_cql"}
+    assert report["results"]["http_cql"]["errors"] == 0
+    assert "traverse_from" in format_report(report)
+
+    # Against a generous tolerance the same setup does not regress.
+    assert main(args + ["--compare", str(out), "--tolerance", "100"]) == 0
+    assert "REGRESSION" not in capsys.readouterr().out
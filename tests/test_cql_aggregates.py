@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+
+from cns_py.cql.executor import cql, cql_many, execute_stream
+from cns_py.cql.parser import CqlSyntaxError, parse, parse_plan
+from cns_py.storage.db import get_conn
+
+# (predicate, object, belief, valid_from, cited): all from the atom "AggHub".
+Fact = Tuple[str, str, float, Optional[str], bool]
+FACTS: List[Fact] = [
+    ("agg_supports", "AggTLS13", 0.9, "2024-01-01", True),
+    ("agg_supports", "AggTLS13", 0.7, "2024-01-01", True),  # duplicate triple
+    ("agg_supports", "AggTLS12", 0.6, "2024-01-01", True),
+    ("agg_supports", "AggTLS11", 0.95, "2024-01-01", False),  # uncited: never counted
+    ("agg_supports", "AggTLS10", 0.4, "2026-01-01", True),  # not valid yet in 2025
+    ("agg_requires", "AggOpenSSL", 0.8, "2024-01-01", True),
+]
+HUB = 'MATCH label="AggHub" ASOF 2025-06-01T00:00:00Z'
+
+
+@pytest.fixture
+def hub() -> None:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            ids: Dict[str, int] = {}
+            for label in ["AggHub"] + sorted({f[1] for f in FACTS}):
+                cur.execute(
+                    "INSERT INTO atoms(kind, label) VALUES ('Entity', %s) RETURNING id", (label,)
+                )
+                ids[label] = cur.fetchone()[0]
+            for pred, obj, belief, valid_from, cited in FACTS:
+                cur.execute(
+                    "INSERT INTO fibers(src, dst, predicate) VALUES (%s, %s, %s) RETURNING id",
+                    (ids["AggHub"], ids[obj], pred),
+                )
+                fid = cur.fetchone()[0]
+                cur.execute(
+                    "INSERT INTO aspects(subject_kind, subject_id, belief, valid_from, provenance)"
+                    " VALUES ('fiber', %s, %s, %s, %s::jsonb)",
+                    (fid, belief, valid_from, '{"uri": "https://x"}' if cited else "{}"),
+                )
+
+
+def test_parse_aggregates():
+    plan = parse_plan(HUB + " GROUP BY object TOP 2 BY confidence RETURN COUNT DISTINCT")
+    assert plan.ret.count and plan.ret.distinct
+    assert plan.group_by == "object" and plan.top == 2
+    q = parse(HUB + " RETURN COUNT GROUP BY Predicate")
+    assert q.count and q.group_by == "predicate" and q.plan().group_by == "predicate"
+
+
+@pytest.mark.parametrize(
+    "query, message",
+    [
+        ("MATCH label=X GROUP BY object", "GROUP BY requires RETURN COUNT"),
+        ("MATCH label=X GROUP object RETURN COUNT", "expected BY after GROUP"),
+        ("MATCH label=X GROUP BY subject RETURN COUNT", "cannot GROUP BY 'subject'"),
+        ("MATCH label=X RETURN COUNT TOP 3 BY confidence", "TOP with COUNT requires GROUP BY"),
+        ("MATCH label=X TOP 3 BY recency", "TOP can only rank BY confidence"),
+        ("MATCH label=X TOP 0 BY confidence", "TOP must be a positive integer"),
+        ("MATCH label=X TOP 3 BY confidence LIMIT 5", "LIMIT cannot be combined with TOP"),
+        ('MATCH label=X AFTER "abc" RETURN DISTINCT', "AFTER cannot be combined with DISTINCT"),
+        ("MATCH (a)-[p]->(b) RETURN COUNT", "COUNT cannot be combined with a path pattern"),
+        ("MATCH label=X COUNT", "COUNT must follow RETURN"),
+    ],
+)
+def test_aggregate_syntax_errors(query, message):
+    with pytest.raises(CqlSyntaxError, match=message):
+        parse(query)
+
+
+def test_count_only_cited_valid_rows(hub):
+    out = cql(HUB + " RETURN COUNT")
+    assert out["results"] == [{"count": 4}]
+    assert cql(HUB + " RETURN COUNT DISTINCT")["results"] == [{"count": 3}]
+    assert cql(HUB + " BELIEF >= 0.75 RETURN COUNT")["results"] == [{"count": 2}]
+    planner = out["explain"]["steps"][0]["extra"]
+    assert planner["aggregate"] == "count" and planner["actual_rows"] == 1
+
+
+def test_group_by_and_top(hub):
+    rows = cql(HUB + " GROUP BY object RETURN COUNT")["results"]
+    assert [(r["object"], r["count"]) for r in rows] == [
+        ("AggTLS13", 2),
+        ("AggOpenSSL", 1),
+        ("AggTLS12", 1),
+    ]
+    assert rows[0]["max_belief"] == pytest.approx(0.9)
+    by_pred = cql(HUB + " GROUP BY predicate RETURN COUNT DISTINCT")["results"]
+    assert [(r["predicate"], r["count"]) for r in by_pred] == [
+        ("agg_supports", 2),
+        ("agg_requires", 1),
+    ]
+    top = cql(HUB + " GROUP BY object TOP 2 BY confidence RETURN COUNT")["results"]
+    assert [r["object"] for r in top] == ["AggTLS13", "AggOpenSSL"]
+
+
+def test_distinct_and_top_rows(hub):
+    out = cql(HUB + " RETURN DISTINCT")
+    triples = [(r["predicate"], r["object_label"]) for r in out["results"]]
+    assert triples == [
+        ("agg_supports", "AggTLS13"),
+        ("agg_requires", "AggOpenSSL"),
+        ("agg_supports", "AggTLS12"),
+    ]
+    # The uncited AggTLS11 row has the highest belief; TOP ranks cited rows only.
+    top = cql(HUB + " TOP 2 BY confidence")
+    assert [r["object_label"] for r in top["results"]] == ["AggTLS13", "AggOpenSSL"]
+    assert "next_cursor" not in top
+
+
+def test_aggregates_in_stream_and_batch(hub):
+    items = list(execute_stream(parse(HUB + " GROUP BY object RETURN COUNT")))
+    assert [i.get("object") for i in items[:-1]] == ["AggTLS13", "AggOpenSSL", "AggTLS12"]
+    assert "explain" in items[-1]
+    count, distinct, top, plain = cql_many(
+        [
+            HUB + " RETURN COUNT",
+            HUB + " RETURN DISTINCT",
+            HUB + " TOP 1 BY confidence",
+            HUB + " LIMIT 1",
+        ]
+    )
+    assert count["results"] == [{"count": 4}]
+    assert len(distinct["results"]) == 3
+    # The uncited row never takes LIMIT 1's slot; TOP 1 agrees but has no cursor.
+    assert [r["object_label"] for r in plain["results"]] == ["AggTLS13"]
+    assert "next_cursor" in plain
+    assert [r["object_label"] for r in top["results"]] == ["AggTLS13"]
+    assert "next_cursor" not in top
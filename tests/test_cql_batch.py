@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from typing import Dict
+
+from cns_py.cql.executor import cql, cql_many, execute_many
+
+
+def _steps_by_name(explain: Dict) -> Dict[str, Dict]:
+    return {s.get("name"): s for s in explain.get("steps", [])}
+
+
+def _triples(payload: Dict) -> list:
+    return [(r["subject_label"], r["predicate"], r["object_label"]) for r in payload["results"]]
+
+
+QUERIES = [
+    'MATCH label="FrameworkX" PREDICATE supports_tls ASOF 2025-01-01T00:00:00Z '
+    "RETURN EXPLAIN PROVENANCE",
+    'MATCH label="FrameworkX" PREDICATE supports_tls ASOF 2024-12-31T12:00:00Z '
+    "RETURN EXPLAIN PROVENANCE",
+    'MATCH label="NoSuchAtom" PREDICATE supports_tls ASOF 2025-01-01T00:00:00Z',
+    'MATCH label="FrameworkX" BELIEF >= 0.97',
+]
+
+
+def test_cql_many_matches_individual_execution_in_order():
+    batched = cql_many(QUERIES)
+    assert len(batched) == len(QUERIES)
+    for query, payload in zip(QUERIES, batched):
+        single = cql(query)
+        assert _triples(payload) == _triples(single)
+        assert [r["provenance"] for r in payload["results"]] == [
+            r["provenance"] for r in single["results"]
+        ]
+
+
+def test_cql_many_groups_same_shaped_queries_into_one_statement():
+    out = cql_many(QUERIES)
+    traverse = [_steps_by_name(p["explain"])["graph_traverse"] for p in out]
+    # The three label+predicate+asof queries share one statement; the belief query runs alone.
+    assert [t["extra"]["batch_size"] for t in traverse] == [3, 3, 3, 1]
+    assert traverse[2]["extra"]["rows"] == 0
+    for payload in out:
+        steps = _steps_by_name(payload["explain"])
+        for name in ("planner", "ann_shortlist", "temporal_mask", "belief_compute"):
+            assert name in steps
+
+
+def test_execute_many_empty_input_returns_empty_list():
+    assert execute_many([]) == []
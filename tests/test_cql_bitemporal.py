@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import pytest
+
+from cns_py.cql.executor import _single_sql, cql, cql_many
+from cns_py.cql.parser import CqlSyntaxError, parse
+from cns_py.demo.ingest import upsert_atom
+from cns_py.storage.aspects import aspect_history, record_aspect
+from cns_py.storage.db import get_conn
+
+
+def _utc(*args: int) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+CITED = {"source_id": "audit"}
+Q = 'MATCH label="BtLib" PREDICATE bt_supports'
+
+
+@pytest.fixture
+def fiber() -> int:
+    """BtLib -bt_supports-> BtTLS, believed 0.4 in 2024 and revised to 0.9 in mid-2024;
+    in 2025 the fact was retracted by closing its validity."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            src = upsert_atom(cur, "Entity", "BtLib")
+            dst = upsert_atom(cur, "Concept", "BtTLS")
+            cur.execute(
+                "INSERT INTO fibers(src, dst, predicate) VALUES (%s, %s, 'bt_supports') "
+                "RETURNING id",
+                (src, dst),
+            )
+            fid = int(cur.fetchone()[0])
+            versions = [
+                (_utc(2024, 1, 1), None, 0.4),
+                (_utc(2024, 6, 1), None, 0.9),
+                (_utc(2025, 1, 1), _utc(2024, 12, 1), 0.9),
+            ]
+            for observed_at, valid_to, belief in versions:
+                record_aspect(
+                    cur,
+                    "fiber",
+                    fid,
+                    valid_from=_utc(2023, 1, 1),
+                    valid_to=valid_to,
+                    belief=belief,
+                    provenance=CITED,
+                    observed_at=observed_at,
+                )
+    return fid
+
+
+def _beliefs(query: str) -> list:
+    """Base beliefs of the results, i.e. of the aspect versions the query read."""
+    steps = {s["name"]: s for s in cql(query)["explain"]["steps"]}
+    return [
+        round(t["before"], 2) for t in steps["belief_compute"]["extra"]["belief_terms"].values()
+    ]
+
+
+def test_parse_asof_known():
+    q = parse(Q + " ASOF 2024-03-01T00:00:00Z ASOF KNOWN 2024-02-01T00:00:00Z")
+    assert q.asof_iso == "2024-03-01T00:00:00Z"
+    assert q.known_iso == "2024-02-01T00:00:00Z"
+    assert q.plan().known is not None
+    with pytest.raises(CqlSyntaxError, match="duplicate ASOF KNOWN clause"):
+        parse(Q + " ASOF KNOWN 2024-01-01 ASOF KNOWN 2024-02-01")
+    with pytest.raises(CqlSyntaxError, match="invalid timestamp 'soon'"):
+        parse(Q + " ASOF KNOWN soon")
+
+
+def test_record_aspect_keeps_history(fiber):
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            history = aspect_history(cur, "fiber", fiber)
+    assert [h["belief"] for h in history] == pytest.approx([0.4, 0.9, 0.9])
+    # Each version is closed exactly when the next one starts; only the last is current.
+    assert [h["observed_to"] for h in history] == [_utc(2024, 6, 1), _utc(2025, 1, 1), None]
+
+
+def test_backfill_before_the_current_version_is_rejected(fiber):
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            with pytest.raises(ValueError, match="precedes the current version"):
+                record_aspect(cur, "fiber", fiber, belief=0.1, observed_at=_utc(2024, 3, 1))
+            history = aspect_history(cur, "fiber", fiber)
+    # Nothing was closed or added.
+    assert [h["observed_to"] for h in history] == [_utc(2024, 6, 1), _utc(2025, 1, 1), None]
+
+
+def test_asof_known_reads_the_version_recorded_then(fiber):
+    # Today: the retraction is known, so nothing is valid in 2025.
+    assert _beliefs(Q + " ASOF 2025-02-01T00:00:00Z") == []
+    assert _beliefs(Q) == [0.9]
+    # Known in March 2024: the first version, still open-ended.
+    known_march = Q + " ASOF 2025-02-01T00:00:00Z ASOF KNOWN 2024-03-01T00:00:00Z"
+    assert _beliefs(known_march) == [0.4]
+    assert _beliefs(Q + " ASOF KNOWN 2024-07-01T00:00:00Z") == [0.9]
+    # Before the first observation nothing was known.
+    assert cql(Q + " ASOF KNOWN 2023-06-01T00:00:00Z")["results"] == []
+    # The other query forms honour KNOWN too.
+    count = cql(Q + " ASOF 2025-02-01T00:00:00Z ASOF KNOWN 2024-03-01T00:00:00Z RETURN COUNT")
+    assert count["results"] == [{"count": 1}]
+    path = cql(
+        'MATCH ("BtLib")-[bt_supports]->(x) ASOF 2025-02-01T00:00:00Z '
+        "ASOF KNOWN 2024-07-01T00:00:00Z"
+    )
+    assert [r["nodes"] for r in path["results"]] == [["BtLib", "BtTLS"]]
+
+
+def test_batch_mixes_known_and_current(fiber):
+    current, known = cql_many(
+        [Q + " ASOF 2025-02-01T00:00:00Z", Q + " ASOF 2025-02-01T00:00:00Z ASOF KNOWN 2024-03-01"]
+    )
+    assert current["results"] == []
+    assert [r["object_label"] for r in known["results"]] == ["BtTLS"]
+    assert known["explain"]["steps"][2]["extra"]["known"] == "2024-03-01"
+
+
+def test_both_time_query_can_use_the_bitemporal_index(fiber):
+    q = parse(Q + " ASOF 2024-03-01T00:00:00Z ASOF KNOWN 2024-03-01T00:00:00Z")
+    sql, params = _single_sql(q, _utc(2024, 3, 1), 10)
+    with get_conn() as conn:
+        conn.execute("SET enable_seqscan = off")
+        with conn.cursor() as cur:
+            cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = str(cur.fetchone()[0])
+    assert "idx_aspects_fiber_bitemporal" in plan
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+from fastapi.testclient import TestClient
+
+from cns_py import metrics
+from cns_py.api.server import get_app
+from cns_py.cql.executor import cql, cql_many, execute_stream, shape_label
+from cns_py.cql.parser import CqlSyntaxError, parse, parse_plan
+from cns_py.cql.planner import Edge, Node
+from cns_py.storage.db import get_conn
+
+PATH = "MATCH (a)-[pq_depends_on]->(b)-[pq_supports_tls]->(c)"
+
+# (src, predicate, dst, belief, valid_from, valid_to, cited)
+Fact = Tuple[str, str, str, float, Optional[str], Optional[str], bool]
+FACTS: List[Fact] = [
+    ("PqApp", "pq_depends_on", "PqLib", 0.9, "2024-01-01", None, True),
+    ("PqLib", "pq_supports_tls", "PqTLS12", 0.8, "2023-01-01", None, True),
+    # Only valid from mid-2025: present for late ASOFs, absent for early ones.
+    ("PqLib", "pq_supports_tls", "PqTLS13", 0.95, "2025-06-01", None, True),
+    # Uncited second hop: the whole path is dropped.
+    ("PqLib", "pq_supports_tls", "PqTLSX", 0.99, "2023-01-01", None, False),
+    # Low-belief first hop.
+    ("PqOld", "pq_depends_on", "PqLib", 0.3, "2023-01-01", None, True),
+]
+
+
+def _seed(facts: List[Fact]) -> None:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            ids: Dict[str, int] = {}
+            for label in sorted({f[0] for f in facts} | {f[2] for f in facts}):
+                cur.execute(
+                    "INSERT INTO atoms(kind, label) VALUES ('Entity', %s) RETURNING id", (label,)
+                )
+                ids[label] = cur.fetchone()[0]
+            for src, pred, dst, belief, valid_from, valid_to, cited in facts:
+                cur.execute(
+                    "INSERT INTO fibers(src, dst, predicate) VALUES (%s, %s, %s) RETURNING id",
+                    (ids[src], ids[dst], pred),
+                )
+                fid = cur.fetchone()[0]
+                prov = '{"source_id": "seed"}' if cited else "{}"
+                cur.execute(
+                    "INSERT INTO aspects(subject_kind, subject_id, belief, valid_from, valid_to,"
+                    " provenance) VALUES ('fiber', %s, %s, %s, %s, %s::jsonb)",
+                    (fid, belief, valid_from, valid_to, prov),
+                )
+
+
+def _paths(out: Dict) -> List[List[str]]:
+    return [r["nodes"] for r in out["results"]]
+
+
+def test_parse_path_pattern():
+    plan = parse_plan(PATH + " ASOF 2025-01-01T00:00:00Z BELIEF >= 0.5")
+    assert plan.match is None and plan.belief and plan.belief.ge == 0.5
+    assert plan.path is not None
+    assert plan.path.nodes == (Node("a"), Node("b"), Node("c"))
+    assert plan.path.edges == (Edge("pq_depends_on"), Edge("pq_supports_tls"))
+    path = parse('MATCH ("PqApp")-[]->(x LABEL="PqLib")').path
+    assert path is not None
+    assert path.nodes == (Node(None, "PqApp"), Node("x", "PqLib")) and path.edges == (Edge(),)
+    assert parse(PATH).plan().path == plan.path
+
+
+@pytest.mark.parametrize(
+    "query, message",
+    [
+        ("MATCH (a)", "expected '-\\[' after a path node"),
+        ("MATCH (a)-[p]->b", "expected '\\(' to open a path node"),
+        ("MATCH (a)-[p (b)", "expected '\\]->' to close the edge"),
+        ("MATCH (a)-[p]->(b) LABEL=X", "LABEL cannot be combined with a path pattern"),
+        ("MATCH (a)-[p]->(b) (c)-[p]->(d)", "duplicate path clause"),
+        ("MATCH " + "(a)" + "-[p]->(a)" * 5, "path patterns are limited to 4 hops"),
+    ],
+)
+def test_path_syntax_errors(query, message):
+    with pytest.raises(CqlSyntaxError, match=message):
+        parse(query)
+
+
+def test_path_applies_asof_to_every_edge():
+    _seed(FACTS)
+    early = cql(PATH + " ASOF 2025-01-01T00:00:00Z")
+    assert _paths(early) == [["PqApp", "PqLib", "PqTLS12"], ["PqOld", "PqLib", "PqTLS12"]]
+    late = cql(PATH + " ASOF 2025-07-01T00:00:00Z")
+    assert ["PqApp", "PqLib", "PqTLS13"] in _paths(late)
+    # PqApp's edge starts in 2024, so in 2023 only PqOld's paths exist.
+    assert _paths(cql(PATH + " ASOF 2023-06-01T00:00:00Z")) == [["PqOld", "PqLib", "PqTLS12"]]
+
+
+def test_path_belief_filter_and_citations():
+    _seed(FACTS)
+    out = cql(PATH + " ASOF 2025-07-01T00:00:00Z BELIEF >= 0.5")
+    assert _paths(out) == [["PqApp", "PqLib", "PqTLS13"], ["PqApp", "PqLib", "PqTLS12"]]
+    top = out["results"][0]
+    assert [e["predicate"] for e in top["edges"]] == ["pq_depends_on", "pq_supports_tls"]
+    assert top["edges"][0]["provenance"][0]["source_id"] == "seed"
+    edge_conf = top["edges"][0]["confidence"] * top["edges"][1]["confidence"]
+    assert top["confidence"] == pytest.approx(edge_conf)
+    steps = {s["name"]: s for s in out["explain"]["steps"]}
+    # The path through the uncited PqTLSX hop never leaves SQL.
+    assert steps["graph_traverse"]["extra"] == {"rows": 2, "hops": 2}
+    assert steps["belief_compute"]["extra"]["items"] == 4
+
+
+def test_path_runs_as_one_statement():
+    _seed(FACTS)
+    before = metrics.DB_ROUNDTRIP_SECONDS.count(op="cql_path")
+    out = cql(PATH + " RETURN EXPLAIN ANALYZE")
+    assert metrics.DB_ROUNDTRIP_SECONDS.count(op="cql_path") == before + 1
+    traverse = next(s for s in out["explain"]["steps"] if s["name"] == "graph_traverse")
+    assert sum(n.get("relation") == "fibers" for n in traverse["extra"]["pg"]["nodes"]) == 2
+    assert shape_label(parse(PATH + " BELIEF >= 0.1")) == "path2+belief"
+
+
+def test_repeated_variable_closes_a_cycle():
+    _seed(
+        [
+            ("PqRing1", "pq_next", "PqRing2", 0.9, None, None, True),
+            ("PqRing2", "pq_next", "PqRing1", 0.9, None, None, True),
+            ("PqRing2", "pq_next", "PqRing3", 0.9, None, None, True),
+        ]
+    )
+    out = cql("MATCH (a)-[pq_next]->(b)-[pq_next]->(a)")
+    assert sorted(_paths(out)) == [
+        ["PqRing1", "PqRing2", "PqRing1"],
+        ["PqRing2", "PqRing1", "PqRing2"],
+    ]
+
+
+def test_paths_in_stream_batch_and_api():
+    _seed(FACTS)
+    query = PATH + " ASOF 2025-01-01T00:00:00Z"
+    expected = _paths(cql(query))
+    items = list(execute_stream(parse(query)))
+    assert [i["nodes"] for i in items[:-1]] == expected and "explain" in items[-1]
+    plain, path = cql_many(['MATCH label="PqApp"', query])
+    assert plain["results"][0]["object_label"] == "PqLib"
+    assert _paths(path) == expected
+    resp = TestClient(get_app()).post("/cql", json={"query": query})
+    assert resp.status_code == 200
+    assert _paths(resp.json()) == expected
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from dataclasses import replace
+
+from seeding import seed_fanout
+
+from cns_py.cql.executor import cql, execute, execute_stream
+from cns_py.cql.parser import parse
+
+QUERY = (
+    'MATCH label="FrameworkX" PREDICATE supports_tls '
+    "ASOF 2025-01-01T00:00:00Z RETURN EXPLAIN PROVENANCE"
+)
+
+
+def test_stream_yields_same_results_as_execute_then_explain_trailer():
+    items = list(execute_stream(parse(QUERY)))
+    assert "explain" in items[-1]
+    rows = items[:-1]
+    buffered = cql(QUERY)["results"]
+    assert [r["object_label"] for r in rows] == [r["object_label"] for r in buffered]
+    steps = {s["name"]: s for s in items[-1]["explain"]["steps"]}
+    assert steps["graph_traverse"]["extra"]["rows"] >= len(rows)
+    # Streaming keeps aggregates only; per-fiber terms would grow with the result size.
+    assert "belief_terms" not in steps["belief_compute"]["extra"]
+    assert steps["belief_compute"]["extra"]["items"] == len(rows)
+
+
+def test_stream_without_explain_has_no_trailer():
+    q = replace(parse(QUERY), explain=False)
+    items = list(execute_stream(q))
+    assert all("explain" not in item for item in items)
+
+
+def test_limit_none_is_unbounded_and_explicit_limit_caps_rows():
+    seed_fanout("StreamHub", 150)
+    q = parse('MATCH label="StreamHub" PREDICATE has_part')
+    assert len(execute(q)["results"]) == 100  # default cap
+
+    unbounded = [i for i in execute_stream(replace(q, limit=None)) if "explain" not in i]
+    assert len(unbounded) == 150
+
+    assert len(execute(replace(q, limit=7))["results"]) == 7
+    capped = [i for i in execute_stream(replace(q, limit=7)) if "explain" not in i]
+    assert len(capped) == 7
+
+
+def test_stream_drops_uncited_rows():
+    seed_fanout("StreamUncited", 5, cited=False)
+    q = replace(parse('MATCH label="StreamUncited" RETURN EXPLAIN'), limit=None)
+    items = list(execute_stream(q))
+    assert len(items) == 1 and "explain" in items[0]
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import pytest
+
+from cns_py.cql.executor import _single_sql, cql, cql_many, execute_stream
+from cns_py.cql.parser import parse
+from cns_py.demo.ingest import link_with_validity, upsert_atom
+from cns_py.storage.aspects import record_aspect
+from cns_py.storage.db import get_conn
+
+QUERIES = [
+    'MATCH label="FrameworkX" PREDICATE supports_tls',
+    'MATCH label="FrameworkX" PREDICATE supports_tls LIMIT 1',
+    "MATCH PREDICATE supports_tls BELIEF >= 0.5",
+    'MATCH label="FrameworkX" RETURN DISTINCT',
+    'MATCH label="FrameworkX" GROUP BY object RETURN COUNT',
+]
+
+
+def _identities(out: Dict) -> List:
+    # Confidence decays with wall-clock time, so compare what was returned.
+    return [
+        tuple(sorted((k, str(v)) for k, v in r.items() if k != "confidence"))
+        for r in out["results"]
+    ]
+
+
+def _strategy(out: Dict) -> str:
+    return out["explain"]["steps"][0]["extra"]["strategy"]
+
+
+def _row(fiber_id: int) -> tuple:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT subject_label, predicate, object_label, belief, source_ref IS NOT NULL "
+                "FROM current_fibers WHERE fiber_id = %s",
+                (fiber_id,),
+            )
+            return cur.fetchone()
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_current_fibers_matches_the_base_tables(monkeypatch, query):
+    routed = cql(query)
+    assert _strategy(routed) == "current"
+    monkeypatch.setenv("CNS_CQL_CURRENT_FIBERS", "0")
+    base = cql(query)
+    assert _strategy(base) != "current"
+    assert _identities(routed) == _identities(base)
+    assert routed.get("next_cursor") == base.get("next_cursor")
+
+
+def test_routing_covers_stream_and_batch_but_not_asof_or_paths():
+    # Seed the facts counted here rather than relying on the demo rows in the template.
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            src = upsert_atom(cur, "Entity", "CfRouted")
+            for i in range(3):
+                dst = upsert_atom(cur, "Concept", f"CfRoutedTLS{i}")
+                link_with_validity(
+                    cur, src, dst, "cf_routes", datetime(2024, 1, 1, tzinfo=timezone.utc), None
+                )
+    query = 'MATCH label="CfRouted" PREDICATE cf_routes'
+    streamed = list(execute_stream(parse(query + " LIMIT 2")))
+    assert len(streamed) == 3 and "next_cursor" in streamed[-1]
+    current, asof, known = cql_many(
+        [
+            query,
+            query + " ASOF 2025-01-01T00:00:00Z",
+            query + " ASOF 2025-01-01T00:00:00Z ASOF KNOWN 2030-01-01T00:00:00Z",
+        ]
+    )
+    assert _strategy(current) == "current"
+    assert _strategy(asof) == _strategy(known) == "natural"
+    assert len(current["results"]) == 3
+    assert _identities(current) == _identities(asof) == _identities(known)
+    path = cql('MATCH ("CfRouted")-[cf_routes]->(t)')
+    assert _strategy(path) == "natural"
+
+
+def test_triggers_keep_current_fibers_in_step():
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            src = upsert_atom(cur, "Entity", "CfLib")
+            dst = upsert_atom(cur, "Concept", "CfTLS")
+            cur.execute(
+                "INSERT INTO fibers(src, dst, predicate) VALUES (%s, %s, 'cf_supports') "
+                "RETURNING id",
+                (src, dst),
+            )
+            fid = cur.fetchone()[0]
+    # A fiber without an aspect is there with an empty aspect.
+    assert _row(fid) == ("CfLib", "cf_supports", "CfTLS", None, False)
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            for belief in (0.4, 0.8):
+                record_aspect(
+                    cur,
+                    "fiber",
+                    fid,
+                    valid_from=datetime(2024, 1, 1, tzinfo=timezone.utc),
+                    valid_to=None,
+                    belief=belief,
+                    provenance={"source_id": "cf"},
+                )
+    assert _row(fid)[3:] == (pytest.approx(0.8), True)
+
+    with get_conn() as conn:
+        conn.execute("UPDATE atoms SET label = 'CfTLS13' WHERE id = %s", (dst,))
+        conn.execute("UPDATE fibers SET predicate = 'cf_requires' WHERE id = %s", (fid,))
+    assert _row(fid)[:3] == ("CfLib", "cf_requires", "CfTLS13")
+    out = cql('MATCH label="CfLib" PREDICATE cf_requires')
+    assert [r["object_label"] for r in out["results"]] == ["CfTLS13"]
+
+    with get_conn() as conn:
+        conn.execute(
+            "DELETE FROM aspects WHERE subject_kind = 'fiber' AND subject_id = %s "
+            "AND observed_to IS NULL",
+            (fid,),
+        )
+    assert _row(fid)[3:] == (None, False)
+    with get_conn() as conn:
+        conn.execute("DELETE FROM fibers WHERE id = %s", (fid,))
+    assert _row(fid) is None
+
+
+def test_present_time_lookup_is_one_index_scan():
+    with get_conn() as conn:
+        conn.execute("ANALYZE current_fibers")
+    q = parse('MATCH label="FrameworkX" PREDICATE supports_tls LIMIT 5')
+    sql, params = _single_sql(q, None, 5, "current")
+    with get_conn() as conn:
+        conn.execute("SET enable_seqscan = off")
+        with conn.cursor() as cur:
+            cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cur.fetchone()[0][0]["Plan"]
+    # Rows come off one index already in result order: no join, no sort.
+    assert plan["Node Type"] == "Limit"
+    scan = plan["Plans"][0]
+    assert scan["Node Type"] == "Index Scan"
+    # Every demo fact matches, so any of the ordered indexes may win; all are partial
+    # on the citations contract.
+    assert scan["Relation Name"] == "current_fibers"
+    assert scan["Index Name"].startswith("idx_current_fibers_")
+    assert scan["Index Name"].endswith("_cited")
+    assert "source_ref" not in scan.get("Filter", "")
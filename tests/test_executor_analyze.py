@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from typing import Dict
+
+from fastapi.testclient import TestClient
+
+from cns_py.api.server import get_app
+from cns_py.cql.executor import cql, cql_many, execute_stream
+from cns_py.cql.parser import parse
+from cns_py.cql.profiling import summarize_plan
+
+QUERY = 'MATCH label="FrameworkX" PREDICATE supports_tls ASOF 2025-01-01T00:00:00Z'
+
+
+def _traverse(explain: Dict) -> Dict:
+    return next(s for s in explain["steps"] if s["name"] == "graph_traverse")
+
+
+def test_parse_analyze_and_profile():
+    q = parse(QUERY + " RETURN EXPLAIN ANALYZE PROFILE")
+    assert q.analyze and q.profile and q.explain
+    assert not parse(QUERY + " RETURN EXPLAIN").analyze
+
+
+def test_summarize_plan_flattens_nodes():
+    doc = {
+        "Plan": {
+            "Node Type": "Limit",
+            "Actual Rows": 2,
+            "Shared Hit Blocks": 7,
+            "Plans": [{"Node Type": "Index Scan", "Relation Name": "fibers", "Actual Rows": 2}],
+        },
+        "Planning Time": 0.1,
+        "Execution Time": 0.5,
+    }
+    out = summarize_plan(doc)
+    assert out["execution_ms"] == 0.5 and out["shared_hit_blocks"] == 7
+    assert [(n["depth"], n["node"]) for n in out["nodes"]] == [(0, "Limit"), (1, "Index Scan")]
+    assert out["nodes"][1]["relation"] == "fibers"
+
+
+def test_explain_analyze_attaches_pg_plan_to_traverse_step():
+    out = cql(QUERY + " RETURN EXPLAIN ANALYZE")
+    pg = _traverse(out["explain"])["extra"]["pg"]
+    assert pg["execution_ms"] >= 0.0 and pg["planning_ms"] >= 0.0
+    assert pg["nodes"][0]["depth"] == 0 and "actual_rows" in pg["nodes"][0]
+    assert any(n.get("relation") == "fibers" for n in pg["nodes"])
+    assert pg["plan"]["Plan"]["Node Type"] == pg["nodes"][0]["node"]
+    # Without ANALYZE nothing extra is run or attached.
+    assert "pg" not in _traverse(cql(QUERY)["explain"])["extra"]
+
+
+def test_profile_reports_python_hotspots():
+    out = cql(QUERY + " RETURN PROFILE")
+    profile = out["explain"]["profile"]
+    assert profile["total_calls"] > 0
+    assert any("_execute" in f["function"] for f in profile["functions"])
+
+
+def test_analyze_in_stream_and_batch():
+    trailer = list(execute_stream(parse(QUERY + " RETURN EXPLAIN ANALYZE")))[-1]
+    assert "pg" in _traverse(trailer["explain"])["extra"]
+    plain, analyzed = cql_many([QUERY, QUERY + " RETURN EXPLAIN ANALYZE"])
+    assert "pg" not in _traverse(plain["explain"])["extra"]
+    assert "pg" in _traverse(analyzed["explain"])["extra"]
+
+
+def test_api_flags():
+    client = TestClient(get_app())
+    resp = client.post("/cql", json={"query": QUERY, "analyze": True, "profile": True})
+    assert resp.status_code == 200
+    explain = resp.json()["explain"]
+    assert "pg" in _traverse(explain)["extra"]
+    assert "functions" in explain["profile"]
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import json
+import math
+
+import pytest
+
+from cns_py.api.graph_codec import decode_graph, encode_graph
+
+PAYLOAD = {
+    "nodes": [
+        {"id": 1, "label": "FrameworkX", "kind": None},
+        {"id": 2, "label": "TLS1.3", "kind": "Concept"},
+        {"id": 3, "label": "Übersicht ✓", "kind": "Concept"},
+        {"id": 2**40, "label": "big-id", "kind": "Entity"},
+    ],
+    "edges": [
+        {"src_id": 1, "dst_id": 2, "predicate": "supports_tls", "confidence": 0.5},
+        {"src_id": 1, "dst_id": 3, "predicate": "mentions", "confidence": None},
+        {"src_id": 3, "dst_id": 2**40, "predicate": "supports_tls", "confidence": 0.25},
+    ],
+}
+
+
+def test_roundtrip_preserves_nodes_edges_and_nulls():
+    assert decode_graph(encode_graph(PAYLOAD)) == PAYLOAD
+
+
+def test_cluster_counts_roundtrip():
+    payload = {
+        "nodes": [
+            {"id": 1, "label": "hub", "kind": None},
+            {"id": 2, "label": "cites (500)", "kind": "cluster", "count": 500},
+        ],
+        "edges": [{"src_id": 1, "dst_id": 2, "predicate": "cites", "confidence": None}],
+    }
+    assert decode_graph(encode_graph(payload)) == payload
+
+
+def test_sections_are_eight_byte_aligned_and_compact():
+    data = encode_graph(PAYLOAD)
+    assert data[:4] == b"CNSG"
+    assert len(data) % 8 == 0
+    big = {
+        "nodes": [{"id": i, "label": f"n{i}", "kind": None} for i in range(2000)],
+        "edges": [
+            {"src_id": i, "dst_id": (i + 1) % 2000, "predicate": "p", "confidence": None}
+            for i in range(2000)
+        ],
+    }
+    assert len(encode_graph(big)) * 2.5 < len(json.dumps(big))
+
+
+def test_dangling_edges_are_dropped_and_empty_graph_encodes():
+    payload = {
+        "nodes": [{"id": 1, "label": "a", "kind": None}],
+        "edges": [{"src_id": 1, "dst_id": 99, "predicate": "p", "confidence": 1.0}],
+    }
+    assert decode_graph(encode_graph(payload))["edges"] == []
+    assert decode_graph(encode_graph({"nodes": [], "edges": []})) == {"nodes": [], "edges": []}
+
+
+def test_confidence_is_float32():
+    payload = {
+        "nodes": [{"id": 1, "label": "a", "kind": None}],
+        "edges": [{"src_id": 1, "dst_id": 1, "predicate": "p", "confidence": 0.1}],
+    }
+    conf = decode_graph(encode_graph(payload))["edges"][0]["confidence"]
+    assert math.isclose(conf, 0.1, rel_tol=1e-6)
+
+
+def test_rejects_foreign_payloads():
+    with pytest.raises(ValueError):
+        decode_graph(b"JSON" + b"\0" * 12)
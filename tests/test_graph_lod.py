@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from cns_py.graph import cluster_key, collapse_fanout
+
+EDGES = [("hub", "cites", f"paper{i}") for i in range(5)] + [
+    ("hub", "authored_by", "alice"),
+    ("paper0", "cites", "paper1"),
+]
+
+
+def test_collapses_groups_above_threshold_and_keeps_the_rest():
+    kept, collapsed = collapse_fanout(EDGES, threshold=3)
+    assert collapsed == {("hub", "cites"): 5}
+    assert kept == [("hub", "authored_by", "alice"), ("paper0", "cites", "paper1")]
+
+
+def test_threshold_is_inclusive_and_expand_reopens_a_cluster():
+    kept, collapsed = collapse_fanout(EDGES, threshold=5)
+    assert collapsed == {} and kept == EDGES
+    kept, collapsed = collapse_fanout(EDGES, threshold=1, expand=[cluster_key("hub", "cites")])
+    assert collapsed == {}
+    assert kept == EDGES
+
+
+def test_totals_override_counts_of_a_truncated_traversal():
+    # Only 2 of the hub's 40 citations made it under the traversal limit.
+    kept, collapsed = collapse_fanout(EDGES[:2], threshold=3, totals={("hub", "cites"): 40})
+    assert collapsed == {("hub", "cites"): 40} and kept == []
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import csv
+import json
+from collections import Counter
+
+import pytest
+
+from cns_py.cql.executor import cql
+from cns_py.demo.ingest import DEMO_SOURCE
+from cns_py.storage.db import get_conn
+from cns_py.storage.ingest import ingest, parse_record, read_records, shard_of
+
+FACTS = [
+    {
+        "subject": f"IngLib{i % 7}",
+        "predicate": "ing_supports",
+        "object": f"IngTLS{i % 5}",
+        "object_kind": "Concept",
+        "valid_from": "2024-01-01T00:00:00Z",
+        "belief": 0.5 + (i % 4) / 10.0,
+        "provenance": dict(DEMO_SOURCE, line_span=[i, i + 1]),
+    }
+    for i in range(60)
+]
+
+
+def _write_jsonl(path, facts) -> str:
+    with open(path, "w", encoding="utf-8") as fh:
+        for fact in facts:
+            fh.write(json.dumps(fact) + "\n")
+    return str(path)
+
+
+def _write_csv(path, facts) -> str:
+    # Flat citation columns instead of a provenance object.
+    fields = ["subject", "predicate", "object", "object_kind", "valid_from", "belief"]
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, fieldnames=fields + ["source_id", "uri"])
+        writer.writeheader()
+        for fact in facts:
+            row = {f: fact[f] for f in fields}
+            writer.writerow(dict(row, source_id="ing:csv", uri="https://example.org/ing"))
+    return str(path)
+
+
+def _graph() -> Counter:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT a.label, f.predicate, b.label, b.kind, asp.belief "
+                "FROM fibers f JOIN atoms a ON a.id = f.src JOIN atoms b ON b.id = f.dst "
+                "JOIN aspects asp ON asp.subject_kind = 'fiber' AND asp.subject_id = f.id "
+                "WHERE f.predicate LIKE 'ing_%'"
+            )
+            return Counter(cur.fetchall())
+
+
+def test_parse_record_merges_flat_citations_and_rejects_partial_facts():
+    rec = parse_record(
+        {"subject": "A", "predicate": "p", "object": "B", "belief": "0.7", "uri": "u://x"}
+    )
+    assert rec.subject_key == ("Entity", "A") and rec.belief == pytest.approx(0.7)
+    assert rec.provenance == {"uri": "u://x"} and rec.valid_from is None
+    with pytest.raises(ValueError, match="object"):
+        parse_record({"subject": "A", "predicate": "p"})
+    assert len({shard_of(("Entity", f"L{i}"), 4) for i in range(50)}) == 4
+
+
+def test_parallel_ingest_loads_every_format(tmp_path):
+    jsonl = _write_jsonl(tmp_path / "facts.jsonl", FACTS[:40])
+    # An existing atom is reused rather than duplicated.
+    known = dict(FACTS[0], subject="FrameworkX")
+    csv_path = _write_csv(tmp_path / "facts.csv", FACTS[40:] + [known])
+    assert len(list(read_records(csv_path))) == 21
+
+    stats = ingest([jsonl, csv_path], workers=2, chunk_rows=8)
+    assert stats["facts"] == 61 and stats["atoms"] == 13 and stats["atoms_created"] == 12
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM atoms WHERE label = 'FrameworkX'")
+            assert cur.fetchone()[0] == 1
+
+    out = cql('MATCH label="IngLib3" PREDICATE ing_supports LIMIT 100')
+    # Repeated (subject, predicate, object) facts are versions of one fiber.
+    assert len(out["results"]) == len({f["object"] for f in FACTS if f["subject"] == "IngLib3"})
+    uris = {r["provenance"][0]["uri"] for r in out["results"]}
+    assert uris == {DEMO_SOURCE["uri"], "https://example.org/ing"}
+    assert cql('MATCH label="FrameworkX" PREDICATE ing_supports')["results"]
+
+
+def test_worker_count_does_not_change_the_result(tmp_path):
+    path = _write_jsonl(tmp_path / "facts.jsonl", FACTS)
+    ingest([path], workers=1)
+    serial = _graph()
+    with get_conn() as conn:
+        conn.execute("DELETE FROM fibers WHERE predicate = 'ing_supports'")
+        conn.execute(
+            "DELETE FROM aspects WHERE subject_kind = 'fiber' "
+            "AND NOT EXISTS (SELECT 1 FROM fibers f WHERE f.id = subject_id)"
+        )
+    ingest([path], workers=3, chunk_rows=5)
+    assert _graph() == serial and sum(serial.values()) == len(FACTS)
+
+
+def test_reingesting_versions_existing_fibers(tmp_path):
+    path = _write_jsonl(tmp_path / "facts.jsonl", FACTS)
+    ingest([path], workers=2, chunk_rows=8)
+
+    def counts() -> tuple:
+        with get_conn() as conn:
+            row = conn.execute(
+                "SELECT count(DISTINCT f.id), count(asp.*), count(asp.*) FILTER "
+                "(WHERE asp.observed_to IS NULL) FROM fibers f JOIN aspects asp "
+                "ON asp.subject_kind = 'fiber' AND asp.subject_id = f.id "
+                "WHERE f.predicate = 'ing_supports'"
+            ).fetchone()
+        return tuple(row)
+
+    fibers, aspects, current = counts()
+    assert fibers == current == len({(f["subject"], f["object"]) for f in FACTS})
+    assert aspects == len(FACTS)
+    ingest([path], workers=2, chunk_rows=8)
+    # Same fibers, one more version per fact, still one current version per fiber.
+    assert counts() == (fibers, 2 * len(FACTS), fibers)
+
+
+def test_parallel_chunks_share_new_citations(tmp_path):
+    # Each chunk cites most of the same new documents, in a different order.
+    facts = [
+        dict(
+            FACTS[0],
+            subject=f"IngCite{i}",
+            predicate="ing_cites",
+            provenance={"source_id": f"ing:doc{(i * 7) % 30}", "uri": f"u://{(i * 7) % 30}"},
+        )
+        for i in range(300)
+    ]
+    facts[0]["provenance"] = dict(facts[0]["provenance"], line_span=[1, 2], hash=None)
+    path = _write_jsonl(tmp_path / "cites.jsonl", facts)
+    stats = ingest([path], workers=3, chunk_rows=10)
+    assert stats["facts"] == 300 and stats["sources"] == 30
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT count(DISTINCT asp.source_ref), count(*) FILTER (WHERE asp.source_ref "
+                "IS NULL) FROM fibers f JOIN aspects asp ON asp.subject_kind = 'fiber' "
+                "AND asp.subject_id = f.id WHERE f.predicate = 'ing_cites'"
+            )
+            assert cur.fetchone() == (30, 0)
+            cur.execute("SELECT count(*) FROM sources WHERE source_id LIKE 'ing:doc%'")
+            assert cur.fetchone()[0] == 30
+    # The per-fact remainder stays on the aspect, as the trigger would leave it.
+    out = cql('MATCH label="IngCite0" PREDICATE ing_cites')
+    assert out["results"][0]["provenance"][0]["line_span"] == [1, 2]
+
+
+def test_parquet_input(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    rows = [dict(f, provenance=json.dumps(f["provenance"])) for f in FACTS[:10]]
+    pq.write_table(pa.Table.from_pylist(rows), tmp_path / "facts.parquet")
+    stats = ingest([str(tmp_path / "facts.parquet")], workers=2)
+    assert stats["facts"] == 10
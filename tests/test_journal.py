@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from cns_py.cql.executor import cql
+from cns_py.demo.ingest import DEMO_SOURCE
+from cns_py.storage import journal as journal_mod
+from cns_py.storage.aspects import aspect_history
+from cns_py.storage.db import get_conn
+from cns_py.storage.journal import Journal, JournalError, read_segment, replay, segments
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+LIB = ("Entity", "JnLib")
+TLS12 = ("Concept", "JnTLS12")
+TLS13 = ("Concept", "JnTLS13")
+
+
+def _write(directory: str) -> None:
+    with Journal(directory) as jn:
+        jn.atom(*LIB, text="A TLS library", observed_at=T0)
+        jn.fiber(LIB, "jn_supports", TLS12, observed_at=T0)
+        for day, belief in ((1, 0.6), (2, 0.9)):
+            jn.aspect(
+                (LIB, "jn_supports", TLS12),
+                valid_from=T0,
+                belief=belief,
+                provenance=DEMO_SOURCE,
+                observed_at=T0 + timedelta(days=day),
+            )
+        # The fiber is created by its first aspect.
+        jn.aspect(
+            (LIB, "jn_supports", TLS13),
+            belief=0.8,
+            provenance=DEMO_SOURCE,
+            observed_at=T0 + timedelta(days=3),
+        )
+        jn.aspect(LIB, embedding=[0.5] * 384, observed_at=T0 + timedelta(days=3))
+
+
+def _fiber_id(dst: str) -> int:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT f.id FROM fibers f JOIN atoms a ON a.id = f.src "
+                "JOIN atoms b ON b.id = f.dst WHERE a.label = 'JnLib' AND b.label = %s",
+                (dst,),
+            )
+            rows = cur.fetchall()
+            assert len(rows) == 1
+            return int(rows[0][0])
+
+
+def test_segments_round_trip_and_detect_corruption(tmp_path):
+    directory = str(tmp_path)
+    _write(directory)
+    (path,) = segments(directory)
+    footer, blocks = read_segment(path)
+    assert footer["rows"] == 6 and footer["blocks"] == 3
+    assert footer["observed_from"] == T0.isoformat()
+    kinds = {kind: rows for kind, _header, rows in blocks}
+    assert kinds["atom"] == [("Entity", "JnLib", "A TLS library", T0)]
+    assert [r[9] for r in kinds["aspect"]] == [0.6, 0.9, 0.8, None]
+    aspect_header = next(h for kind, h, _ in blocks if kind == "aspect")
+    assert aspect_header["valid_from"] is None  # open-ended rows make the bound open
+
+    data = bytearray(open(path, "rb").read())
+    data[len(journal_mod.MAGIC) + 40] ^= 0xFF
+    with open(path, "wb") as fh:
+        fh.write(data)
+    with pytest.raises(JournalError):
+        read_segment(path)
+
+
+def test_appends_are_fsynced_in_batches_and_segments_roll(tmp_path, monkeypatch):
+    syncs = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(journal_mod.os, "fsync", lambda fd: syncs.append(fd) or real_fsync(fd))
+    jn = Journal(str(tmp_path), segment_rows=300, flush_rows=100, flush_interval=3600)
+    for i in range(450):
+        jn.atom("Entity", f"JnBatch{i}")
+    # 4 flushes of 100 rows; the third seals the first segment (file + directory).
+    assert len(syncs) == 4 + 2
+    jn.close()
+    assert [read_segment(p)[0]["rows"] for p in segments(str(tmp_path))] == [300, 150]
+
+
+def test_a_lone_append_is_flushed_within_the_interval(tmp_path, monkeypatch):
+    syncs = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(journal_mod.os, "fsync", lambda fd: syncs.append(fd) or real_fsync(fd))
+    jn = Journal(str(tmp_path), flush_rows=1000, flush_interval=0.05)
+    jn.atom("Entity", "JnLonely")
+    # No further append or flush: the background flusher writes it.
+    deadline = time.monotonic() + 5.0
+    while not syncs and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(syncs) == 1 and jn._pending_rows == 0
+    jn.close()
+    assert not jn._flusher.is_alive()
+    assert [read_segment(p)[0]["rows"] for p in segments(str(tmp_path))] == [1]
+
+
+def test_appends_after_close_are_rejected(tmp_path):
+    jn = Journal(str(tmp_path))
+    jn.atom("Entity", "JnBefore")
+    jn.close()
+    with pytest.raises(JournalError, match="closed"):
+        jn.atom("Entity", "JnAfter")
+    jn.close()
+    assert [read_segment(p)[0]["rows"] for p in segments(str(tmp_path))] == [1]
+    assert not [f for f in os.listdir(tmp_path) if f.endswith(".open")]
+
+
+def test_crash_leaves_a_torn_segment_that_is_recovered(tmp_path):
+    directory = str(tmp_path)
+    jn = Journal(directory, flush_rows=1)
+    jn.atom("Entity", "JnSurvivor")
+    jn.atom("Entity", "JnTorn")
+    assert jn._file is not None
+    jn._file.write(b"B\x00\x00")  # a block header cut short by the crash
+    jn._file.flush()
+    Journal(directory).close()
+    footer, blocks = read_segment(segments(directory)[0])
+    assert [rows[0][1] for _kind, _header, rows in blocks] == ["JnSurvivor", "JnTorn"]
+
+
+def test_replay_applies_segments_once_and_keeps_history(tmp_path):
+    directory = str(tmp_path)
+    _write(directory)
+    stats = replay(directory)
+    assert stats["segments"] == 1 and stats["ops"] == 6 and stats["atoms_created"] == 3
+    assert replay(directory)["skipped"] == 1
+
+    fid = _fiber_id("JnTLS12")
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            history = aspect_history(cur, "fiber", fid)
+            cur.execute("SELECT text FROM atoms WHERE label = 'JnLib'")
+            assert cur.fetchone()[0] == "A TLS library"
+            cur.execute(
+                "SELECT count(*) FROM aspects asp JOIN atoms a ON a.id = asp.subject_id "
+                "WHERE asp.subject_kind = 'atom' AND a.label = 'JnLib' "
+                "AND asp.embedding IS NOT NULL"
+            )
+            assert cur.fetchone()[0] == 1
+    assert [h["belief"] for h in history] == pytest.approx([0.6, 0.9])
+    assert history[0]["observed_to"] == history[1]["observed_at"] == T0 + timedelta(days=2)
+    assert history[1]["observed_to"] is None and history[1]["provenance"] == DEMO_SOURCE
+    out = cql('MATCH label="JnLib" PREDICATE jn_supports')
+    assert [r["object_label"] for r in out["results"]] == ["JnTLS12", "JnTLS13"]
+
+    # A later segment revises the fact on top of what is stored.
+    with Journal(directory) as jn:
+        jn.aspect(
+            (LIB, "jn_supports", TLS12),
+            belief=0.3,
+            provenance=DEMO_SOURCE,
+            observed_at=T0 + timedelta(days=9),
+        )
+    assert replay(directory)["segments"] == 1
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            beliefs = [h["belief"] for h in aspect_history(cur, "fiber", fid)]
+    assert beliefs == pytest.approx([0.6, 0.9, 0.3])
+
+
+def test_replay_up_to_a_transaction_time_then_the_rest(tmp_path):
+    directory = str(tmp_path)
+    _write(directory)
+    stats = replay(directory, known=T0 + timedelta(days=1))
+    assert stats["ops"] == 3
+    fid = _fiber_id("JnTLS12")
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            assert [h["belief"] for h in aspect_history(cur, "fiber", fid)] == pytest.approx([0.6])
+    assert cql('MATCH label="JnLib" PREDICATE jn_supports')["results"][0]["object_label"] == (
+        "JnTLS12"
+    )
+    assert replay(directory, known=T0 + timedelta(days=1))["skipped"] == 1
+    assert replay(directory)["ops"] == 3
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            history = aspect_history(cur, "fiber", fid)
+            cur.execute("SELECT known FROM journal_segments")
+            assert cur.fetchall() == [(None,)]
+    assert [h["belief"] for h in history] == pytest.approx([0.6, 0.9])
+    assert history[0]["observed_to"] == T0 + timedelta(days=2)
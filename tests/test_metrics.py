@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import pytest
+
+from cns_py import metrics
+from cns_py.cql.executor import cql
+from cns_py.cql.planner import invalidate_stats, table_stats
+
+
+def test_histogram_renders_cumulative_buckets_sum_and_count():
+    hist = metrics.Histogram("t_seconds", "test", ("stage",), buckets=(0.1, 1.0))
+    hist.observe(0.05, stage="a")
+    hist.observe(0.5, stage="a")
+    hist.observe(5.0, stage="a")
+    lines = hist.render()
+    assert lines[:2] == ["# HELP t_seconds test", "# TYPE t_seconds histogram"]
+    assert 't_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 't_seconds_bucket{stage="a",le="1"} 2' in lines
+    assert 't_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 't_seconds_sum{stage="a"} 5.55' in lines
+    assert 't_seconds_count{stage="a"} 3' in lines
+
+
+def test_counter_and_label_escaping():
+    c = metrics.Counter("t_total", "test", ("q",))
+    c.inc(q='say "hi"\n')
+    c.inc(2, q='say "hi"\n')
+    assert c.render()[-1] == 't_total{q="say \\"hi\\"\\n"} 3'
+
+
+def test_executor_records_stage_latency_and_rows_by_shape():
+    before = metrics.STAGE_SECONDS.count(stage="graph_traverse", shape="label+predicate")
+    rows_before = metrics.ROWS_RETURNED.count(shape="label+predicate")
+    cql('MATCH label="FrameworkX" PREDICATE supports_tls')
+    assert metrics.STAGE_SECONDS.count(stage="graph_traverse", shape="label+predicate") == (
+        before + 1
+    )
+    for stage in ("planner", "ann_shortlist", "temporal_mask", "belief_compute"):
+        assert metrics.STAGE_SECONDS.count(stage=stage, shape="label+predicate") >= 1
+    assert metrics.ROWS_RETURNED.count(shape="label+predicate") == rows_before + 1
+    assert metrics.DB_ROUNDTRIP_SECONDS.count(op="cql") >= 1
+
+
+def test_planner_stats_cache_counts_hits_and_misses():
+    invalidate_stats()
+    hits = metrics.PLANNER_STATS_CACHE.value(result="hit")
+    misses = metrics.PLANNER_STATS_CACHE.value(result="miss")
+    table_stats()
+    table_stats()
+    assert metrics.PLANNER_STATS_CACHE.value(result="miss") == misses + 1
+    assert metrics.PLANNER_STATS_CACHE.value(result="hit") == hits + 1
+    assert 'cns_planner_stats_cache_total{result="hit"}' in metrics.REGISTRY.render()
+
+
+def test_metrics_endpoint_exposes_prometheus_text():
+    try:
+        from fastapi.testclient import TestClient
+
+        from cns_py.api.server import get_app
+    except Exception:  # pragma: no cover - FastAPI not installed
+        pytest.skip("fastapi not available")
+    client = TestClient(get_app())
+    client.post("/cql", json={"query": 'MATCH label="FrameworkX"'})
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = resp.text
+    assert 'cns_cql_stage_seconds_bucket{stage="planner",shape="label",le="+Inf"}' in body
+    assert 'cns_api_request_seconds_count{endpoint="cql"}' in body
+    assert 'cns_api_max_inflight{endpoint="cql"} 8' in body
+    assert "# TYPE cns_db_connections_opened_total counter" in body
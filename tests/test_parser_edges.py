@@ -1,19 +1,19 @@
 from __future__ import annotations
 
-from cns_py.cql.parser import parse
+import pytest
 
+from cns_py.cql.parser import CqlSyntaxError, parse
 
-def test_parse_ignores_unknown_tokens_and_incomplete_clauses():
-    q = parse("FOO BAR MATCH LABEL RETURN EXPLAIN PROVENANCE")
-    # Current parser treats LABEL <next-token> as value; here it becomes 'RETURN'
-    assert q.label == "RETURN"
-    assert q.explain is True and q.provenance is True
+
+def test_parse_rejects_unknown_tokens_with_position():
+    with pytest.raises(CqlSyntaxError, match="unexpected 'BAR' at line 1, column 7") as err:
+        parse("MATCH BAR LABEL X RETURN EXPLAIN PROVENANCE")
+    assert err.value.pos == 6
 
 
-def test_parse_incomplete_label_at_end_is_ignored():
-    # LABEL at end has no following token; parser should keep label None
-    q = parse("MATCH LABEL")
-    assert q.label is None
+def test_parse_incomplete_label_at_end_is_an_error():
+    with pytest.raises(CqlSyntaxError, match="expected a label after LABEL, got end of query"):
+        parse("MATCH LABEL")
 
 
 def test_parse_lowercase_and_spacing_variants():
@@ -23,16 +23,16 @@ def test_parse_lowercase_and_spacing_variants():
     assert q.explain is True and q.provenance is True
 
 
-def test_parse_belief_without_comparator_is_ignored():
-    q = parse("BELIEF 0.8 RETURN EXPLAIN PROVENANCE")
-    assert q.belief_ge is None
+def test_parse_belief_without_comparator_is_an_error():
+    with pytest.raises(CqlSyntaxError, match="expected '>=' or '>' after BELIEF, got '0.8'"):
+        parse("BELIEF 0.8 RETURN EXPLAIN PROVENANCE")
 
 
-def test_parse_asof_followed_by_return_sets_value_to_return():
-    q = parse("ASOF RETURN EXPLAIN PROVENANCE")
-    assert q.asof_iso == "RETURN"
+def test_parse_asof_requires_a_timestamp():
+    with pytest.raises(CqlSyntaxError, match="invalid timestamp 'RETURN'"):
+        parse("ASOF RETURN EXPLAIN PROVENANCE")
 
 
-def test_parse_asof_at_end_is_ignored():
-    q = parse("MATCH LABEL X ASOF")
-    assert q.asof_iso is None
+def test_parse_asof_at_end_is_an_error():
+    with pytest.raises(CqlSyntaxError, match="got end of query at line 1, column 19"):
+        parse("MATCH LABEL X ASOF")
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import pytest
+
+from cns_py.cql.parser import CqlQuery, CqlSyntaxError, parse, parse_plan, tokenize
+from cns_py.cql.planner import AsOf, Belief, Match, Plan, Return
+
+
+def test_tokenize_strings_words_and_operators():
+    tokens = tokenize('MATCH label="Apache \\"HTTP\\" Server" BELIEF >= 0.5')
+    assert [(t.kind, t.value) for t in tokens] == [
+        ("word", "MATCH"),
+        ("word", "label"),
+        ("op", "="),
+        ("string", 'Apache "HTTP" Server'),
+        ("word", "BELIEF"),
+        ("op", ">="),
+        ("word", "0.5"),
+        ("eof", ""),
+    ]
+    assert tokens[3].pos == 12
+
+
+def test_quoted_labels_keep_spaces():
+    q = parse('MATCH label="Apache HTTP Server" PREDICATE supports_tls')
+    assert q.label == "Apache HTTP Server"
+    assert q.predicate == "supports_tls"
+
+
+def test_parse_plan_builds_hashable_ast():
+    text = (
+        'MATCH label="FrameworkX" PREDICATE supports_tls ASOF 2025-01-01T00:00:00Z '
+        "BELIEF >= 0.7 RETURN EXPLAIN ANALYZE LIMIT 5"
+    )
+    plan = parse_plan(text)
+    assert plan == Plan(
+        match=Match(label="FrameworkX", predicate="supports_tls"),
+        asof=AsOf(timestamp_iso="2025-01-01T00:00:00Z"),
+        belief=Belief(ge=0.7),
+        ret=Return(analyze=True),
+        limit=5,
+    )
+    # Formatting variants share one cache entry.
+    cache = {plan: "hit"}
+    assert cache[parse_plan(text.replace("MATCH", "match").replace("BELIEF", "belief"))] == "hit"
+    assert cache[parse_plan(text.replace(" ", "\n  "))] == "hit"
+    assert CqlQuery.from_plan(plan).plan() == plan
+    assert parse(text).plan() == plan
+
+
+@pytest.mark.parametrize(
+    "query, message",
+    [
+        ('MATCH label="unterminated', "unterminated string at line 1, column 13"),
+        ("MATCH label=X LIMIT 5 LIMIT 6", "duplicate LIMIT clause at line 1, column 23"),
+        ('MATCH label="X" BELIEF >= 1.5', "BELIEF threshold must be between 0 and 1"),
+        ('MATCH label="X" EXPLAIN', "EXPLAIN must follow RETURN"),
+        ('MATCH label="X" RETURN ANALYZE', "ANALYZE must follow EXPLAIN"),
+        ('MATCH label="X"\nBELIEF < 0.5', "unexpected character '<' at line 2, column 8"),
+        ('MATCH label="X" ASOF yesterday', "invalid timestamp 'yesterday'"),
+    ],
+)
+def test_syntax_errors_are_precise(query: str, message: str):
+    with pytest.raises(CqlSyntaxError, match=message.replace("(", r"\(")):
+        parse(query)
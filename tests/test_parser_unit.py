@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from cns_py.cql.parser import parse
+import pytest
+
+from cns_py.cql.parser import CqlSyntaxError, parse
 
 
 def test_parse_defaults_minimal_query():
@@ -36,6 +38,5 @@ def test_parse_belief_gt_alias_and_invalid_number():
     q1 = parse("BELIEF > 0.9 RETURN EXPLAIN PROVENANCE")
     assert q1.belief_ge == 0.9
 
-    q2 = parse("BELIEF >= notanumber RETURN EXPLAIN PROVENANCE")
-    # invalid number should be ignored safely
-    assert q2.belief_ge is None
+    with pytest.raises(CqlSyntaxError, match="expected a number after BELIEF >="):
+        parse("BELIEF >= notanumber RETURN EXPLAIN PROVENANCE")
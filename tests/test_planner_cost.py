@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import dataclasses
+from typing import Dict, List, Tuple
+
+import pytest
+
+from cns_py.cql import executor
+from cns_py.cql.executor import cql
+from cns_py.cql.planner import (
+    STRATEGIES,
+    AsOf,
+    Belief,
+    ColumnStats,
+    Match,
+    Plan,
+    TableStats,
+    _hist_cdf,
+    choose,
+    explain,
+    invalidate_stats,
+    table_stats,
+)
+from cns_py.storage.db import get_conn
+
+DAY = 86400.0
+# 1M fibers from 100k source atoms; labels are unique except a very common "Common".
+STATS = TableStats(
+    atoms=200_000,
+    fibers=1_000_000,
+    aspects=1_000_000,
+    columns={
+        "atoms.label": ColumnStats(n_distinct=100_001, mcv=(("Common", 0.5),)),
+        "fibers.src": ColumnStats(n_distinct=100_000),
+        "fibers.predicate": ColumnStats(
+            n_distinct=12, mcv=(("mentions", 0.6), ("uses", 0.3), ("rare", 0.0001))
+        ),
+        "aspects.subject_kind": ColumnStats(n_distinct=1, mcv=(("fiber", 1.0),)),
+        # valid_from spread evenly over 100 days; nothing ever ends.
+        "aspects.valid_from": ColumnStats(n_distinct=1000, bounds=(0.0, 50 * DAY, 100 * DAY)),
+        "aspects.valid_to": ColumnStats(null_frac=1.0),
+        "aspects.belief": ColumnStats(n_distinct=100, bounds=(0.0, 0.5, 1.0)),
+    },
+    source="pg_stats",
+)
+
+
+def _plan(label=None, predicate=None, asof=None, belief=None) -> Plan:
+    return Plan(
+        match=Match(label=label, predicate=predicate),
+        asof=AsOf(timestamp_iso=asof) if asof else None,
+        belief=Belief(ge=belief) if belief is not None else None,
+    )
+
+
+def test_histogram_cdf_interpolates():
+    assert _hist_cdf((0.0, 10.0, 20.0), -1.0) == 0.0
+    assert _hist_cdf((0.0, 10.0, 20.0), 5.0) == pytest.approx(0.25)
+    assert _hist_cdf((0.0, 10.0, 20.0), 20.0) == 1.0
+
+
+def test_strategy_follows_selectivity():
+    # A unique label beats an unselective predicate.
+    p = choose(_plan(label="FrameworkX", predicate="mentions"), STATS)
+    assert p.strategy == "label_first" and p.index == "idx_atoms_label"
+    assert p.est_rows == pytest.approx(6.0, rel=0.01)
+    # A skewed label with a rare predicate flips to predicate-first.
+    p = choose(_plan(label="Common", predicate="rare"), STATS)
+    assert p.strategy == "predicate_first"
+    assert p.join_order[0] == "fibers f"
+    # Very early ASOF: few facts have started yet.
+    p = choose(_plan(label="Common", asof="1970-01-01T12:00:00Z"), STATS)
+    assert p.strategy == "validity_first"
+    # Nothing selective enough: leave it to Postgres.
+    assert choose(_plan(label="Common", predicate="mentions"), STATS).strategy == "natural"
+    assert choose(_plan(), STATS).strategy == "natural"
+
+
+def test_belief_and_validity_scale_estimates():
+    base = choose(_plan(label="FrameworkX"), STATS).est_rows
+    half = choose(_plan(label="FrameworkX", belief=0.5), STATS).est_rows
+    assert half == pytest.approx(base / 2, rel=0.01)
+    mid = choose(_plan(label="FrameworkX", asof="1970-02-20T00:00:00Z"), STATS).est_rows
+    assert mid == pytest.approx(base / 2, rel=0.02)
+
+
+def test_cost_planner_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("CNS_PLANNER_COST", "0")
+    assert choose(_plan(label="FrameworkX"), STATS).strategy == "natural"
+
+
+def test_explain_mentions_strategy():
+    plan = _plan(label="FrameworkX", predicate="rare")
+    text = explain(plan, choose(plan, STATS))
+    assert text.startswith("Drive label_first via idx_atoms_label")
+    assert explain(plan).startswith("Graph expand via predicate 'rare'")
+
+
+def _rows(out: Dict) -> List[Tuple[str, str, str, str]]:
+    # Confidence decays with wall-clock time, so compare identities only.
+    return [
+        (r["subject_label"], r["predicate"], r["object_label"], r["provenance"][0]["source_id"])
+        for r in out["results"]
+    ]
+
+
+def _steps(out: Dict) -> Dict[str, Dict]:
+    return {s["name"]: s for s in out["explain"]["steps"]}
+
+
+QUERY = 'MATCH label="FrameworkX" PREDICATE supports_tls ASOF 2025-01-01T00:00:00Z'
+
+
+def test_planner_step_reports_estimates_and_actual_rows():
+    with get_conn() as conn:
+        conn.execute("ANALYZE")
+    invalidate_stats()
+    assert table_stats().source == "pg_stats"
+    out = cql(QUERY)
+    planner = _steps(out)["planner"]["extra"]
+    assert planner["stats"] == "pg_stats"
+    assert planner["strategy"] in STRATEGIES
+    assert planner["est_rows"] >= 1.0
+    assert planner["actual_rows"] == _steps(out)["graph_traverse"]["extra"]["rows"] >= 1
+
+
+def test_asof_queries_keep_the_cost_based_strategy(monkeypatch):
+    # Only present-time reads go to current_fibers; a selective label under ASOF still
+    # drives the join from idx_atoms_label.
+    monkeypatch.setattr(executor, "table_stats", lambda: STATS)
+    query = 'MATCH label="FrameworkX" PREDICATE mentions'
+    assert _steps(cql(query))["planner"]["extra"]["strategy"] == "current"
+    asof = _steps(cql(query + " ASOF 2025-01-01T00:00:00Z"))["planner"]["extra"]
+    assert asof["strategy"] == "label_first" and asof["index"] == "idx_atoms_label"
+
+
+@pytest.mark.parametrize("strategy", sorted(STRATEGIES))
+def test_every_strategy_returns_the_same_results(monkeypatch, strategy):
+    # Keep present-time routing from overriding the forced strategy.
+    monkeypatch.setenv("CNS_CQL_CURRENT_FIBERS", "0")
+    baseline = _rows(cql(QUERY + " LIMIT 10"))
+    forced = STRATEGIES[strategy]
+
+    def pick(plan: Plan, stats: TableStats):
+        physical = choose(plan, stats)
+        return dataclasses.replace(
+            physical, strategy=strategy, index=forced[0], join_order=forced[1]
+        )
+
+    monkeypatch.setattr(executor, "choose", pick)
+    out = cql(QUERY + " LIMIT 10 RETURN EXPLAIN ANALYZE")
+    assert _rows(out) == baseline
+    assert _steps(out)["planner"]["extra"]["strategy"] == strategy
+    if strategy == "label_first":
+        nodes = _steps(out)["graph_traverse"]["extra"]["pg"]["nodes"]
+        assert any(n.get("relation") == "atoms" for n in nodes)
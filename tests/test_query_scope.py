@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import psycopg
+import pytest
+
+from cns_py.storage.db import QueryScope, get_conn, query_scope
+
+
+def test_deadline_becomes_statement_timeout():
+    with query_scope(QueryScope(timeout_ms=200)):
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SHOW statement_timeout")
+                row = cur.fetchone()
+                assert row is not None and row[0] != "0"
+                with pytest.raises(psycopg.errors.QueryCanceled):
+                    cur.execute("SELECT pg_sleep(2)")
+
+
+def test_expired_deadline_refuses_new_connections():
+    scope = QueryScope(timeout_ms=1)
+    time.sleep(0.01)
+    with query_scope(scope):
+        with pytest.raises(TimeoutError):
+            get_conn()
+
+
+def test_cancel_aborts_running_statement_from_another_thread():
+    scope = QueryScope()
+    errors = []
+
+    def run() -> None:
+        with query_scope(scope):
+            with get_conn() as conn:
+                with conn.cursor() as cur:
+                    try:
+                        cur.execute("SELECT pg_sleep(5)")
+                    except psycopg.errors.QueryCanceled as exc:
+                        errors.append(exc)
+
+    worker = threading.Thread(target=run)
+    started = time.monotonic()
+    worker.start()
+    time.sleep(0.3)
+    assert scope.cancel()
+    worker.join(5)
+    assert errors and time.monotonic() - started < 4
+
+
+def test_pinned_scope_is_not_cancelled():
+    scope = QueryScope()
+    assert scope.pin() is True
+    assert scope.cancel() is False
+    assert scope.cancelled is False
+    # A scope already cancelled cannot be pinned.
+    late = QueryScope()
+    assert late.cancel() is True
+    assert late.pin() is False and late.pinned is False
+
+
+def test_no_scope_means_no_timeout():
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SHOW statement_timeout")
+            row = cur.fetchone()
+            assert row is not None and row[0] == "0"
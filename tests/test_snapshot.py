@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+import pytest
+
+from cns_py.cql.executor import cql
+from cns_py.demo.ingest import DEMO_SOURCE, link_with_validity, upsert_atom
+from cns_py.storage.aspects import aspect_history, record_aspect
+from cns_py.storage.db import get_conn
+from cns_py.storage.snapshot import (
+    MANIFEST,
+    TABLES,
+    SnapshotError,
+    export_snapshot,
+    import_snapshot,
+)
+
+pytest.importorskip("pyarrow")
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+QUERY = 'MATCH label="SnapLib" PREDICATE snap_supports'
+
+
+def _results() -> List[tuple]:
+    # Confidence decays with the wall clock, so compare what is stored.
+    return [(r["object_label"], r["provenance"]) for r in cql(QUERY)["results"]]
+
+
+def _seed() -> int:
+    """A few cited facts, one with a revision history, plus an embedding and symbol."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            lib = upsert_atom(cur, "Entity", "SnapLib", text="A TLS library")
+            cur.execute("UPDATE atoms SET symbol = %s WHERE id = %s", ('{"op": "lib"}', lib))
+            revised = 0
+            for i in range(5):
+                dst = upsert_atom(cur, "Concept", f"SnapTLS{i}")
+                cur.execute(
+                    "INSERT INTO fibers(src, dst, predicate) VALUES (%s, %s, 'snap_supports') "
+                    "RETURNING id",
+                    (lib, dst),
+                )
+                fid = cur.fetchone()[0]
+                record_aspect(
+                    cur,
+                    "fiber",
+                    fid,
+                    valid_from=T0,
+                    belief=0.5 + i / 10,
+                    provenance=DEMO_SOURCE,
+                    observed_at=T0,
+                )
+                revised = revised or fid
+            for day, belief in ((10, 0.2), (20, 0.1)):
+                record_aspect(
+                    cur,
+                    "fiber",
+                    revised,
+                    valid_from=T0 + timedelta(days=day),
+                    belief=belief,
+                    provenance=dict(DEMO_SOURCE, line_span=[day, day + 1]),
+                    observed_at=T0 + timedelta(days=day),
+                )
+            record_aspect(cur, "atom", lib, belief=1.0, observed_at=T0)
+            cur.execute(
+                "UPDATE aspects SET embedding = %s WHERE subject_kind = 'atom' AND subject_id = %s",
+                ("[" + ",".join(str(i / 384) for i in range(384)) + "]", lib),
+            )
+            cur.execute(
+                "INSERT INTO journal_segments(segment, checksum, rows) VALUES (7, 'abc', 3)"
+            )
+    return revised
+
+
+def _dump() -> Dict[str, List[tuple]]:
+    out = {}
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            for table, columns in list(TABLES.items()) + [("current_fibers", (("fiber_id", ""),))]:
+                cur.execute(f"SELECT {table}::text FROM {table} ORDER BY {columns[0][0]}")
+                out[table] = cur.fetchall()
+    return out
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_export_import_round_trip(tmp_path, fmt):
+    _seed()
+    before = _dump()
+    results = _results()
+    directory = str(tmp_path / "snap")
+    manifest = export_snapshot(directory, fmt=fmt, workers=2, batch_rows=4)
+    assert manifest["tables"]["fibers"]["rows"] == len(before["fibers"])
+    # Split into id ranges and row groups.
+    assert len(manifest["tables"]["aspects"]["files"]) == 2
+    assert all(
+        os.path.exists(os.path.join(directory, f)) for f in manifest["tables"]["atoms"]["files"]
+    )
+
+    with pytest.raises(SnapshotError, match="empty"):
+        import_snapshot(directory, workers=1)
+    stats = import_snapshot(directory, workers=2, replace=True)
+    assert stats["tables"]["aspects"] == len(before["aspects"])
+    assert _dump() == before
+    assert _results() == results
+
+    # Triggers are back on and sequences continue past the imported ids.
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            lib = upsert_atom(cur, "Entity", "SnapLib2")
+            dst = upsert_atom(cur, "Concept", "SnapTLS0")
+            link_with_validity(cur, lib, dst, "snap_supports", T0, None, 0.9, DEMO_SOURCE)
+            assert lib > max(int(r[0].split(",")[0].strip("(")) for r in before["atoms"])
+            cur.execute("SELECT count(*) FROM current_fibers WHERE subject_label = 'SnapLib2'")
+            assert cur.fetchone()[0] == 1
+
+
+def test_asof_and_known_filter_aspect_versions(tmp_path):
+    revised = _seed()
+    directory = str(tmp_path / "snap")
+    known = T0 + timedelta(days=15)
+    export_snapshot(directory, workers=1, known=known)
+    with open(os.path.join(directory, MANIFEST), encoding="utf-8") as fh:
+        assert json.load(fh)["known"] == known.isoformat()
+    import_snapshot(directory, workers=1, replace=True)
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            history = aspect_history(cur, "fiber", revised)
+    # The revision of day 20 was not known yet; the one of day 10 is current again.
+    assert [h["belief"] for h in history][-1] == pytest.approx(0.2)
+    assert history[-1]["observed_to"] is None
+    assert _results()[-1][1][0]["line_span"] == [10, 11]
+
+    # ASOF on import: only versions valid on day 5, so the revised fiber has none.
+    export_snapshot(directory, workers=1)
+    import_snapshot(directory, workers=1, asof=T0 + timedelta(days=5), replace=True)
+    labels = [r["object_label"] for r in cql(QUERY)["results"]]
+    assert len(labels) == 4 and "SnapTLS0" not in labels
+
+
+def test_missing_manifest_is_an_error(tmp_path):
+    with pytest.raises(SnapshotError, match="manifest"):
+        import_snapshot(str(tmp_path), workers=1)
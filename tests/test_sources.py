@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from cns_py.cql import executor
+from cns_py.cql.executor import cql, execute_stream
+from cns_py.cql.parser import parse
+from cns_py.demo.ingest import DEMO_SOURCE, link_with_validity, upsert_atom
+from cns_py.storage.aspects import aspect_history
+from cns_py.storage.db import get_conn
+
+FROM = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _seed(provenances: List[Any]) -> List[int]:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            src = upsert_atom(cur, "Entity", "SrcLib")
+            ids = []
+            for i, prov in enumerate(provenances):
+                dst = upsert_atom(cur, "Concept", f"SrcTLS{i}")
+                ids.append(
+                    link_with_validity(
+                        cur, src, dst, "src_supports", FROM, None, 0.9 - i * 0.1, prov
+                    )
+                )
+            return ids
+
+
+def _aspect(fiber_id: int) -> tuple:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT source_ref, provenance FROM aspects "
+                "WHERE subject_kind = 'fiber' AND subject_id = %s AND observed_to IS NULL",
+                (fiber_id,),
+            )
+            return cur.fetchone()
+
+
+def test_citations_share_one_source_row():
+    cited = dict(DEMO_SOURCE, line_span=[3, 9])
+    a, b, c = _seed([cited, DEMO_SOURCE, {"notes": "no citation"}])
+    ref_a, prov_a = _aspect(a)
+    ref_b, prov_b = _aspect(b)
+    assert ref_a is not None and ref_a == ref_b
+    # Only the per-fact detail stays on the aspect.
+    assert prov_a == {"line_span": [3, 9]} and prov_b is None
+    assert _aspect(c) == (None, {"notes": "no citation"})
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT count(*) FROM sources WHERE source_id = %s", ("demo_seed:tls-policy",)
+            )
+            assert cur.fetchone()[0] == 1
+            history = aspect_history(cur, "fiber", a)
+    assert history[0]["provenance"] == cited
+
+
+def test_each_source_is_fetched_once(monkeypatch):
+    _seed([dict(DEMO_SOURCE, line_span=[i, i + 1]) for i in range(3)] + [{"notes": "x"}])
+    calls: List[List[int]] = []
+    fetch = executor.fetch_sources
+
+    def counting(cur: Any, ids: Any) -> Dict[int, Dict[str, Any]]:
+        ids = list(ids)
+        calls.append(ids)
+        return fetch(cur, ids)
+
+    monkeypatch.setattr(executor, "fetch_sources", counting)
+    out = cql('MATCH label="SrcLib" PREDICATE src_supports')
+    assert len(calls) == 1 and len(set(calls[0])) == 1
+    # The uncited fact is dropped; the cited ones carry the document and their span.
+    rows = out["results"]
+    assert [r["object_label"] for r in rows] == ["SrcTLS0", "SrcTLS1", "SrcTLS2"]
+    assert [r["provenance"][0]["line_span"] for r in rows] == [[0, 1], [1, 2], [2, 3]]
+    assert {r["provenance"][0]["uri"] for r in rows} == {DEMO_SOURCE["uri"]}
+    traverse = next(s for s in out["explain"]["steps"] if s["name"] == "graph_traverse")
+    assert traverse["extra"]["sources"] == 1
+
+
+def test_stream_and_paths_resolve_sources():
+    _seed([DEMO_SOURCE])
+    streamed = list(execute_stream(parse('MATCH label="SrcLib" PREDICATE src_supports')))
+    assert streamed[0]["provenance"][0]["source_id"] == DEMO_SOURCE["source_id"]
+    path = cql('MATCH ("SrcLib")-[src_supports]->(t)')
+    assert path["results"][0]["edges"][0]["provenance"][0]["hash"] == DEMO_SOURCE["hash"]
+
+
+def test_updating_provenance_without_a_citation_uncites_the_fact():
+    (fid,) = _seed([DEMO_SOURCE])
+    with get_conn() as conn:
+        conn.execute(
+            'UPDATE aspects SET provenance = \'{"notes": "retracted"}\' '
+            "WHERE subject_kind = 'fiber' AND subject_id = %s",
+            (fid,),
+        )
+        cur = conn.execute("SELECT source_ref FROM current_fibers WHERE fiber_id = %s", (fid,))
+        assert cur.fetchone() == (None,)
+    assert _aspect(fid) == (None, {"notes": "retracted"})
+    assert cql('MATCH label="SrcLib" PREDICATE src_supports')["results"] == []
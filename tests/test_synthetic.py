@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import replace
+
+from cns_py.cql.executor import cql
+from cns_py.demo.synthetic import (
+    PRESETS,
+    SyntheticSpec,
+    embedding,
+    generate_atoms,
+    generate_facts,
+    load,
+)
+from cns_py.storage.db import get_conn
+
+SMALL = SyntheticSpec(atoms=200, facts=1_000, seed=7)
+
+
+def test_generation_is_deterministic_per_seed():
+    assert list(generate_atoms(SMALL)) == list(generate_atoms(SMALL))
+    assert list(generate_facts(SMALL)) == list(generate_facts(SMALL))
+    assert list(generate_facts(SMALL)) != list(generate_facts(replace(SMALL, seed=8)))
+    assert embedding(SMALL, 3) == embedding(SMALL, 3)
+
+
+def test_fanout_is_heavy_tailed_and_histories_are_contiguous():
+    facts = list(generate_facts(SMALL))
+    assert len(facts) == SMALL.facts
+    fanout = sorted(Counter(f.src for f in facts).values(), reverse=True)
+    assert fanout[0] > 10 * fanout[len(fanout) // 2]
+    assert all(f.src != f.dst for f in facts)
+
+    # Consecutive facts of a history share (src, predicate) and abut in time.
+    chained = [
+        (a, b)
+        for a, b in zip(facts, facts[1:])
+        if a.valid_to is not None and a.valid_to == b.valid_from
+    ]
+    assert chained
+    assert all((a.src, a.predicate) == (b.src, b.predicate) for a, b in chained)
+    assert all(0.0 <= f.belief <= 1.0 for f in facts)
+
+
+def test_presets_scale_by_facts():
+    assert [PRESETS[k].facts for k in ("10k", "1m", "10m")] == [10_000, 1_000_000, 10_000_000]
+
+
+def test_load_copies_rows_and_is_queryable():
+    spec = replace(SMALL, embeddings=True)
+    stats = load(spec, chunk_size=300)
+    assert stats["atoms"] == spec.atoms
+    assert stats["fibers"] == spec.facts
+    assert stats["aspects"] == spec.facts + spec.atoms
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM atoms WHERE label LIKE 'syn-%'")
+            row = cur.fetchone()
+            assert row is not None and row[0] == spec.atoms
+            cur.execute(
+                "SELECT count(*) FROM aspects WHERE subject_kind='atom' AND embedding IS NOT NULL"
+            )
+            row = cur.fetchone()
+            assert row is not None and row[0] == spec.atoms
+            # Facts citing the same document share its sources row.
+            cur.execute("SELECT count(*) FROM sources WHERE source_id LIKE 'synthetic:%'")
+            row = cur.fetchone()
+            assert row is not None and 0 < row[0] <= spec.facts // 20
+
+    hub = Counter(f.src for f in generate_facts(spec)).most_common(1)[0][0]
+    kind, label = list(generate_atoms(spec))[hub]
+    out = cql(f'MATCH label="{label}" LIMIT 1000')
+    assert len(out["results"]) > 10